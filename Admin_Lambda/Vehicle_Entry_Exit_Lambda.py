@@ -1,15 +1,15 @@
 import json
 import boto3
 from datetime import datetime, timedelta, timezone
-import uuid
-from boto3.dynamodb.conditions import Attr
-import os 
+
+from admin_module.slot_allocator import allocate_slot, AllocationConflictError
+from admin_module.parking_session import find_active_session, release_slot, VehicleAlreadyParkedError
+from admin_module.email_verification import queue_verifications
 
 
 dynamodb = boto3.resource('dynamodb')
 parking_table = dynamodb.Table('ParkingSlotDatabase')
 logs_table = dynamodb.Table('ParkingHistory')
-ses_client = boto3.client('ses')
 
 def lambda_handler(event, context):
     # Parse input
@@ -60,16 +60,7 @@ def lambda_handler(event, context):
 
 def handle_entry(vehicle_id, expected_minutes, area, floor, email):
 
-    response = parking_table.query(
-        IndexName='vehicle_id-index',
-        KeyConditionExpression='vehicle_id = :vehicle_id',
-        FilterExpression='#status = :occupied',
-        ExpressionAttributeNames={'#status': 'status'},
-        ExpressionAttributeValues={':vehicle_id': vehicle_id, ':occupied': 'occupied'}
-    )
-
-    
-    if response['Items']:
+    if find_active_session(vehicle_id):
         return {
             'statusCode': 409, 
             'body': json.dumps({'error': f'Vehicle {vehicle_id} is already parked.'})
@@ -79,68 +70,38 @@ def handle_entry(vehicle_id, expected_minutes, area, floor, email):
     entry_timestamp = now_utc.isoformat()
     expected_exit_time = (now_utc + timedelta(minutes=expected_minutes)).isoformat()
     
-    filter_expression = 'area_number = :area AND #s = :status'
-    expression_values = {':area': int(area), ':status': 'empty'}
-    expression_names = {'#s': 'status'}
-    
-    if floor:
-        filter_expression += ' AND floor_number = :floor'
-        expression_values[':floor'] = int(floor)
-    
-    response = parking_table.scan(
-        FilterExpression=filter_expression,
-        ExpressionAttributeValues=expression_values,
-        ExpressionAttributeNames=expression_names
-    )
+    occupant = {
+        'vehicle_id': vehicle_id,
+        'expected_time': expected_exit_time,
+        'entry_timestamp': entry_timestamp,
+        'email': email
+    }
+    try:
+        selected_slot = allocate_slot(parking_table, int(area), int(floor) if floor else None, vehicle_id, occupant)
+    except AllocationConflictError:
+        
+        return {
+            'statusCode': 409, 
+            'body': json.dumps({'error': 'Sorry, that parking spot was just taken. Please try again.'})
+        }
+    except VehicleAlreadyParkedError:
+        return {
+            'statusCode': 409, 
+            'body': json.dumps({'error': f'Vehicle {vehicle_id} is already parked.'})
+        }
     
-    if not response['Items']:
+    if not selected_slot:
         
         return {
             'statusCode': 400,
             'body': json.dumps({'error': f'No available parking slots in area {area}' + (f' floor {floor}' if floor else '')})
         }
     
-    slots = sorted(response['Items'], key=lambda x: (int(x['floor_number']), int(x['slot_number'])))
-    selected_slot = slots[0]
     parking_id = selected_slot['parking_id']
 
-    # CHANGED: Added entry_timestamp to the update expression
-    try:
-        parking_table.update_item(
-            Key={'parking_id': parking_id},
-            UpdateExpression='SET #status = :occupied, vehicle_id = :vehicle_id, expected_time = :expected_time, entry_timestamp = :entry_ts, email = :email',
-            # ADD this new line
-            ConditionExpression='#status = :empty',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':occupied': 'occupied',
-                ':vehicle_id': vehicle_id,
-                ':expected_time': expected_exit_time,
-                ':entry_ts': entry_timestamp,
-                ':email': email,
-                ':empty': 'empty'
-            }
-        )
-        
-        try:
-            ses_client.verify_email_identity(
-                EmailAddress=email
-            )
-            print(f"Successfully sent SES verification request to {email}.")
-            message_for_user = (
-                f"Vehicle {vehicle_id} assigned to slot {parking_id}. "
-                f"A verification email has been sent to {email} to enable notifications."
-            )
-        except Exception as e:
-            print(f"Warning: Parking was assigned, but failed to initiate SES verification for {email}: {e}")
-            message_for_user = f"Vehicle {vehicle_id} assigned to slot {parking_id}."
-            
-    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
-        
-        return {
-            'statusCode': 409, 
-            'body': json.dumps({'error': 'Sorry, that parking spot was just taken. Please try again.'})
-        }
+    # Verification is deferred to ses_verification_worker_lambda; already
+    # handled addresses cost nothing here.
+    queue_verifications([email])
     
     return {
         'statusCode': 200,
@@ -152,66 +113,30 @@ def handle_entry(vehicle_id, expected_minutes, area, floor, email):
 
 def handle_exit(vehicle_id):
     
-    response = parking_table.query(
-        IndexName='vehicle_id-index',
-        KeyConditionExpression='vehicle_id = :vehicle_id',
-        FilterExpression='#status = :occupied',
-        ExpressionAttributeNames={'#status': 'status'},
-        ExpressionAttributeValues={':vehicle_id': vehicle_id, ':occupied': 'occupied'}
-    )
+    session = find_active_session(vehicle_id)
     
-    if not response['Items']:
+    if not session:
         
         return {
             'statusCode': 404,
             'body': json.dumps({'error': f'No slot found for vehicle {vehicle_id}'})
         }
 
-    slot_info = response['Items'][0]
-    parking_id = slot_info['parking_id']
-    
-    exit_dt = datetime.now(timezone.utc)
-    exit_timestamp = exit_dt.isoformat()
-    date = exit_dt.strftime('%Y-%m-%d')
+    parking_id = session['parking_id']
     
-    
-    duration_minutes = None
-    entry_timestamp_str = slot_info.get('entry_timestamp')
-    if entry_timestamp_str:
-        duration = datetime.fromisoformat(exit_timestamp) - datetime.fromisoformat(entry_timestamp_str)
-        duration_minutes = int(duration.total_seconds() / 60)
-
-    
-    parking_table.update_item(
-        Key={'parking_id': parking_id},
-        UpdateExpression='SET #status = :empty REMOVE vehicle_id, expected_time, entry_timestamp, email',
-        ExpressionAttributeNames={'#status': 'status'},
-        ExpressionAttributeValues={':empty': 'empty'}
-    )
-    
-
-    
-    log_item = {
-        'session_id': str(uuid.uuid4()),          
-        'date': date,                   
-        'exit_timestamp': exit_timestamp,         
-        'area_id': slot_info.get('area_number'),
-        'vehicle_id': vehicle_id,
-        'parking_id': parking_id,
-        'entry_timestamp': slot_info.get('entry_timestamp'),
-        'duration_minutes': duration_minutes,
-        'floor_number': slot_info.get('floor_number'),
-        'email': slot_info.get('email') # Make sure to include email
-    }
-
-    final_log_item = {k: v for k, v in log_item.items() if v is not None}
-
-    logs_table.put_item(Item=final_log_item)
+    try:
+        history_item = release_slot(parking_table, logs_table, session)
+    except ValueError as e:
+        
+        return {
+            'statusCode': 409,
+            'body': json.dumps({'error': str(e)})
+        }
     
     return {
         'statusCode': 200,
         'body': json.dumps({
             'message': f'Vehicle {vehicle_id} exited from slot {parking_id}', 'parking_id': parking_id,
-            'exit_timestamp': exit_timestamp
+            'exit_timestamp': history_item['exit_timestamp']
         })
     }
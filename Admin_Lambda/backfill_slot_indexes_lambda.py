@@ -0,0 +1,81 @@
+import json
+import os
+from admin_module.parking_crud import _backfill_index_attributes, _backfill_active_sessions, _backfill_expiry_schedule, _rebuild_occupancy_counters, _ensure_secondary_indexes
+from admin_module.logging_util import create_admin_log
+from botocore.exceptions import ClientError
+
+def lambda_handler(event, context):
+    """
+    Description:
+        Handles an API Gateway event to migrate an existing parking table to
+        the derived index attributes used by the secondary indexes (e.g. the
+        FreeSlotIndex that drives slot allocation), to add the secondary
+        indexes the table is missing (one per run) and to create the missing
+        ActiveParkingSessions items and expiry reminders for vehicles that
+        are already parked.
+        Also recomputes the occupancy counters and the real-time occupancy
+        checkpoint, which reconciles any drift.
+        Safe to run repeatedly; items that are already up to date are left
+        untouched.
+
+    Expected event input format:
+        No specific input is required in the event body.
+        {
+            "body": "{}"
+        }
+    """
+    try:
+        table_name = os.environ['DYNAMODB_TABLE_NAME']
+
+        updated_count = _backfill_index_attributes(table_name)
+        index_status = _ensure_secondary_indexes(table_name)
+        sessions_created = _backfill_active_sessions(table_name)
+        reminders_scheduled = _backfill_expiry_schedule(table_name)
+        counter_rows = _rebuild_occupancy_counters(table_name)
+
+        # --- ADMIN LOGGING ---
+        log_details = {
+            "updated_total": updated_count,
+            "sessions_created": sessions_created,
+            "reminders_scheduled": reminders_scheduled,
+            "counter_rows": counter_rows,
+            "indexes": index_status,
+            "backfilled_table": table_name
+        }
+        create_admin_log(action="BackfillSlotIndexes", details=log_details)
+        # ---------------------
+
+        return {
+            'statusCode': 200,
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Headers": "Content-Type",
+                "Access-Control-Allow-Methods": "OPTIONS,POST"
+            },
+            'body': json.dumps({
+                'message': "Slot index attributes backfilled successfully.",
+                'updated_total': updated_count,
+                'sessions_created': sessions_created,
+                'reminders_scheduled': reminders_scheduled,
+                'counter_rows': counter_rows,
+                'indexes': index_status
+            })
+        }
+    except ClientError as e:
+        return {
+            'statusCode': 500, 
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Headers": "Content-Type",
+                "Access-Control-Allow-Methods": "OPTIONS,POST"
+            },
+            'body': json.dumps({'error': f"DynamoDB Error: {e.response['Error']['Message']}"}) }
+    except Exception as e:
+        return {
+            'statusCode': 500, 
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Headers": "Content-Type",
+                "Access-Control-Allow-Methods": "OPTIONS,POST"
+            },
+            'body': json.dumps({'error': f"Internal Server Error: {str(e)}"}) }
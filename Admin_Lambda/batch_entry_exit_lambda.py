@@ -0,0 +1,222 @@
+import json
+import os
+import boto3
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from admin_module.slot_allocator import allocate_slot, claim_slot, find_free_slots, AllocationConflictError
+from admin_module.parking_session import find_active_sessions, release_slot, VehicleAlreadyParkedError
+from admin_module.email_verification import queue_verifications
+
+dynamodb = boto3.resource('dynamodb')
+parking_table = dynamodb.Table('ParkingSlotDatabase')
+logs_table = dynamodb.Table('ParkingHistory')
+
+MAX_BATCH_SIZE = int(os.environ.get('BATCH_MAX_EVENTS', '500'))
+MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '16'))
+
+
+def lambda_handler(event, context):
+    """
+    Processes a burst of gate events in one invocation.
+
+    Expected event input format (same fields as Vehicle_Entry_Exit_Lambda,
+    either directly on the event or as a JSON 'body'):
+        {
+            "events": [
+                {"event": "entry", "vehicle_id": "MH12AB1234", "expected": 60, "area": 1, "floor": 2, "email": "a@b.com"},
+                {"event": "exit", "vehicle_id": "MH14CD5678"}
+            ]
+        }
+
+    Returns one result per input event, in input order, each carrying the
+    statusCode and body fields the single-vehicle endpoint would return.
+    """
+    try:
+        payload = json.loads(event['body']) if event.get('body') else event
+        gate_events = payload.get('events')
+
+        if not gate_events or not isinstance(gate_events, list):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': '"events" must be a non-empty list'})
+            }
+        if len(gate_events) > MAX_BATCH_SIZE:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'A batch may contain at most {MAX_BATCH_SIZE} events'})
+            }
+
+        results = process_batch(gate_events)
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'processed': len(results),
+                'succeeded': sum(1 for r in results if r['statusCode'] == 200),
+                'results': results
+            })
+        }
+
+    except Exception as e:
+        
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
+
+def _result(index, gate_event, status_code, **fields):
+    return {
+        'index': index,
+        'event': gate_event.get('event'),
+        'vehicle_id': gate_event.get('vehicle_id'),
+        'statusCode': status_code,
+        **fields
+    }
+
+
+def _validate(index, gate_event):
+    """Returns an error result for a malformed event, or None if it is valid."""
+    if not isinstance(gate_event, dict) or gate_event.get('event') not in ['entry', 'exit']:
+        return _result(index, gate_event if isinstance(gate_event, dict) else {}, 400,
+                       error='Invalid event type. Use "entry" or "exit"')
+    if not gate_event.get('vehicle_id'):
+        return _result(index, gate_event, 400, error='vehicle_id is required')
+    if gate_event['event'] == 'entry':
+        if not (gate_event.get('expected') is not None and gate_event.get('area') and gate_event.get('email')):
+            return _result(index, gate_event, 400,
+                           error='vehicle_id, expected_time (in minutes), area, and email are required for entry')
+        try:
+            int(gate_event['expected'])
+            int(gate_event['area'])
+            if gate_event.get('floor'):
+                int(gate_event['floor'])
+        except (TypeError, ValueError):
+            return _result(index, gate_event, 400, error='expected_time, area and floor must be numbers')
+    return None
+
+
+def process_batch(gate_events: list) -> list:
+    """
+    Resolves a batch of entry/exit events.
+
+    1. All vehicles are looked up with batched, strongly consistent reads of
+       the active session table.
+    2. Exits are applied first, so their slots are free for the entries.
+    3. Entries are grouped by (area, floor); each group reads one candidate
+       pool from FreeSlotIndex and every entry gets a distinct slot from it.
+       Claims run concurrently; a claim that loses a race falls back to the
+       regular retrying allocator.
+    4. SES verification is queued once per distinct email.
+    """
+    results = [None] * len(gate_events)
+    pending = []
+    seen_vehicles = set()
+
+    for index, gate_event in enumerate(gate_events):
+        error = _validate(index, gate_event)
+        if not error and gate_event['vehicle_id'] in seen_vehicles:
+            error = _result(index, gate_event, 409, error=f"Vehicle {gate_event['vehicle_id']} appears more than once in this batch.")
+        if error:
+            results[index] = error
+            continue
+        seen_vehicles.add(gate_event['vehicle_id'])
+        pending.append((index, gate_event))
+
+    active_sessions = find_active_sessions([gate_event['vehicle_id'] for _, gate_event in pending])
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+
+        # --- Exits ---
+        exits = []
+        for index, gate_event in pending:
+            if gate_event['event'] != 'exit':
+                continue
+            session = active_sessions.get(gate_event['vehicle_id'])
+            if not session:
+                results[index] = _result(index, gate_event, 404, error=f"No slot found for vehicle {gate_event['vehicle_id']}")
+            else:
+                exits.append((index, gate_event, session))
+
+        exit_futures = [(index, gate_event, session, executor.submit(release_slot, parking_table, logs_table, session))
+                        for index, gate_event, session in exits]
+        for index, gate_event, session, future in exit_futures:
+            try:
+                history_item = future.result()
+                results[index] = _result(index, gate_event, 200,
+                                         message=f"Vehicle {gate_event['vehicle_id']} exited from slot {session['parking_id']}",
+                                         parking_id=session['parking_id'],
+                                         exit_timestamp=history_item['exit_timestamp'])
+            except ValueError as e:
+                results[index] = _result(index, gate_event, 409, error=str(e))
+            except Exception as e:
+                results[index] = _result(index, gate_event, 500, error=str(e))
+
+        # --- Entries ---
+        groups = defaultdict(list)
+        for index, gate_event in pending:
+            if gate_event['event'] != 'entry':
+                continue
+            if gate_event['vehicle_id'] in active_sessions:
+                results[index] = _result(index, gate_event, 409, error=f"Vehicle {gate_event['vehicle_id']} is already parked.")
+                continue
+            floor = int(gate_event['floor']) if gate_event.get('floor') else None
+            groups[(int(gate_event['area']), floor)].append((index, gate_event))
+
+        claims = []
+        for (area, floor), members in groups.items():
+            pool = find_free_slots(parking_table, area, floor, limit=len(members))
+            for position, (index, gate_event) in enumerate(members):
+                candidate = pool[position] if position < len(pool) else None
+                occupant = _occupant(gate_event)
+                claims.append((index, gate_event, area, floor, candidate, occupant,
+                               executor.submit(_claim_or_allocate, area, floor, gate_event['vehicle_id'], candidate, occupant)))
+
+        entry_emails = set()
+        for index, gate_event, area, floor, candidate, occupant, future in claims:
+            try:
+                selected_slot = future.result()
+            except AllocationConflictError:
+                results[index] = _result(index, gate_event, 409, error='Sorry, that parking spot was just taken. Please try again.')
+                continue
+            except VehicleAlreadyParkedError:
+                results[index] = _result(index, gate_event, 409, error=f"Vehicle {gate_event['vehicle_id']} is already parked.")
+                continue
+            except Exception as e:
+                results[index] = _result(index, gate_event, 500, error=str(e))
+                continue
+
+            if not selected_slot:
+                results[index] = _result(index, gate_event, 400,
+                                         error=f'No available parking slots in area {area}' + (f' floor {floor}' if floor else ''))
+                continue
+
+            entry_emails.add(occupant['email'])
+            results[index] = _result(index, gate_event, 200,
+                                     message=f"Vehicle {gate_event['vehicle_id']} assigned to slot {selected_slot['parking_id']}",
+                                     parking_id=selected_slot['parking_id'],
+                                     entry_timestamp=occupant['entry_timestamp'],
+                                     expected_exit_time=occupant['expected_time'])
+
+    queue_verifications(entry_emails)
+
+    return results
+
+
+def _occupant(gate_event):
+    now_utc = datetime.now(timezone.utc)
+    return {
+        'vehicle_id': gate_event['vehicle_id'],
+        'expected_time': (now_utc + timedelta(minutes=int(gate_event['expected']))).isoformat(),
+        'entry_timestamp': now_utc.isoformat(),
+        'email': gate_event['email']
+    }
+
+
+def _claim_or_allocate(area, floor, vehicle_id, candidate, occupant):
+    """Claims the pre-assigned candidate, falling back to the retrying allocator."""
+    if candidate and claim_slot(parking_table, candidate, occupant):
+        return candidate
+    return allocate_slot(parking_table, area, floor, vehicle_id, occupant)
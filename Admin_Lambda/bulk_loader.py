@@ -0,0 +1,180 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_SIZE = 25
+WRITE_WORKERS = int(os.environ.get('INIT_WRITE_WORKERS', '8'))
+MAX_BATCH_ATTEMPTS = int(os.environ.get('INIT_MAX_BATCH_ATTEMPTS', '10'))
+BACKOFF_BASE_SECONDS = float(os.environ.get('INIT_BACKOFF_BASE_SECONDS', '0.05'))
+BACKOFF_MAX_SECONDS = float(os.environ.get('INIT_BACKOFF_MAX_SECONDS', '5'))
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get('INIT_PROGRESS_INTERVAL_SECONDS', '5'))
+
+THROTTLING_CODES = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+
+class BulkWriteError(Exception):
+    """Raised when a batch still has unprocessed items after MAX_BATCH_ATTEMPTS."""
+
+
+class AdaptiveBackoff:
+    """
+    Pacing delay shared by every writer thread. It doubles each time DynamoDB
+    pushes back and halves after each clean batch, so all workers slow down
+    together under throttling and return to full speed once it clears.
+    """
+
+    def __init__(self, base: float = None, maximum: float = None):
+        self.base = base or BACKOFF_BASE_SECONDS
+        self.maximum = maximum or BACKOFF_MAX_SECONDS
+        self._delay = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self) -> None:
+        with self._lock:
+            delay = self._delay
+        if delay:
+            # Jitter keeps the workers from retrying in lockstep
+            time.sleep(random.uniform(delay / 2, delay))
+
+    def throttled(self) -> None:
+        with self._lock:
+            self._delay = min(self.maximum, max(self.base, self._delay * 2))
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self._delay = self._delay / 2 if self._delay > self.base else 0.0
+
+
+class LoadStats:
+    """Counters collected while a bulk load runs; prints progress every PROGRESS_INTERVAL_SECONDS."""
+
+    def __init__(self, total: int = None, label: str = 'items'):
+        self.total = total
+        self.label = label
+        self.written = 0
+        self.batches = 0
+        self.throttle_retries = 0
+        self.written_by_unit = {}
+        self._started = time.monotonic()
+        self._last_report = self._started
+        self._lock = threading.Lock()
+
+    def _add_batch(self, unit, written: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.written += written
+            self.written_by_unit[unit] = self.written_by_unit.get(unit, 0) + written
+            now = time.monotonic()
+            if now - self._last_report < PROGRESS_INTERVAL_SECONDS:
+                return
+            self._last_report = now
+        self.report()
+
+    def _add_retry(self) -> None:
+        with self._lock:
+            self.throttle_retries += 1
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def report(self) -> None:
+        elapsed = self.elapsed()
+        rate = self.written / elapsed if elapsed else 0.0
+        progress = f"{self.written}/{self.total}" if self.total else str(self.written)
+        print(f"[PROGRESS] Wrote {progress} {self.label} in {elapsed:.1f}s "
+              f"({rate:.0f}/s, {self.throttle_retries} throttled retries).")
+
+    def as_dict(self) -> dict:
+        return {
+            'written': self.written,
+            'batches': self.batches,
+            'throttle_retries': self.throttle_retries,
+            'elapsed_seconds': round(self.elapsed(), 3)
+        }
+
+
+def _write_batch(client, table_name: str, requests: list, unit, backoff: AdaptiveBackoff, stats: LoadStats) -> None:
+    """Writes one batch, retrying throttled calls and unprocessed items until all are stored."""
+    for attempt in range(MAX_BATCH_ATTEMPTS):
+        backoff.pause()
+        try:
+            response = client.batch_write_item(RequestItems={table_name: requests})
+            unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in THROTTLING_CODES:
+                raise
+            unprocessed = requests
+
+        if len(unprocessed) < len(requests):
+            stats._add_batch(unit, len(requests) - len(unprocessed))
+        if not unprocessed:
+            backoff.succeeded()
+            return
+
+        backoff.throttled()
+        stats._add_retry()
+        time.sleep(random.uniform(0, min(backoff.maximum, backoff.base * 2 ** attempt)))
+        requests = unprocessed
+
+    raise BulkWriteError(f"{len(requests)} items for {unit} were still unprocessed after {MAX_BATCH_ATTEMPTS} attempts.")
+
+
+def parallel_batch_write(table, units, workers: int = None, stats: LoadStats = None,
+                         backoff: AdaptiveBackoff = None) -> LoadStats:
+    """
+    Description:
+        Writes several independent streams of items concurrently, one worker
+        thread per unit at a time. Each unit's items are pulled lazily and sent
+        in BatchWriteItem calls of BATCH_SIZE, so memory stays flat however
+        large the load is. Throttling errors and UnprocessedItems are retried
+        with jittered exponential backoff, and a shared AdaptiveBackoff slows
+        every worker down while DynamoDB is pushing back. The first failure
+        stops the remaining units.
+
+    Args:
+        table: The boto3 Table resource to write to.
+        units (iterable): (unit_key, items) pairs, e.g. ((area, floor), generator).
+        workers (int): Number of writer threads. Defaults to WRITE_WORKERS.
+        stats (LoadStats): Optional collector; a new one is created if omitted.
+        backoff (AdaptiveBackoff): Optional shared pacing state.
+
+    Returns:
+        LoadStats: Totals and per-unit counts of the items written.
+
+    Raises:
+        BulkWriteError: If a batch could not be fully written.
+        ClientError: If DynamoDB rejects a request for any other reason.
+    """
+    workers = max(1, workers or WRITE_WORKERS)
+    stats = stats if stats is not None else LoadStats()
+    backoff = backoff or AdaptiveBackoff()
+    client = table.meta.client
+    stop = threading.Event()
+
+    def _write_unit(unit, items) -> None:
+        try:
+            requests = []
+            for item in items:
+                requests.append({'PutRequest': {'Item': item}})
+                if len(requests) == BATCH_SIZE:
+                    if stop.is_set():
+                        return
+                    _write_batch(client, table.name, requests, unit, backoff, stats)
+                    requests = []
+            if requests and not stop.is_set():
+                _write_batch(client, table.name, requests, unit, backoff, stats)
+        except Exception:
+            stop.set()
+            raise
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_write_unit, unit, items) for unit, items in units]
+        for future in futures:
+            future.result()
+
+    stats.report()
+    return stats
@@ -4,6 +4,7 @@ import datetime
 import boto3
 from botocore.exceptions import ClientError
 from admin_module.logging_util import create_admin_log
+from admin_module.slot_keys import HELD_ATTRIBUTES, parse_parking_id, slot_status_update
 
 dynamodb = boto3.resource('dynamodb')
 PARKING_SLOTS_TABLE_NAME = os.environ['DYNAMODB_TABLE_NAME']
@@ -37,23 +38,31 @@ def lambda_handler(event, context):
         # Determining the action name based on the new status
         action_name = "SlotFlagUp" if new_status == 'maintenance' else "SlotFlagDown"
 
+        updated_slots = []
+        skipped_slots = []
         for slot_id in parking_ids:
-            slots_table.update_item(
-                Key={
-                    'parking_id': slot_id
-                },
-                UpdateExpression='SET #st = :s',  # Using placeholders for safety and clarity
-                ExpressionAttributeNames={
-                    '#st': 'status'  # Maps '#st' to the 'status' attribute name
-                },
-                ExpressionAttributeValues={
-                    ':s': new_status  # Maps ':s' to the new status value
-                }
-            )
+            # The status drives the FreeSlotIndex keys, so they are rewritten together;
+            # an admin change also cancels any waitlist hold on the slot
+            area, floor, slot = parse_parking_id(slot_id)
+            update_params = slot_status_update(new_status, area, floor, slot, extra_remove=HELD_ATTRIBUTES)
+            update_params['ExpressionAttributeValues'][':occupied'] = 'occupied'
+            try:
+                # Occupied slots have an active session and must be vacated via manual exit
+                slots_table.update_item(
+                    Key={
+                        'parking_id': slot_id
+                    },
+                    ConditionExpression='attribute_exists(parking_id) AND #status <> :occupied',
+                    **update_params
+                )
+                updated_slots.append(slot_id)
+            except slots_table.meta.client.exceptions.ConditionalCheckFailedException:
+                skipped_slots.append(slot_id)
         
         # --- ADMIN LOGGING ---
         log_details = {
-            "updated_slots": parking_ids,
+            "updated_slots": updated_slots,
+            "skipped_slots": skipped_slots,
             "new_status": new_status
         }
         create_admin_log(action=action_name, details=log_details)
@@ -67,8 +76,10 @@ def lambda_handler(event, context):
                 "Access-Control-Allow-Methods": "OPTIONS,POST"
             },
             'body': json.dumps({
-                'message': f"Successfully executed '{action_name}' for {len(parking_ids)} slots.",
-                'updated_slots': parking_ids
+                'message': f"Successfully executed '{action_name}' for {len(updated_slots)} slots."
+                           + (f" Skipped {len(skipped_slots)} occupied or missing slots." if skipped_slots else ""),
+                'updated_slots': updated_slots,
+                'skipped_slots': skipped_slots
             })
         }
 
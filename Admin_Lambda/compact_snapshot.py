@@ -0,0 +1,95 @@
+import gzip
+import base64
+from itertools import groupby
+
+# Attributes a compact snapshot is built from; use them as the scan projection
+COMPACT_ATTRIBUTES = ('area_number', 'floor_number', 'slot_number', 'status', 'vehicle_id', 'email')
+
+# Fixed codes for the known statuses; unknown ones are appended per snapshot
+STATUS_CODES = ('empty', 'occupied', 'maintenance')
+
+
+def encode_compact(slot_items) -> dict:
+    """
+    Description:
+        Packs a full slot list into a columnar snapshot. Each floor is
+        described once, with its slot numbers as [first, count] ranges and its
+        statuses as a run-length encoded vector of status codes, so the
+        per-slot key names and location numbers are not repeated.
+
+    Args:
+        slot_items (iterable): Slot items carrying the COMPACT_ATTRIBUTES.
+
+    Returns:
+        dict: {
+            'status_codes': ['empty', 'occupied', 'maintenance', ...],
+            'floors': [{
+                'area_number': 1, 'floor_number': 2,
+                'ranges': [[1, 40], [45, 10]],    # slot numbers 1-40 and 45-54
+                'runs': [0, 12, 1, 3, 0, 35],     # code, run length, code, ...
+                'occupants': [[13, 'KA01AB1234', 'a@b.c'], ...]
+            }, ...]
+        }
+        The nth status of a floor belongs to its nth slot number.
+    """
+    status_codes = list(STATUS_CODES)
+    code_of = {status: code for code, status in enumerate(status_codes)}
+
+    # Flatten once: converting the Decimal numbers dominates the encode time
+    rows = sorted(
+        (int(item['area_number']), int(item['floor_number']), int(item['slot_number']),
+         item.get('status'), item.get('vehicle_id'), item.get('email'))
+        for item in slot_items
+    )
+
+    floors = []
+    for (area, floor), floor_rows in groupby(rows, key=lambda row: row[:2]):
+        ranges = []
+        runs = []
+        occupants = []
+        for _, _, slot, status, vehicle_id, email in floor_rows:
+            if ranges and ranges[-1][0] + ranges[-1][1] == slot:
+                ranges[-1][1] += 1
+            else:
+                ranges.append([slot, 1])
+
+            if status not in code_of:
+                code_of[status] = len(status_codes)
+                status_codes.append(status)
+            code = code_of[status]
+            if runs and runs[-2] == code:
+                runs[-1] += 1
+            else:
+                runs.extend((code, 1))
+
+            if vehicle_id:
+                occupants.append([slot, vehicle_id, email])
+
+        floors.append({
+            'area_number': area,
+            'floor_number': floor,
+            'ranges': ranges,
+            'runs': runs,
+            'occupants': occupants
+        })
+
+    return {'status_codes': status_codes, 'floors': floors}
+
+
+def accepts_gzip(event) -> bool:
+    """Returns True if the API Gateway request advertises gzip in Accept-Encoding."""
+    headers = (event or {}).get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'accept-encoding' and 'gzip' in (value or '').lower():
+            return True
+    return False
+
+
+def gzip_body(body: str) -> str:
+    """
+    Compresses a response body for an API Gateway proxy response. The result
+    must be returned with 'isBase64Encoded': True and a 'Content-Encoding: gzip'
+    header (the API needs binary media types enabled for the content type), so
+    the browser inflates it transparently.
+    """
+    return base64.b64encode(gzip.compress(body.encode('utf-8'), compresslevel=6)).decode('ascii')
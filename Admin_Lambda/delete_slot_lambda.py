@@ -24,12 +24,14 @@ def lambda_handler(event, context):
         if not parking_ids or not isinstance(parking_ids, list):
             raise ValueError("Input must contain a 'parking_ids' list.")
 
-        deleted_count = _delete_slots_by_id(table_name, parking_ids)
+        # Occupied slots are skipped; they must be vacated via manual exit first
+        deleted_ids, skipped_ids = _delete_slots_by_id(table_name, parking_ids)
 
         # --- ADMIN LOGGING ---
         log_details = {
-            "deleted_ids": parking_ids,
-            "deleted_count": deleted_count
+            "deleted_ids": deleted_ids,
+            "deleted_count": len(deleted_ids),
+            "skipped_ids": skipped_ids
         }
         create_admin_log(action="DeleteSlots", details=log_details)
         # ---------------------
@@ -42,8 +44,10 @@ def lambda_handler(event, context):
                 "Access-Control-Allow-Methods": "OPTIONS,POST"
             },
             'body': json.dumps({
-                'message': f"Delete request processed. {deleted_count} slots marked for deletion.",
-                'deleted_ids': parking_ids
+                'message': f"Delete request processed. {len(deleted_ids)} slots marked for deletion."
+                           + (f" Skipped {len(skipped_ids)} occupied slots." if skipped_ids else ""),
+                'deleted_ids': deleted_ids,
+                'skipped_ids': skipped_ids
             })
         }
     except (ValueError, TypeError) as e:
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from collections import OrderedDict
+import boto3
+
+from admin_module.ses_dispatcher import dispatch, verify_job, SENT, SPILLED
+
+# Warm containers remember the addresses they have already handled (known to
+# be verified, or already queued for verification) so repeat visitors cost no
+# external call at all on the entry path.
+CACHE_TTL_SECONDS = int(os.environ.get('VERIFIED_EMAIL_CACHE_TTL', '3600'))
+CACHE_MAX_ENTRIES = int(os.environ.get('VERIFIED_EMAIL_CACHE_SIZE', '10000'))
+
+# Queue drained by ses_verification_worker_lambda. When it is not configured
+# the verification request is sent inline through the SES dispatcher, which
+# may spend at most INLINE_BUDGET_SECONDS of the caller's time on it.
+VERIFICATION_QUEUE_URL = os.environ.get('SES_VERIFICATION_QUEUE_URL')
+INLINE_BUDGET_SECONDS = float(os.environ.get('SES_INLINE_VERIFY_BUDGET_SECONDS', '2'))
+
+sqs_client = boto3.client('sqs')
+
+# Format: { email: expires_at_epoch_seconds }. Every entry lives CACHE_TTL_SECONDS,
+# so insertion order is expiry order and the first entry is the next to expire.
+_handled_emails = OrderedDict()
+
+
+def _is_handled(email: str) -> bool:
+    expires_at = _handled_emails.get(email)
+    if expires_at is None:
+        return False
+    if expires_at < time.time():
+        del _handled_emails[email]
+        return False
+    return True
+
+
+def _mark_handled(email: str) -> None:
+    _handled_emails.pop(email, None)
+    if len(_handled_emails) >= CACHE_MAX_ENTRIES:
+        # Drop the entry closest to expiry to keep memory bounded
+        _handled_emails.popitem(last=False)
+    _handled_emails[email] = time.time() + CACHE_TTL_SECONDS
+
+
+def queue_verifications(emails) -> list:
+    """
+    Description:
+        Makes sure SES verification is requested for the given addresses
+        without doing the SES round trip on the caller's path. Addresses this
+        container has seen within the TTL are skipped; the rest are put on the
+        deferred verification queue (10 per SQS call) for the background worker,
+        which checks the verified-identity table and SES in bulk.
+
+    Args:
+        emails (iterable): Email addresses, duplicates allowed.
+
+    Returns:
+        list: The addresses that were queued (or verified inline when no
+              queue is configured).
+    """
+    pending = []
+    for email in emails:
+        normalized = (email or '').strip()
+        if normalized and normalized not in pending and not _is_handled(normalized):
+            pending.append(normalized)
+
+    if not VERIFICATION_QUEUE_URL:
+        return _verify_inline(pending)
+
+    queued = []
+    for start in range(0, len(pending), 10):
+        chunk = pending[start:start + 10]
+        try:
+            response = sqs_client.send_message_batch(
+                QueueUrl=VERIFICATION_QUEUE_URL,
+                Entries=[{'Id': str(i), 'MessageBody': json.dumps({'email': email})} for i, email in enumerate(chunk)]
+            )
+        except Exception as e:
+            print(f"Warning: failed to queue SES verification for {chunk}: {e}")
+            continue
+        failed_ids = {entry['Id'] for entry in response.get('Failed', [])}
+        sent = [email for i, email in enumerate(chunk) if str(i) not in failed_ids]
+
+        for email in sent:
+            _mark_handled(email)
+        queued.extend(sent)
+
+    return queued
+
+
+def _verify_inline(emails: list) -> list:
+    """
+    Requests verification through the SES dispatcher within
+    INLINE_BUDGET_SECONDS, so a throttled SES cannot hold up the entry
+    path; what is not sent in time goes to the dispatcher's spillover queue.
+    """
+    if not emails:
+        return []
+    try:
+        result = dispatch([verify_job(email) for email in emails], budget_seconds=INLINE_BUDGET_SECONDS)
+    except Exception as e:
+        print(f"Warning: failed to request SES verification for {emails}: {e}")
+        return []
+    sent = [job['email'] for job in result[SENT] + result[SPILLED]]
+    for email in sent:
+        _mark_handled(email)
+    return sent
@@ -0,0 +1,218 @@
+import os
+from datetime import datetime, timedelta, timezone
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from admin_module.stream_util import stream_image
+
+dynamodb = boto3.resource('dynamodb')
+
+# Reminder schedule for SlotExpiryNotifier, one partition per UTC minute.
+# Partition key 'minute_bucket' (S, 'YYYY-MM-DDTHH:MM'), sort key
+# 'reminder_id' (S, '<parking_id>#<entry_timestamp>#<stage>'). Items expire
+# through the 'expires_at' TTL once their minute is long past.
+SCHEDULE_TABLE_NAME = os.environ.get('EXPIRY_SCHEDULE_TABLE', 'ParkingExpirySchedule')
+schedule_table = dynamodb.Table(SCHEDULE_TABLE_NAME)
+
+RETENTION_SECONDS = int(os.environ.get('EXPIRY_SCHEDULE_RETENTION', str(24 * 3600)))
+BUCKET_FORMAT = '%Y-%m-%dT%H:%M'
+
+# (stage, minutes relative to expected_time). The final warning is a single
+# stage; rows of the former 'T-2'/'T-1' stages are ignored by the notifier.
+REMINDER_STAGES = (
+    ('T-10', -10),
+    ('T-3', -3),
+    ('T0', 0),
+    ('T+10', 10),
+    ('T+20', 20),
+    ('T+30', 30),
+)
+
+
+def minute_bucket(moment: datetime) -> str:
+    """Returns the bucket a moment belongs to, rounded to the nearest UTC minute."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc) + timedelta(seconds=30)
+    return moment.strftime(BUCKET_FORMAT)
+
+
+def buckets_after(last_bucket: str, moment: datetime, max_buckets: int) -> list:
+    """
+    Lists the minute buckets after `last_bucket` up to and including the
+    bucket of `moment`, keeping only the newest `max_buckets` of them (all of
+    them when there is no `last_bucket` yet).
+    """
+    current = datetime.strptime(minute_bucket(moment), BUCKET_FORMAT)
+    start = current - timedelta(minutes=max(max_buckets, 1) - 1)
+    if last_bucket:
+        start = max(start, datetime.strptime(last_bucket, BUCKET_FORMAT) + timedelta(minutes=1))
+    buckets = []
+    while start <= current:
+        buckets.append(start.strftime(BUCKET_FORMAT))
+        start += timedelta(minutes=1)
+    return buckets
+
+
+def reminder_message(parking_id: str, offset: int) -> str:
+    """Builds the e-mail text for one reminder stage."""
+    if offset == -10:
+        return f"Reminder: Your slot {parking_id} will expire in 10 minutes."
+    if offset < 0:
+        return f"Final warning: Your slot {parking_id} will expire in {-offset} minutes."
+    if offset == 0:
+        return f"Notice: Your slot {parking_id} has now expired."
+    return f"Reminder: Your slot {parking_id} expired {offset} minutes ago."
+
+
+def reminder_session_key(reminder: dict) -> str:
+    """
+    Returns the '<parking_id>#<entry_key>' session a schedule item belongs to.
+    Items written before 'session_key' was stored carry it only as the prefix
+    of their reminder_id.
+    """
+    return reminder.get('session_key') or reminder['reminder_id'].rsplit('#', 1)[0]
+
+
+def is_current_stage(reminder: dict) -> bool:
+    """Returns False for schedule items of a stage REMINDER_STAGES no longer sends."""
+    return reminder.get('stage') in dict(REMINDER_STAGES)
+
+
+def _parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _occupancy(image: dict):
+    """Returns the fields that identify one parked occupancy, or None if the image has none."""
+    if not image or image.get('status') != 'occupied':
+        return None
+    if not all(image.get(name) for name in ('parking_id', 'email', 'expected_time')):
+        return None
+    return (image['parking_id'], image.get('entry_timestamp') or image.get('vehicle_id', ''),
+            image['email'], image['expected_time'], image.get('vehicle_id'))
+
+
+def schedule_items(image: dict, not_before: datetime = None) -> list:
+    """
+    Description:
+        Builds the schedule items for one occupied slot: one per reminder
+        stage, each in the minute bucket it is due in. Stages whose minute has
+        already passed are left out.
+
+    Args:
+        image (dict): A decoded slot item.
+        not_before (datetime): Drop stages due before this minute. Defaults to now.
+
+    Returns:
+        list: Items ready for put_item; empty if the slot has no occupant
+              with an email and expected_time.
+    """
+    occupancy = _occupancy(image)
+    if not occupancy:
+        return []
+    parking_id, entry_key, email, expected_time, vehicle_id = occupancy
+    expiry = _parse_time(expected_time)
+    earliest = minute_bucket(not_before or datetime.now(timezone.utc))
+
+    items = []
+    for stage, offset in REMINDER_STAGES:
+        due = expiry + timedelta(minutes=offset)
+        bucket = minute_bucket(due)
+        if bucket < earliest:
+            continue
+        items.append({
+            'minute_bucket': bucket,
+            'reminder_id': f"{parking_id}#{entry_key}#{stage}",
+            'session_key': f"{parking_id}#{entry_key}",
+            'parking_id': parking_id,
+            'vehicle_id': vehicle_id,
+            'email': email,
+            'stage': stage,
+            'message': reminder_message(parking_id, offset),
+            'expires_at': int(due.timestamp()) + RETENTION_SECONDS
+        })
+    return items
+
+
+def _schedule_keys(image: dict) -> list:
+    """Returns the keys of every reminder an occupied slot could have scheduled."""
+    occupancy = _occupancy(image)
+    if not occupancy:
+        return []
+    parking_id, entry_key, _, expected_time, _ = occupancy
+    expiry = _parse_time(expected_time)
+    return [
+        {'minute_bucket': minute_bucket(expiry + timedelta(minutes=offset)),
+         'reminder_id': f"{parking_id}#{entry_key}#{stage}"}
+        for stage, offset in REMINDER_STAGES
+    ]
+
+
+def apply_stream_records(records: list) -> dict:
+    """
+    Description:
+        Keeps the schedule in step with the slot table's DynamoDB stream. An
+        occupancy that starts (or whose expected_time changes) gets its
+        reminders written; one that ends has them deleted, so a vehicle that
+        left is never reminded. Operations are folded per key first, so the
+        last record of a batch wins and replays are idempotent.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        dict: {'scheduled': int, 'cancelled': int}
+    """
+    operations = {}  # Format: { (minute_bucket, reminder_id): item or None }
+    for record in records:
+        old_image = stream_image(record, 'OldImage')
+        new_image = stream_image(record, 'NewImage')
+        if _occupancy(old_image) == _occupancy(new_image):
+            continue # Same occupant and deadline, or no occupant either side
+
+        for key in _schedule_keys(old_image):
+            operations[(key['minute_bucket'], key['reminder_id'])] = None
+        for item in schedule_items(new_image):
+            operations[(item['minute_bucket'], item['reminder_id'])] = item
+
+    counts = {'scheduled': 0, 'cancelled': 0}
+    with schedule_table.batch_writer() as batch:
+        for (bucket, reminder_id), item in operations.items():
+            if item is None:
+                batch.delete_item(Key={'minute_bucket': bucket, 'reminder_id': reminder_id})
+                counts['cancelled'] += 1
+            else:
+                batch.put_item(Item=item)
+                counts['scheduled'] += 1
+    return counts
+
+
+def due_reminders(moment: datetime = None, bucket: str = None) -> list:
+    """
+    Description:
+        Reads every reminder due in one minute bucket. The cost is one
+        paginated query over that bucket, independent of how many slots are
+        occupied.
+
+    Args:
+        moment (datetime): Selects the bucket of this moment. Defaults to now.
+        bucket (str): Selects this bucket directly; takes precedence over `moment`.
+
+    Returns:
+        list: Schedule items of that minute.
+    """
+    bucket = bucket or minute_bucket(moment or datetime.now(timezone.utc))
+    reminders = []
+    query_kwargs = {'KeyConditionExpression': Key('minute_bucket').eq(bucket)}
+    done = False
+    start_key = None
+    while not done:
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+        response = schedule_table.query(**query_kwargs)
+        reminders.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey', None)
+        done = start_key is None
+    return reminders
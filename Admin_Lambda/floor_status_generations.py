@@ -0,0 +1,43 @@
+import os
+import boto3
+
+from admin_module.stream_util import stream_image
+
+dynamodb = boto3.resource('dynamodb')
+# Invalidation channel of the user floor status cache (User_Lambda/floor_status_cache.py).
+# Partition key 'area_floor' (S), e.g. 'A1#F3', with a 'generation' counter
+# bumped on every change to that floor.
+GENERATION_TABLE_NAME = os.environ.get('FLOOR_STATUS_GENERATION_TABLE', 'FloorStatusGenerations')
+generation_table = dynamodb.Table(GENERATION_TABLE_NAME)
+
+
+def area_floor_key(area_number, floor_number) -> str:
+    return f"A{int(area_number)}#F{int(floor_number)}"
+
+
+def bump_generations(records: list) -> int:
+    """
+    Description:
+        Bumps the generation of every (area, floor) touched by a batch of
+        slot-table stream records, once per floor, so that warm user
+        containers drop their cached status for those floors.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        int: The number of floors whose generation was bumped.
+    """
+    floors = set()
+    for record in records:
+        for image in (stream_image(record, 'NewImage'), stream_image(record, 'OldImage')):
+            if image and 'area_number' in image and 'floor_number' in image:
+                floors.add(area_floor_key(image['area_number'], image['floor_number']))
+
+    for key in floors:
+        generation_table.update_item(
+            Key={'area_floor': key},
+            UpdateExpression='ADD generation :one',
+            ExpressionAttributeValues={':one': 1}
+        )
+    return len(floors)
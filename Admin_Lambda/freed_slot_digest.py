@@ -0,0 +1,317 @@
+import os
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+from admin_module.stream_util import stream_image
+
+# --- Configuration ---
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+
+SNS_TOPIC_ARN = "arn:aws:sns:ap-south-1:180651458429:parking-slot-notifications"
+
+# One row per (area, floor), partition key 'area_floor' (S) such as 'A1#F3'.
+# A floor publishes at most one digest per window; slots freed in between are
+# parked in 'pending_slots' and go out with the floor's next digest, or with
+# flush_pending_digests once the window has closed.
+DEBOUNCE_TABLE_NAME = os.getenv("SLOT_DIGEST_DEBOUNCE_TABLE", "SlotDigestDebounce")
+DEBOUNCE_SECONDS = int(os.getenv("SLOT_DIGEST_DEBOUNCE_SECONDS", "60"))
+PUBLISH_WORKERS = int(os.getenv("STREAM_PUBLISH_WORKERS", "8"))
+PARKING_SLOTS_TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "ParkingSlotDatabase")
+BATCH_GET_LIMIT = 100
+
+sns_client = boto3.client('sns', region_name=AWS_REGION)
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+debounce_table = dynamodb.Table(DEBOUNCE_TABLE_NAME)
+
+
+def publish_freed_slots(records: list) -> list:
+    """
+    Description:
+        Publishes one SNS digest per floor for the slots a stream batch freed.
+        Floors are published concurrently; every record of a slot lands in
+        its floor's group, so each parking_id's changes keep their stream order.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        list: Sequence numbers of the first record of each floor whose digest
+              could not be published. Records that cannot be decoded are
+              logged and skipped, since a retry would fail the same way.
+    """
+    freed_by_floor = collect_freed_slots(records)
+    failed_sequences = []
+    published = 0
+    with ThreadPoolExecutor(max_workers=PUBLISH_WORKERS) as executor:
+        futures = {executor.submit(notify_floor, floor, group['parking_ids']): floor
+                   for floor, group in freed_by_floor.items()}
+        for future in as_completed(futures):
+            area_number, floor_number = futures[future]
+            try:
+                published += future.result()
+            except Exception as e:
+                print(f"Error publishing digest for Area {area_number}, Floor {floor_number}: {e}")
+                failed_sequences.append(freed_by_floor[(area_number, floor_number)]['first_sequence'])
+
+    print(f"Published {published} digests for {sum(len(g['parking_ids']) for g in freed_by_floor.values())} freed slots.")
+    return failed_sequences
+
+
+def notify_floor(floor, parking_ids):
+    """Debounces and publishes one floor's digest. Returns 1 if a digest went out, else 0."""
+    area_number, floor_number = floor
+    parking_ids, window = debounce(area_number, floor_number, parking_ids)
+    if not parking_ids:
+        print(f"Debounced {area_number}/{floor_number}: digest held back for the next window.")
+        return 0
+    # Slots may have been taken since, or held for a waitlisted driver
+    # (the waitlist handler runs before this one on every batch)
+    parking_ids = still_free(parking_ids)
+    if not parking_ids:
+        return 0
+    try:
+        publish_digest(area_number, floor_number, parking_ids)
+    except Exception:
+        if window:
+            reopen_window(area_number, floor_number, parking_ids, *window)
+        raise
+    return 1
+
+
+def collect_freed_slots(records):
+    """
+    Groups the slots that became empty in a stream batch by (area, floor),
+    in stream order. A slot that is taken again later in the same batch is
+    dropped, since it is no longer free by the time the digest goes out.
+
+    Records that cannot be decoded (e.g. an image without area_number) are
+    logged and skipped: the failure is deterministic, so reporting them would
+    only make the stream retry them until they expire and block the shard.
+
+    Returns:
+        dict: {(area, floor): {'parking_ids': [...], 'first_sequence': str}}
+    """
+    freed = {}
+    for record in records:
+        try:
+            if record['eventName'] == 'MODIFY' or record['eventName'] == 'INSERT':
+                new_image = stream_image(record, 'NewImage')
+                old_image = stream_image(record, 'OldImage') # May be None for INSERT
+
+                if not new_image:
+                    continue # Skip if no new image data
+
+                new_status = new_image.get('status')
+                old_status = old_image.get('status') if old_image else None
+
+                parking_id = new_image.get('parking_id')
+                area_number = int(new_image.get('area_number'))
+                floor_number = int(new_image.get('floor_number'))
+
+                group = freed.setdefault((area_number, floor_number), {
+                    'parking_ids': [],
+                    'first_sequence': record['dynamodb']['SequenceNumber']
+                })
+                slots = group['parking_ids']
+                if new_status == 'empty' and (old_status != 'empty' or old_status is None):
+                    if parking_id not in slots:
+                        slots.append(parking_id)
+                elif new_status != 'empty' and parking_id in slots:
+                    slots.remove(parking_id)
+
+        except Exception as e:
+            print(f"Skipping undecodable record {record.get('dynamodb', {}).get('SequenceNumber')}: {e}")
+
+    return {floor: group for floor, group in freed.items() if group['parking_ids']}
+
+
+def debounce(area_number, floor_number, parking_ids):
+    """
+    Applies the per-floor debounce window with a conditional update. Returns
+    (slots, window): the slots to publish now (including ones held back
+    earlier), or an empty list when the floor already published within the
+    window, in which case the slots are kept for its next digest. `window`
+    is (opened_at, previously_published_at) when this call opened a new
+    window, else None.
+    """
+    if DEBOUNCE_SECONDS <= 0:
+        return parking_ids, None
+
+    key = {'area_floor': f"A{area_number}#F{floor_number}"}
+    now = int(datetime.now(timezone.utc).timestamp())
+    try:
+        response = debounce_table.update_item(
+            Key=key,
+            UpdateExpression='SET last_published_at = :now REMOVE pending_slots',
+            ConditionExpression='attribute_not_exists(last_published_at) OR last_published_at <= :window_start',
+            ExpressionAttributeValues={':now': now, ':window_start': now - DEBOUNCE_SECONDS},
+            ReturnValues='ALL_OLD'
+        )
+    except debounce_table.meta.client.exceptions.ConditionalCheckFailedException:
+        if parking_ids:
+            debounce_table.update_item(
+                Key=key,
+                UpdateExpression='ADD pending_slots :slots',
+                ExpressionAttributeValues={':slots': set(parking_ids)}
+            )
+        return [], None
+
+    previous = response.get('Attributes', {})
+    held_back = previous.get('pending_slots', set())
+    return sorted(held_back - set(parking_ids)) + list(parking_ids), (now, previous.get('last_published_at'))
+
+
+def reopen_window(area_number, floor_number, parking_ids, opened_at, previously_published_at):
+    """
+    Undoes a debounce window whose digest could not be published: restores
+    the previous publish time and keeps the slots pending, so the retried
+    batch publishes them instead of being debounced.
+    """
+    key = {'area_floor': f"A{area_number}#F{floor_number}"}
+    values = {':opened_at': opened_at, ':slots': set(parking_ids)}
+    if previously_published_at is None:
+        expression = 'REMOVE last_published_at ADD pending_slots :slots'
+    else:
+        expression = 'SET last_published_at = :previous ADD pending_slots :slots'
+        values[':previous'] = previously_published_at
+    try:
+        debounce_table.update_item(
+            Key=key,
+            UpdateExpression=expression,
+            ConditionExpression='last_published_at = :opened_at',
+            ExpressionAttributeValues=values
+        )
+    except debounce_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass # Another batch already published this floor since
+
+
+def still_free(parking_ids) -> list:
+    """
+    Returns the given slots that are still empty and not held for a waitlisted
+    driver, in the given order, so a late digest never announces a taken slot.
+    """
+    free = set()
+    keys = sorted(set(parking_ids))
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request = {PARKING_SLOTS_TABLE_NAME: {
+            'Keys': [{'parking_id': parking_id} for parking_id in keys[start:start + BATCH_GET_LIMIT]],
+            'ProjectionExpression': 'parking_id, #status, held_for',
+            'ExpressionAttributeNames': {'#status': 'status'}
+        }}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(PARKING_SLOTS_TABLE_NAME, []):
+                if item.get('status') == 'empty' and not item.get('held_for'):
+                    free.add(item['parking_id'])
+            request = response.get('UnprocessedKeys') or None
+    return [parking_id for parking_id in parking_ids if parking_id in free]
+
+
+def _claim_pending(key: dict, now: int):
+    """
+    Opens a new window for a floor whose pending slots outlived the last one.
+    Returns (pending slots, window) as debounce does, or ([], None) if a
+    stream batch published the floor in the meantime.
+    """
+    try:
+        response = debounce_table.update_item(
+            Key=key,
+            UpdateExpression='SET last_published_at = :now REMOVE pending_slots',
+            ConditionExpression='attribute_exists(pending_slots) AND last_published_at <= :window_start',
+            ExpressionAttributeValues={':now': now, ':window_start': now - DEBOUNCE_SECONDS},
+            ReturnValues='ALL_OLD'
+        )
+    except debounce_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return [], None
+    previous = response.get('Attributes', {})
+    return sorted(previous.get('pending_slots', set())), (now, previous.get('last_published_at'))
+
+
+def flush_pending_digests() -> dict:
+    """
+    Description:
+        Trailing edge of the debounce window. Slots freed inside a window are
+        otherwise only published when the floor frees another slot after it,
+        which may never happen. Every floor whose window has closed with
+        slots still pending gets its digest now, minus the slots that were
+        taken again meanwhile. The debounce table holds one row per floor,
+        so a filtered scan stays small.
+
+    Returns:
+        dict: {'published': int, 'dropped': int, 'failed': int}; 'dropped'
+              counts pending slots that were no longer free.
+    """
+    now = int(datetime.now(timezone.utc).timestamp())
+    counts = {'published': 0, 'dropped': 0, 'failed': 0}
+
+    scan_kwargs = {
+        'FilterExpression': Attr('pending_slots').exists() & Attr('last_published_at').lte(now - DEBOUNCE_SECONDS)
+    }
+    done = False
+    start_key = None
+    while not done:
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+        response = debounce_table.scan(**scan_kwargs)
+
+        for row in response.get('Items', []):
+            area_part, floor_part = row['area_floor'].split('#')
+            area_number, floor_number = int(area_part[1:]), int(floor_part[1:])
+            pending, window = _claim_pending({'area_floor': row['area_floor']}, now)
+            if not pending:
+                continue
+            parking_ids = still_free(pending)
+            counts['dropped'] += len(pending) - len(parking_ids)
+            if not parking_ids:
+                continue
+            try:
+                publish_digest(area_number, floor_number, parking_ids)
+                counts['published'] += 1
+            except Exception as e:
+                print(f"Error flushing digest for Area {area_number}, Floor {floor_number}: {e}")
+                reopen_window(area_number, floor_number, parking_ids, *window)
+                counts['failed'] += 1
+
+        start_key = response.get('LastEvaluatedKey', None)
+        done = start_key is None
+
+    return counts
+
+
+def publish_digest(area_number, floor_number, parking_ids):
+    """Publishes one SNS message listing every slot freed on a floor."""
+    if len(parking_ids) == 1:
+        message = (
+            f"🎉 Parking Alert! A slot is now FREE! 🎉\n\n"
+            f"Slot ID: {parking_ids[0]}\n"
+        )
+        subject = f"Parking Slot FREE: Area {area_number}, Floor {floor_number}"
+    else:
+        message = (
+            f"🎉 Parking Alert! {len(parking_ids)} slots are now FREE! 🎉\n\n"
+            f"Slot IDs: {', '.join(parking_ids)}\n"
+        )
+        subject = f"{len(parking_ids)} Parking Slots FREE: Area {area_number}, Floor {floor_number}"
+    message += (
+        f"Area: {area_number}\n"
+        f"Floor: {floor_number}\n\n"
+        f"Visit our app/website quickly to grab it!\n"
+        f"This message was sent to all subscribers for Area {area_number}, Floor {floor_number}."
+    )
+
+    sns_client.publish(
+        TopicArn=SNS_TOPIC_ARN,
+        Message=message,
+        Subject=subject,
+        MessageAttributes={
+            'area_number':   {'DataType': 'String', 'StringValue': str(area_number)},
+            'floor_number':  {'DataType': 'String', 'StringValue': str(floor_number)},
+            # Matched by the per-address filter policies of Notification.py's registry
+            'area_floor':    {'DataType': 'String', 'StringValue': f"A{area_number}#F{floor_number}"},
+            'status_change': {'DataType': 'String', 'StringValue': 'became_empty'},
+            'freed_count':   {'DataType': 'Number', 'StringValue': str(len(parking_ids))}
+        }
+    )
+    print(f"Published digest for {len(parking_ids)} slots becoming empty (Area {area_number}, Floor {floor_number}).")
@@ -2,6 +2,10 @@ import os
 import json
 import boto3
 from decimal import Decimal
+from admin_module.occupancy_counters import COUNTER_ATTRIBUTES, read_area_counters, read_floor_counters
+from admin_module.slot_change_feed import current_version
+from admin_module.compact_snapshot import COMPACT_ATTRIBUTES, encode_compact, accepts_gzip, gzip_body
+from admin_module.scan_util import parallel_scan, ScanStats
 
 
 try:
@@ -24,29 +28,54 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(o)
 
 
+def _scan_all_slots(attributes=None):
+    # Segmented parallel scan; the generator is consumed directly by the caller
+    stats = ScanStats()
+    yield from parallel_scan(PARKING_SLOT_TABLE, projection=attributes, stats=stats)
+    print(f"Slot scan stats: {stats.as_dict()}")
+
+
+def _counts(row):
+    return {attribute: int(row.get(attribute, 0)) for attribute in COUNTER_ATTRIBUTES}
+
+
 def lambda_handler(event, context):
     """
-    Fetches all parking slots, calculates overall statistics, and returns
-    the data in the format expected by the front-end dashboard.
+    Returns the dashboard statistics from the materialized occupancy counters
+    (one query over the per-area rows, independent of the slot count).
+
+    Optional query string parameter 'detail' (comma separated):
+        'floors' -> adds the per-floor counters to every area
+        'slots'  -> adds the full list of individual slots (full table scan)
+                    and the change-feed 'version' the list is current as of,
+                    to be used as the first 'since' cursor for delta sync
+
+    Optional query string parameter 'format':
+        'compact' -> with detail=slots, returns 'snapshot' (see
+                     compact_snapshot.encode_compact) instead of 'slots'
+
+    Responses carrying slots are gzip-compressed when the client accepts it.
     """
     try:
-        
-        response = PARKING_SLOT_TABLE.scan()
-        slot_items = response.get('Items', [])
-        
-        # Handle pagination if the table is large
-        while 'LastEvaluatedKey' in response:
-            response = PARKING_SLOT_TABLE.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            slot_items.extend(response.get('Items', []))
+        params = (event or {}).get('queryStringParameters') or {}
+        detail = {part.strip() for part in (params.get('detail') or '').split(',') if part.strip()}
+        compact = params.get('format') == 'compact'
+
+        # --- 1. Read the per-area counters ---
+        area_rows = read_area_counters()
+        areas = []
+        for row in area_rows:
+            area = {'area_number': int(row['area_number']), **_counts(row)}
+            if 'floors' in detail:
+                area['floors'] = [
+                    {'floor_number': int(floor_row['floor_number']), **_counts(floor_row)}
+                    for floor_row in read_floor_counters(area['area_number'])
+                ]
+            areas.append(area)
 
         # --- 2. Calculate Statistics ---
-        total_spots = len(slot_items)
-        occupied_spots = 0
-        
-        # Count occupied spots by iterating through the fetched items
-        for slot in slot_items:
-            if slot.get('status') == 'occupied':
-                occupied_spots += 1
+        total_spots = sum(area['total_slots'] for area in areas)
+        occupied_spots = sum(area['occupied_slots'] for area in areas)
         
         available_spots = total_spots - occupied_spots
         
@@ -54,26 +83,45 @@ def lambda_handler(event, context):
         occupancy_rate = (occupied_spots / total_spots * 100) if total_spots > 0 else 0
 
         # --- 3. Assemble the final data structure ---
-        # This structure now matches exactly what the JavaScript expects
         final_data = {
             'total_spots': total_spots,
             'occupied_spots': occupied_spots,
             'available_spots': available_spots,
+            'empty_spots': sum(area['empty_slots'] for area in areas),
+            'maintenance_spots': sum(area['maintenance_slots'] for area in areas),
             'occupancy_rate': occupancy_rate,
-            'slots': slot_items  # Include the full list of individual slots
+            'areas': areas
         }
+        if 'slots' in detail:
+            # Read before the scan so that no change after the snapshot can be missed
+            final_data['version'] = current_version()
+            if compact:
+                final_data['snapshot'] = encode_compact(_scan_all_slots(COMPACT_ATTRIBUTES))
+            else:
+                final_data['slots'] = list(_scan_all_slots())  # Opt-in: the full list of individual slots
 
         # --- 4. Return the successful response ---
-        return {
+        if compact:
+            # The compact snapshot holds plain ints and strings only, so it skips the DecimalEncoder
+            body = json.dumps(final_data, separators=(',', ':'))
+        else:
+            body = json.dumps(final_data, cls=DecimalEncoder)
+
+        response = {
             "statusCode": 200,
             "headers": {
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,GET"
+                "Access-Control-Allow-Methods": "OPTIONS,GET",
+                "Content-Type": "application/json"
             },
-            # The body is now the correctly structured final_data object
-            "body": json.dumps(final_data, cls=DecimalEncoder)
+            "body": body
         }
+        if 'slots' in detail and accepts_gzip(event):
+            response['headers']['Content-Encoding'] = 'gzip'
+            response['body'] = gzip_body(response['body'])
+            response['isBase64Encoded'] = True
+        return response
 
     except Exception as e:
         # Log the full error for debugging purposes
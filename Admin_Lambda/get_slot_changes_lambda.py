@@ -0,0 +1,68 @@
+import json
+from decimal import Decimal
+
+from admin_module.slot_change_feed import read_changes, PAGE_SIZE
+
+HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Allow-Methods": "OPTIONS,GET"
+}
+
+def decimal_serializer(obj):
+    """Custom JSON serializer for Decimal objects."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def lambda_handler(event, context):
+    """
+    Returns the slots that changed since a version cursor, so dashboards can
+    poll with a cost proportional to churn instead of garage size.
+
+    Query string parameters:
+        since (required): the 'version' of the client's snapshot
+                          (get_parking_status with detail=slots) or the
+                          'cursor' returned by the previous call.
+        limit (optional): maximum number of changes per call.
+
+    Response body:
+        {
+            "changes": [{"version": 42, "parking_id": "A1F1S3", "slot": {...}},
+                        {"version": 43, "parking_id": "A1F1S9", "deleted": true}],
+            "cursor": 43,
+            "has_more": false,
+            "resync": false   // true -> reload the full snapshot
+        }
+    """
+    try:
+        params = (event or {}).get('queryStringParameters') or {}
+        try:
+            since = int(params['since'])
+            limit = min(int(params.get('limit') or PAGE_SIZE), PAGE_SIZE)
+        except (KeyError, TypeError, ValueError):
+            return {
+                'statusCode': 400,
+                'headers': HEADERS,
+                'body': json.dumps({'error': "Query parameter 'since' must be an integer version."})
+            }
+        if since < 0 or limit < 1:
+            return {
+                'statusCode': 400,
+                'headers': HEADERS,
+                'body': json.dumps({'error': "'since' must not be negative and 'limit' must be positive."})
+            }
+
+        result = read_changes(since, limit)
+        return {
+            'statusCode': 200,
+            'headers': HEADERS,
+            'body': json.dumps(result, default=decimal_serializer)
+        }
+    except Exception as e:
+        print(f"An unexpected error occurred: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': HEADERS,
+            'body': json.dumps({'error': "An internal server error occurred."})
+        }
@@ -9,12 +9,14 @@ def lambda_handler(event, context):
     Description:
         Handles an API Gateway event to initialize the entire parking system.
         It ensures the DynamoDB table exists (creating it if necessary) and then
-        populates it with slots based on the provided layout.
+        populates it with slots based on the provided layout. The response
+        carries a per-area summary; the created slot items are only returned
+        when 'include_slots' is true.
 
     Expected event input format:
         The event body must be a JSON string containing a 'parking_layout' key.
         {
-            "body": "{ \\"parking_layout\\": [ {\\"area\\": 1, \\"floors\\": 5, \\"slots_per_floor\\": 20} ] }"
+            "body": "{ \\"parking_layout\\": [ {\\"area\\": 1, \\"floors\\": 5, \\"slots_per_floor\\": 20} ], \\"include_slots\\": false }"
         }
     """
     try:
@@ -26,11 +28,13 @@ def lambda_handler(event, context):
         if not parking_layout or not isinstance(parking_layout, list):
             raise ValueError("Input must contain a 'parking_layout' list.")
 
-        created_slots = _initialize_system(table_name, parking_layout)
+        include_slots = body.get('include_slots', False) is True
+
+        result = _initialize_system(table_name, parking_layout, include_slots=include_slots)
 
         # --- ADMIN LOGGING ---
         log_details = {
-            "created_count": len(created_slots),
+            "created_count": result['created_count'],
             "input_layout": parking_layout
         }
         create_admin_log(action="SystemInitialize", details=log_details)
@@ -44,8 +48,8 @@ def lambda_handler(event, context):
                 "Access-Control-Allow-Methods": "OPTIONS,POST"
             },
             'body': json.dumps({
-                'message': f"System initialized successfully. {len(created_slots)} slots created.",
-                'created_slots': created_slots
+                'message': f"System initialized successfully. {result['created_count']} slots created.",
+                **result
             })
         }
     except (ValueError, TypeError) as e:
@@ -5,6 +5,9 @@ from decimal import Decimal
 from botocore.exceptions import ClientError
 
 from admin_module.manual_override_util import prepare_manual_entry
+from admin_module.slot_allocator import claim_slot
+from admin_module.parking_session import VehicleAlreadyParkedError
+from admin_module.slot_keys import INDEX_ATTRIBUTE_NAMES
 from admin_module.logging_util import create_admin_log
 
 dynamodb = boto3.resource('dynamodb')
@@ -35,19 +38,22 @@ def lambda_handler(event, context):
         expected_time_minutes = body['expected_time_minutes']
         
         # Step 1: Fetch current slot data
-        response = table.get_item(Key={'parking_id': parking_id})
+        response = table.get_item(Key={'parking_id': parking_id}, ConsistentRead=True)
         slot_data = response.get('Item')
 
-        # Step 2: Prepare update parameters
-        update_params = prepare_manual_entry(
+        # Step 2: Prepare the occupant attributes
+        occupant = prepare_manual_entry(
             slot_data, email, vehicle_id, expected_time_minutes
         )
         
-        # Step 3: Execute the update
-        updated_item = table.update_item(
-            Key={'parking_id': parking_id},
-            **update_params
-        )
+        # Step 3: Claim the slot and open the vehicle's session together
+        try:
+            if not claim_slot(table, slot_data, occupant):
+                raise ValueError("Slot is no longer empty.")
+        except VehicleAlreadyParkedError as e:
+            raise ValueError(str(e)) from e
+        updated_item = {k: v for k, v in {**slot_data, **occupant}.items() if k not in INDEX_ATTRIBUTE_NAMES}
+        updated_item['status'] = 'occupied'
         
         # Step 4: Log the admin action
         log_details = {
@@ -64,7 +70,7 @@ def lambda_handler(event, context):
                 "Access-Control-Allow-Headers": "Content-Type",
                 "Access-Control-Allow-Methods": "OPTIONS,POST"
             },
-            'body': json.dumps(updated_item.get('Attributes'), default=decimal_serializer)
+            'body': json.dumps(updated_item, default=decimal_serializer)
         }
         
     except (KeyError, TypeError) as e:
@@ -2,10 +2,8 @@ import json
 import os
 import boto3
 from botocore.exceptions import ClientError
-from datetime import datetime, timezone
-from admin_module.manual_override_util import prepare_manual_exit
+from admin_module.parking_session import release_slot, session_from_slot
 from admin_module.logging_util import create_admin_log
-import uuid 
 # Initialize the DynamoDB client once for reuse
 dynamodb = boto3.resource('dynamodb')
 
@@ -24,46 +22,14 @@ def lambda_handler(event, context):
         parking_id = body['parking_id']
         
         # Step 1: Fetch current slot data from DynamoDB
-        response = table.get_item(Key={'parking_id': parking_id})
+        response = table.get_item(Key={'parking_id': parking_id}, ConsistentRead=True)
         slot_data = response.get('Item')
         
-        # Step 2: Call core logic to validate and prepare update parameters
-        update_params = prepare_manual_exit(slot_data)
+        # Step 2: Free the slot and record the session in one transaction.
+        # Validation errors (slot missing / not occupied) surface as ValueError.
+        release_slot(table, logs_table, session_from_slot(slot_data))
         
-        # Step 3: Execute the update in DynamoDB
-        table.update_item(
-            Key={'parking_id': parking_id},
-            **update_params
-        )
-        if slot_data:
-            exit_dt = datetime.now(timezone.utc)
-            exit_timestamp = exit_dt.isoformat()
-            date = exit_dt.strftime('%Y-%m-%d')
-            
-            duration_minutes = None
-            entry_timestamp_str = slot_data.get('entry_timestamp')
-            if entry_timestamp_str:
-                duration = exit_dt - datetime.fromisoformat(entry_timestamp_str)
-                duration_minutes = int(duration.total_seconds() / 60)
-
-            log_item = {
-                'session_id': str(uuid.uuid4()),
-                'date': date,
-                'exit_timestamp': exit_timestamp,
-                'area_id': slot_data.get('area_number'),
-                'vehicle_id': slot_data.get('vehicle_id'),
-                'parking_id': parking_id,
-                'entry_timestamp': entry_timestamp_str,
-                'duration_minutes': duration_minutes,
-                'floor_number': slot_data.get('floor_number'),
-                'email': slot_data.get('email')
-            }
-            
-            # Remove any keys with None values to prevent DynamoDB errors
-            final_log_item = {k: v for k, v in log_item.items() if v is not None}
-            logs_table.put_item(Item=final_log_item)
-        
-        # Step 4: Log the admin action
+        # Step 3: Log the admin action
         # We use the vehicle_id from the data we fetched *before* the update
         log_details = {
             'parking_id': parking_id,
@@ -89,7 +55,7 @@ def lambda_handler(event, context):
                 "Access-Control-Allow-Methods": "OPTIONS,POST"
             },
             'body': json.dumps({'error': f"Bad Request: Missing or invalid parameter - {str(e)}"}) }
-    except ValueError as e: # Catches validation errors from prepare_manual_exit
+    except ValueError as e: # Catches validation errors from session_from_slot / release_slot
         return {'statusCode': 409,
             "headers": {
                 "Access-Control-Allow-Origin": "*",
@@ -1,60 +1,35 @@
-import json
-import boto3
-import os
-from datetime import datetime, timezone
+from admin_module.stream_router import StreamRouter
+from admin_module.slot_change_feed import record_changes
+from admin_module.occupancy_counters import apply_stream_records as apply_counter_changes
+from admin_module.occupancy_checkpoint import apply_stream_records as apply_occupancy_changes
+from admin_module.expiry_schedule import apply_stream_records as apply_expiry_schedule
+from admin_module.floor_status_generations import bump_generations
+from admin_module.freed_slot_digest import publish_freed_slots
+from admin_module.waitlist import offer_freed_slots
+
+
+# The only consumer of the slot table's stream (NEW_AND_OLD_IMAGES). Every view
+# derived from slot changes is a handler here rather than another Lambda
+# reading the same shards.
+router = StreamRouter('slot-stream')
+router.register('change_feed', record_changes)
+router.register('occupancy_counters', apply_counter_changes)
+router.register('realtime_occupancy', apply_occupancy_changes)
+router.register('expiry_schedule', apply_expiry_schedule)
+router.register('floor_status_generations', bump_generations)
+router.register('waitlist_offers', offer_freed_slots)
+# The digests run after the waitlist, so slots it holds are not announced
+router.register('freed_slot_digests', publish_freed_slots, reports_failures=True, after='waitlist_offers')
 
-# --- Configuration ---
-AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-
-SNS_TOPIC_ARN = "arn:aws:sns:ap-south-1:180651458429:parking-slot-notifications"
-
-sns_client = boto3.client('sns', region_name=AWS_REGION)
 
 def lambda_handler(event, context):
-    print(f"Processing {len(event['Records'])} records from DynamoDB stream.")
-    for record in event['Records']:
-        try:
-            if record['eventName'] == 'MODIFY' or record['eventName'] == 'INSERT':
-                new_image = record['dynamodb'].get('NewImage')
-                old_image = record['dynamodb'].get('OldImage') # May be None for INSERT
-
-                if not new_image:
-                    continue # Skip if no new image data
-
-                new_status = new_image.get('status', {}).get('S')
-                old_status = old_image.get('status', {}).get('S') if old_image else None
-
-                parking_id = new_image.get('parking_id', {}).get('S')
-                area_number = int(new_image.get('area_number', {}).get('N')) # Convert to int
-                floor_number = int(new_image.get('floor_number', {}).get('N')) # Convert to int
-
-                if new_status == 'empty' and (old_status != 'empty' or old_status is None):
-                    message = (
-                        f"🎉 Parking Alert! A slot is now FREE! 🎉\n\n"
-                        f"Slot ID: {parking_id}\n"
-                        f"Area: {area_number}\n"
-                        f"Floor: {floor_number}\n\n"
-                        f"Visit our app/website quickly to grab it!\n"
-                        f"This message was sent to all subscribers for Area {area_number}, Floor {floor_number}."
-                    )
-                    subject = f"Parking Slot FREE: Area {area_number}, Floor {floor_number}"
-                    
-                    sns_client.publish(
-                        TopicArn=SNS_TOPIC_ARN,
-                        Message=message,
-                        Subject=subject,
-                        MessageAttributes={
-                            'area_number':   {'DataType': 'String', 'StringValue': str(area_number)},
-                            'floor_number':  {'DataType': 'String', 'StringValue': str(floor_number)},
-                            'status_change': {'DataType': 'String', 'StringValue': 'became_empty'}
-                        }
-                    )
-                    print(f"Published notification for {parking_id} becoming empty (Area {area_number}, Floor {floor_number}).")
-
-            
-
-        except Exception as e:
-            print(f"Error processing record: {record}. Error: {e}")
-
-    return {'statusCode': 200, 'body': 'Processed DynamoDB stream records.'}
-
+    """
+    Consumes the slot table's stream and fans every batch out to the
+    registered handlers (see admin_module.stream_router). Returns a partial
+    batch response ('batchItemFailures', keyed by stream sequence number);
+    the event source mapping must enable ReportBatchItemFailures so that
+    only failed records are retried.
+    """
+    records = event.get('Records', [])
+    print(f"Processing {len(records)} records from DynamoDB stream.")
+    return router.process(records)
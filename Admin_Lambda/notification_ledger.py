@@ -0,0 +1,158 @@
+import os
+import time
+import uuid
+import boto3
+
+dynamodb = boto3.resource('dynamodb')
+
+# Durable record of which notification stages were sent for which session.
+# Partition key 'session_key' (S, e.g. '<parking_id>#<entry_timestamp>'),
+# sort key 'stage' (S, e.g. 'T-10'). A stage is claimed with a conditional put
+# before it is sent, so concurrent or overlapping senders send it once.
+# Entries expire through the 'expires_at' TTL. Sender checkpoints live in the
+# same table under CHECKPOINT_SESSION_KEY, one item per sender.
+LEDGER_TABLE_NAME = os.environ.get('NOTIFICATION_LEDGER_TABLE', 'NotificationLedger')
+ledger_table = dynamodb.Table(LEDGER_TABLE_NAME)
+
+CHECKPOINT_SESSION_KEY = '#checkpoint'
+RETENTION_SECONDS = int(os.environ.get('NOTIFICATION_LEDGER_RETENTION', str(7 * 24 * 3600)))
+# A claim that was never confirmed (the sender died mid-send) may be re-taken after
+# this long. Senders renew it right before each send (see renew), so it only has
+# to cover one send, not the whole dispatch.
+CLAIM_LEASE_SECONDS = int(os.environ.get('NOTIFICATION_CLAIM_LEASE_SECONDS', '120'))
+
+CLAIMED = 'claimed'
+QUEUED = 'queued'
+SENT = 'sent'
+
+
+def claim(session_key: str, stage: str, details: dict = None):
+    """
+    Description:
+        Claims one notification stage for sending. Succeeds if the stage has
+        never been claimed, or if an earlier claim was neither confirmed nor
+        released nor renewed within CLAIM_LEASE_SECONDS.
+
+    Args:
+        session_key (str): Identifies the parking session.
+        stage (str): The notification stage, e.g. 'T-10'.
+        details (dict): Optional attributes to store with the entry, e.g. email.
+
+    Returns:
+        str | None: The claim id if the caller now owns the stage and must
+                    send it (pass it to renew), None if it was already sent
+                    or is being sent by someone else.
+    """
+    now = int(time.time())
+    claim_id = uuid.uuid4().hex
+    try:
+        ledger_table.put_item(
+            Item={
+                **(details or {}),
+                'session_key': session_key,
+                'stage': stage,
+                'state': CLAIMED,
+                'claim_id': claim_id,
+                'claimed_at': now,
+                'expires_at': now + RETENTION_SECONDS
+            },
+            ConditionExpression='attribute_not_exists(stage) OR (#state = :claimed AND claimed_at < :lease_expired)',
+            ExpressionAttributeNames={'#state': 'state'},
+            ExpressionAttributeValues={':claimed': CLAIMED, ':lease_expired': now - CLAIM_LEASE_SECONDS}
+        )
+        return claim_id
+    except ledger_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+
+
+def renew(session_key: str, stage: str, claim_id: str) -> bool:
+    """
+    Restarts the lease of a claim right before it is sent. Fails if the
+    claim has lapsed and was taken over by another sender, which then owns
+    the send; the caller must not send it. Queued entries carry no lease,
+    so renewing one only checks that it is still this claim.
+    """
+    now = int(time.time())
+    try:
+        ledger_table.update_item(
+            Key={'session_key': session_key, 'stage': stage},
+            UpdateExpression='SET claimed_at = :now',
+            ConditionExpression='claim_id = :claim_id AND #state IN (:claimed, :queued)',
+            ExpressionAttributeNames={'#state': 'state'},
+            ExpressionAttributeValues={':now': now, ':claim_id': claim_id, ':claimed': CLAIMED, ':queued': QUEUED}
+        )
+        return True
+    except ledger_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def confirm(session_key: str, stage: str) -> None:
+    """Marks a claimed stage as sent; it will never be claimed again."""
+    ledger_table.update_item(
+        Key={'session_key': session_key, 'stage': stage},
+        UpdateExpression='SET #state = :sent, sent_at = :now',
+        ExpressionAttributeNames={'#state': 'state'},
+        ExpressionAttributeValues={':sent': SENT, ':now': int(time.time())}
+    )
+
+
+def mark_queued(session_key: str, stage: str) -> None:
+    """
+    Hands a claimed stage over to a queued send. Unlike a claim, a queued
+    entry has no lease: the queue message owns it until it is confirmed or
+    released, so a later sender cannot send the stage a second time.
+    """
+    ledger_table.update_item(
+        Key={'session_key': session_key, 'stage': stage},
+        UpdateExpression='SET #state = :queued, queued_at = :now',
+        ExpressionAttributeNames={'#state': 'state'},
+        ExpressionAttributeValues={':queued': QUEUED, ':now': int(time.time())}
+    )
+
+
+def release(session_key: str, stage: str) -> None:
+    """Drops an unconfirmed claim after a failed send, so the next attempt can retry it."""
+    try:
+        ledger_table.delete_item(
+            Key={'session_key': session_key, 'stage': stage},
+            ConditionExpression='#state IN (:claimed, :queued)',
+            ExpressionAttributeNames={'#state': 'state'},
+            ExpressionAttributeValues={':claimed': CLAIMED, ':queued': QUEUED}
+        )
+    except ledger_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+
+def read_checkpoint(sender: str):
+    """Returns the last position a sender fully processed, or None if it has none."""
+    item = ledger_table.get_item(
+        Key={'session_key': CHECKPOINT_SESSION_KEY, 'stage': sender},
+        ConsistentRead=True
+    ).get('Item')
+    return item.get('position') if item else None
+
+
+def advance_checkpoint(sender: str, position: str) -> bool:
+    """
+    Moves a sender's checkpoint forward to `position`. Positions compare as
+    strings, and the write is conditional, so an overlapping invocation that
+    finished an older position cannot move the checkpoint backwards.
+
+    Returns:
+        bool: True if the checkpoint moved.
+    """
+    try:
+        ledger_table.put_item(
+            Item={
+                'session_key': CHECKPOINT_SESSION_KEY,
+                'stage': sender,
+                'position': position,
+                'updated_at': int(time.time())
+            },
+            ConditionExpression='attribute_not_exists(#position) OR #position < :position',
+            ExpressionAttributeNames={'#position': 'position'},
+            ExpressionAttributeValues={':position': position}
+        )
+        return True
+    except ledger_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
@@ -0,0 +1,120 @@
+import os
+import time
+import random
+import boto3
+
+from admin_module.real_time_util import OccupancyAggregator
+from admin_module.stream_util import stream_image
+
+dynamodb = boto3.resource('dynamodb')
+# Partition key 'checkpoint_id' (S):
+#   'realtime-occupancy'  -> the per-area state, with a 'revision' counter
+#   'APPLIED#<eventID>'   -> marker of a stream record already applied
+# Markers expire through the 'expires_at' TTL.
+CHECKPOINT_TABLE_NAME = os.environ.get('OCCUPANCY_CHECKPOINT_TABLE', 'OccupancyAggregatorCheckpoints')
+CHECKPOINT_ID = 'realtime-occupancy'
+APPLIED_PREFIX = 'APPLIED#'
+MARKER_RETENTION_SECONDS = int(os.environ.get('OCCUPANCY_MARKER_RETENTION', str(2 * 24 * 3600)))
+# Every shard writes the same item, so lost races are retried with jittered backoff
+MAX_SAVE_ATTEMPTS = 10
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+# One transaction holds the state item and a marker per record
+MAX_RECORDS_PER_SAVE = 99
+checkpoint_table = dynamodb.Table(CHECKPOINT_TABLE_NAME)
+
+
+def load_checkpoint():
+    item = checkpoint_table.get_item(Key={'checkpoint_id': CHECKPOINT_ID}, ConsistentRead=True).get('Item') or {}
+    return OccupancyAggregator.from_checkpoint(item.get('areas')), int(item.get('revision', 0))
+
+
+def rebuild_checkpoint(areas: dict) -> None:
+    """
+    Overwrites the checkpoint with per-area state recomputed from a full
+    read of the slot table (occupancy_vectorized.area_occupancy_state).
+    Seeds the state for an existing table and reconciles it after a change
+    in how slots are counted.
+    """
+    aggregator = OccupancyAggregator(areas)
+    _, revision = load_checkpoint()
+    checkpoint_table.put_item(
+        Item={'checkpoint_id': CHECKPOINT_ID, 'revision': revision + 1, 'areas': aggregator.to_checkpoint()}
+    )
+
+
+def _apply_chunk(changes: list) -> int:
+    """
+    Applies one group of (eventID, old image, new image) changes: the new
+    state and a marker per record are written in a single transaction,
+    conditional on the revision that was loaded. Records whose marker
+    already exists were applied by an earlier delivery; they are dropped and
+    the rest re-applied. Returns the number of records applied.
+    """
+    client = dynamodb.meta.client
+    attempt = 0
+    while changes:
+        aggregator, revision = load_checkpoint()
+        for _, old_item, new_item in changes:
+            aggregator.apply_change(old_item, new_item)
+        expires_at = int(time.time()) + MARKER_RETENTION_SECONDS
+        state = {
+            'Put': {
+                'TableName': CHECKPOINT_TABLE_NAME,
+                'Item': {'checkpoint_id': CHECKPOINT_ID, 'revision': revision + 1, 'areas': aggregator.to_checkpoint()},
+                'ConditionExpression': 'attribute_not_exists(checkpoint_id) OR revision = :revision',
+                'ExpressionAttributeValues': {':revision': revision}
+            }
+        }
+        markers = [{
+            'Put': {
+                'TableName': CHECKPOINT_TABLE_NAME,
+                'Item': {'checkpoint_id': f"{APPLIED_PREFIX}{event_id}", 'expires_at': expires_at},
+                'ConditionExpression': 'attribute_not_exists(checkpoint_id)'
+            }
+        } for event_id, _, _ in changes]
+        try:
+            client.transact_write_items(TransactItems=[state] + markers)
+            print(f"Applied {len(changes)} slot changes at checkpoint revision {revision + 1}.")
+            return len(changes)
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            applied = {index - 1 for index, code in enumerate(reasons) if index and code == 'ConditionalCheckFailed'}
+            if applied:
+                changes = [change for index, change in enumerate(changes) if index not in applied]
+                continue
+            if not reasons or reasons[0] != 'ConditionalCheckFailed':
+                raise
+        attempt += 1
+        if attempt >= MAX_SAVE_ATTEMPTS:
+            raise RuntimeError(f"Could not save the occupancy checkpoint after {MAX_SAVE_ATTEMPTS} attempts.")
+        print(f"Checkpoint revision {revision} was superseded (attempt {attempt}/{MAX_SAVE_ATTEMPTS}), retrying.")
+        time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+    return 0
+
+
+def apply_stream_records(records: list) -> int:
+    """
+    Description:
+        Applies a batch of slot-table stream records to the checkpointed
+        per-area state as deltas, so no invocation ever reads the full slot
+        list. Each save also writes a marker per record (its eventID), and
+        records whose marker exists are skipped, so a batch redelivered
+        after a failure is not counted twice. Concurrent shards are
+        serialized by a revision check on the checkpoint; the loser backs
+        off, reloads and re-applies its records.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        int: The number of records applied by this call.
+
+    Raises:
+        RuntimeError: If every save attempt lost its race, so that the batch
+                      is delivered again.
+    """
+    changes = [(record['eventID'], stream_image(record, 'OldImage'), stream_image(record, 'NewImage'))
+               for record in records]
+    return sum(_apply_chunk(changes[start:start + MAX_RECORDS_PER_SAVE])
+               for start in range(0, len(changes), MAX_RECORDS_PER_SAVE))
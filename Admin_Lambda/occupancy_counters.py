@@ -0,0 +1,269 @@
+import os
+import time
+import boto3
+from collections import defaultdict
+from boto3.dynamodb.conditions import Key, Attr
+
+from admin_module.stream_util import stream_image
+
+dynamodb = boto3.resource('dynamodb')
+
+# Materialized slot counts, maintained from the slot table's DynamoDB stream.
+# Partition key 'counter_group' (S), sort key 'counter_id' (S):
+#   'AREA'         / 'A0001' -> totals of area 1
+#   'FLOOR#A0001'  / 'F0003' -> totals of area 1, floor 3
+#   'APPLIED'      / '<stream eventID>' -> marker of a stream record already counted
+# Summing the 'AREA' group gives the site totals, so a dashboard summary is a
+# single query whose size depends on the number of areas, not of slots.
+# Markers expire through the 'expires_at' TTL.
+COUNTERS_TABLE_NAME = os.environ.get('OCCUPANCY_COUNTERS_TABLE', 'ParkingOccupancyCounters')
+counters_table = dynamodb.Table(COUNTERS_TABLE_NAME)
+
+AREA_GROUP = 'AREA'
+APPLIED_GROUP = 'APPLIED'
+MARKER_RETENTION_SECONDS = int(os.environ.get('OCCUPANCY_MARKER_RETENTION', str(2 * 24 * 3600)))
+MAX_TRANSACTION_ITEMS = 100
+COUNTED_STATUSES = ('empty', 'occupied', 'maintenance')
+COUNTER_ATTRIBUTES = ('total_slots',) + tuple(f"{status}_slots" for status in COUNTED_STATUSES)
+
+
+def area_counter_key(area: int) -> dict:
+    return {'counter_group': AREA_GROUP, 'counter_id': f"A{int(area):04d}"}
+
+
+def floor_counter_key(area: int, floor: int) -> dict:
+    return {'counter_group': f"FLOOR#A{int(area):04d}", 'counter_id': f"F{int(floor):04d}"}
+
+
+def _slot_counters(slot: dict) -> list:
+    """Returns ((counter_group, counter_id), attribute) pairs that one slot counts towards."""
+    area = int(slot['area_number'])
+    floor = int(slot['floor_number'])
+    attributes = ['total_slots']
+    if slot.get('status') in COUNTED_STATUSES:
+        attributes.append(f"{slot['status']}_slots")
+
+    counters = []
+    for key in (area_counter_key(area), floor_counter_key(area, floor)):
+        for attribute in attributes:
+            counters.append(((key['counter_group'], key['counter_id']), attribute))
+    return counters
+
+
+def _counter_item(key: tuple, counts: dict) -> dict:
+    group, counter_id = key
+    item = {'counter_group': group, 'counter_id': counter_id, **counts}
+    if group == AREA_GROUP:
+        item['area_number'] = int(counter_id[1:])
+    else:
+        item['area_number'] = int(group.split('#A')[1])
+        item['floor_number'] = int(counter_id[1:])
+    return item
+
+
+def collect_deltas(records: list) -> dict:
+    """
+    Description:
+        Folds a batch of slot-table stream records into counter deltas, so a
+        batch costs one write per touched counter row rather than one per record.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        dict: { (counter_group, counter_id): { attribute: delta } }, with
+              zero deltas dropped.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        old_image = stream_image(record, 'OldImage')
+        new_image = stream_image(record, 'NewImage')
+
+        if old_image and new_image and old_image.get('status') == new_image.get('status'):
+            continue # Occupant details changed, the counts did not
+
+        if old_image:
+            for key, attribute in _slot_counters(old_image):
+                totals[key][attribute] -= 1
+        if new_image:
+            for key, attribute in _slot_counters(new_image):
+                totals[key][attribute] += 1
+
+    deltas = {}
+    for key, attributes in totals.items():
+        changed = {attribute: delta for attribute, delta in attributes.items() if delta}
+        if changed:
+            deltas[key] = changed
+    return deltas
+
+
+def _counter_update(key: tuple, attributes: dict) -> dict:
+    """Builds the transaction Update that ADDs `attributes` deltas to one counter row."""
+    item = _counter_item(key, {})
+    names = {f"#c{i}": attribute for i, attribute in enumerate(attributes)}
+    values = {f":c{i}": delta for i, delta in enumerate(attributes.values())}
+
+    # Location attributes let readers use the rows without parsing the keys
+    set_parts = ['area_number = :area_number']
+    values[':area_number'] = item['area_number']
+    if 'floor_number' in item:
+        set_parts.append('floor_number = :floor_number')
+        values[':floor_number'] = item['floor_number']
+
+    return {
+        'Update': {
+            'TableName': COUNTERS_TABLE_NAME,
+            'Key': {'counter_group': item['counter_group'], 'counter_id': item['counter_id']},
+            'UpdateExpression': 'SET ' + ', '.join(set_parts)
+                                + ' ADD ' + ', '.join(f"#c{i} :c{i}" for i in range(len(attributes))),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }
+    }
+
+
+def _merge_deltas(changes: list) -> dict:
+    merged = defaultdict(lambda: defaultdict(int))
+    for _, deltas in changes:
+        for key, attributes in deltas.items():
+            for attribute, delta in attributes.items():
+                merged[key][attribute] += delta
+    return {key: {attribute: delta for attribute, delta in attributes.items() if delta}
+            for key, attributes in merged.items() if any(attributes.values())}
+
+
+def _chunks(changes: list):
+    """Splits record changes into groups whose markers and counter rows fit in one transaction."""
+    chunk, keys = [], set()
+    for change in changes:
+        change_keys = keys | set(change[1])
+        if chunk and len(chunk) + 1 + len(change_keys) > MAX_TRANSACTION_ITEMS:
+            yield chunk
+            chunk, change_keys = [], set(change[1])
+        chunk.append(change)
+        keys = change_keys
+    if chunk:
+        yield chunk
+
+
+def _apply_chunk(changes: list) -> int:
+    """
+    Applies one group of record changes in a single transaction. Records
+    whose marker already exists were counted by an earlier delivery; they
+    are dropped and the rest retried. Returns the number of records applied.
+    """
+    client = dynamodb.meta.client
+    expires_at = int(time.time()) + MARKER_RETENTION_SECONDS
+    while changes:
+        markers = [{
+            'Put': {
+                'TableName': COUNTERS_TABLE_NAME,
+                'Item': {'counter_group': APPLIED_GROUP, 'counter_id': event_id, 'expires_at': expires_at},
+                'ConditionExpression': 'attribute_not_exists(counter_id)'
+            }
+        } for event_id, _ in changes]
+        updates = [_counter_update(key, attributes) for key, attributes in _merge_deltas(changes).items()]
+        try:
+            client.transact_write_items(TransactItems=markers + updates)
+            return len(changes)
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            counted = {index for index, code in enumerate(reasons[:len(changes)]) if code == 'ConditionalCheckFailed'}
+            if not counted:
+                raise
+            changes = [change for index, change in enumerate(changes) if index not in counted]
+    return 0
+
+
+def apply_stream_records(records: list) -> int:
+    """
+    Description:
+        Applies the counter changes of a batch of slot-table stream records
+        exactly once. Deltas are merged per counter row and written in
+        transactions together with a marker per record (its eventID); a
+        record whose marker exists is skipped, so a batch that is
+        redelivered after a failure part-way through does not count the
+        records it already applied a second time.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        int: The number of records applied by this call.
+    """
+    changes = [(record['eventID'], collect_deltas([record])) for record in records]
+    return sum(_apply_chunk(chunk) for chunk in _chunks([change for change in changes if change[1]]))
+
+
+def rebuild_counters(floor_counts: dict) -> int:
+    """
+    Description:
+        Overwrites every counter row with counts recomputed from a full read
+        of the slot table, deleting rows of areas/floors that no longer exist.
+        Used to seed the counters and to reconcile drift.
+
+    Args:
+        floor_counts (dict): { (area, floor): { 'total', 'empty', 'occupied',
+                             'maintenance', ... } } for the whole table, as
+                             built by occupancy_vectorized.floor_status_counts.
+
+    Returns:
+        int: The number of counter rows written.
+    """
+    rows = defaultdict(lambda: dict.fromkeys(COUNTER_ATTRIBUTES, 0))
+    for (area, floor), counts in floor_counts.items():
+        for key in (area_counter_key(area), floor_counter_key(area, floor)):
+            row = rows[(key['counter_group'], key['counter_id'])]
+            row['total_slots'] += counts['total']
+            for status in COUNTED_STATUSES:
+                row[f"{status}_slots"] += counts.get(status, 0)
+
+    existing = []
+    # Markers keep guarding against replayed stream records, so they are left alone
+    scan_kwargs = {
+        'ProjectionExpression': 'counter_group, counter_id',
+        'FilterExpression': Attr('counter_group').ne(APPLIED_GROUP)
+    }
+    done = False
+    start_key = None
+    while not done:
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+        response = counters_table.scan(**scan_kwargs)
+        existing.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey', None)
+        done = start_key is None
+
+    with counters_table.batch_writer() as batch:
+        for item in existing:
+            if (item['counter_group'], item['counter_id']) not in rows:
+                batch.delete_item(Key={'counter_group': item['counter_group'], 'counter_id': item['counter_id']})
+        for key, counts in rows.items():
+            batch.put_item(Item=_counter_item(key, counts))
+
+    return len(rows)
+
+
+def _query_group(group: str) -> list:
+    items = []
+    query_kwargs = {'KeyConditionExpression': Key('counter_group').eq(group)}
+    done = False
+    start_key = None
+    while not done:
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+        response = counters_table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey', None)
+        done = start_key is None
+    return items
+
+
+def read_area_counters() -> list:
+    """Returns the counter row of every area, ordered by area number."""
+    return _query_group(AREA_GROUP)
+
+
+def read_floor_counters(area: int) -> list:
+    """Returns the counter rows of every floor in one area, ordered by floor number."""
+    return _query_group(floor_counter_key(area, 0)['counter_group'])
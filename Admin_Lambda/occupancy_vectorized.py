@@ -0,0 +1,239 @@
+from functools import partial
+from types import SimpleNamespace
+import numpy as np
+
+from admin_module.real_time_util import _area_summary, _slot_occupancy_facts
+from admin_module.scan_util import parallel_scan
+
+# Status codes of the 'status' column; anything else maps to OTHER_STATUS
+STATUS_CODES = {'empty': 0, 'occupied': 1, 'maintenance': 2}
+OTHER_STATUS = 3
+STATUS_CODE_COUNT = OTHER_STATUS + 1
+
+# Attributes the reductions read; use them as the projection of a raw scan
+RAW_SCAN_ATTRIBUTES = ('area_number', 'floor_number', 'slot_number', 'status', 'entry_timestamp')
+
+_ABSENT = {}
+_ZERO = {'N': '0'}
+
+
+def load_slot_arrays(slot_items) -> dict:
+    """
+    Description:
+        Loads slot items into typed column arrays for the vectorized path.
+        This is the only per-slot Python loop; everything after it is a
+        grouped NumPy reduction. Building the arrays from deserialized items
+        costs about as much as one scalar pass, so this only pays off when the
+        arrays are reused for several groupings. For a one-off recomputation
+        use scan_slot_arrays, which skips boto3's deserialization entirely.
+
+    Args:
+        slot_items: Iterable of slot items (scan results or decoded stream images).
+
+    Returns:
+        dict: 'area', 'floor', 'slot' (int64), 'status' (int8 code from
+              STATUS_CODES), 'occupied' (bool, status 'occupied', as
+              _calculate_realtime_occupancy counts it) and 'timestamp'
+              (object array of the 'entry_timestamp' strings, '' where missing).
+    """
+    area, floor, slot, status, occupied, timestamp = [], [], [], [], [], []
+    for item in slot_items:
+        area_num, is_occupied, last_updated = _slot_occupancy_facts(item)
+        area.append(area_num)
+        floor.append(int(item.get('floor_number', 0)))
+        slot.append(int(item.get('slot_number', 0)))
+        status.append(STATUS_CODES.get(item.get('status'), OTHER_STATUS))
+        occupied.append(is_occupied)
+        timestamp.append(last_updated or '')
+
+    return {
+        'area': np.array(area, dtype=np.int64),
+        'floor': np.array(floor, dtype=np.int64),
+        'slot': np.array(slot, dtype=np.int64),
+        'status': np.array(status, dtype=np.int8),
+        'occupied': np.array(occupied, dtype=bool),
+        # Kept as Python strings: sorting fixed-width unicode arrays costs more than the whole reduction
+        'timestamp': np.array(timestamp, dtype=object)
+    }
+
+
+def load_raw_slot_arrays(raw_items) -> dict:
+    """
+    Description:
+        Builds the same columns as load_slot_arrays straight from low-level
+        (wire format) items, e.g. {'area_number': {'N': '3'}}. The resource
+        API turns every attribute into a Decimal/str through TypeDeserializer,
+        which costs several times more than the occupancy reduction itself;
+        here each column is read once from the raw strings instead.
+
+    Args:
+        raw_items (list): Items as returned by a dynamodb client scan.
+
+    Returns:
+        dict: The columns described in load_slot_arrays.
+    """
+    count = len(raw_items)
+    get = dict.get
+    arrays = {
+        'area': np.fromiter((int(item['area_number']['N']) for item in raw_items), dtype=np.int64, count=count),
+        'floor': np.fromiter((int(get(item, 'floor_number', _ZERO)['N']) for item in raw_items), dtype=np.int64, count=count),
+        'slot': np.fromiter((int(get(item, 'slot_number', _ZERO)['N']) for item in raw_items), dtype=np.int64, count=count),
+        'status': np.fromiter(
+            (STATUS_CODES.get(get(item, 'status', _ABSENT).get('S'), OTHER_STATUS) for item in raw_items),
+            dtype=np.int8, count=count
+        ),
+        'timestamp': np.array([get(item, 'entry_timestamp', _ABSENT).get('S') or '' for item in raw_items],
+                              dtype=object)
+    }
+    arrays['occupied'] = arrays['status'] == STATUS_CODES['occupied']
+    return arrays
+
+
+def scan_slot_arrays(client, table_name: str, segments: int = None) -> dict:
+    """
+    Description:
+        Reads the whole slot table with a parallel low-level client scan
+        projected to RAW_SCAN_ATTRIBUTES and loads it with
+        load_raw_slot_arrays, so a full recomputation never materializes
+        deserialized slot dicts.
+
+    Args:
+        client: A boto3 DynamoDB client (not the resource).
+        table_name (str): The parking slot table.
+        segments (int): Parallel scan segments; defaults to scan_util's.
+
+    Returns:
+        dict: The columns described in load_slot_arrays.
+    """
+    # parallel_scan only calls table.scan(**kwargs), so the client needs just the table name bound
+    raw_table = SimpleNamespace(scan=partial(client.scan, TableName=table_name))
+    return load_raw_slot_arrays(list(parallel_scan(raw_table, segments=segments, projection=RAW_SCAN_ATTRIBUTES)))
+
+
+def _grouped(group_ids: np.ndarray, arrays: dict):
+    """
+    Reduces the columns per group. Returns the unique group ids and, per
+    group, the slot count, the occupied count, the latest timestamp and the
+    count of every status code.
+    """
+    groups, inverse = np.unique(group_ids, return_inverse=True)
+    size = len(groups)
+    totals = np.bincount(inverse, minlength=size)
+    occupied = np.bincount(inverse, weights=arrays['occupied'], minlength=size).astype(np.int64)
+    status_counts = np.bincount(
+        inverse * STATUS_CODE_COUNT + arrays['status'], minlength=size * STATUS_CODE_COUNT
+    ).reshape(size, STATUS_CODE_COUNT)
+
+    # Latest timestamp per group: the same string max() as the scalar implementation,
+    # taken over each group's contiguous slice of a stable sort by group
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(totals)))
+    timestamps = arrays['timestamp']
+    latest = [timestamps[order[bounds[k]:bounds[k + 1]]].max() for k in range(size)]
+
+    return groups, totals, occupied, latest, status_counts
+
+
+def _status_breakdown(counts: np.ndarray) -> dict:
+    breakdown = {status: int(counts[code]) for status, code in STATUS_CODES.items()}
+    breakdown['other'] = int(counts[OTHER_STATUS])
+    return breakdown
+
+
+def area_occupancy_state(arrays: dict) -> dict:
+    """
+    Description:
+        Per-area counts in the shape real_time_util.OccupancyAggregator keeps
+        (and checkpoints), so a full recomputation can seed the aggregator.
+
+    Args:
+        arrays (dict): Columns from load_slot_arrays.
+
+    Returns:
+        dict: { area_number: { 'total_slots', 'occupied_slots',
+              'last_updated' (None when no slot has a timestamp) } }
+    """
+    if len(arrays['area']) == 0:
+        return {}
+
+    groups, totals, occupied, latest, _ = _grouped(arrays['area'], arrays)
+    return {
+        int(area_num): {'total_slots': int(total), 'occupied_slots': int(occupied_count),
+                        'last_updated': str(last) or None}
+        for area_num, total, occupied_count, last in zip(groups, totals, occupied, latest)
+    }
+
+
+def calculate_occupancy_vectorized(arrays: dict) -> list:
+    """
+    Description:
+        Vectorized equivalent of real_time_util._calculate_realtime_occupancy.
+        The per-area rows are built by the same _area_summary helper from the
+        reduced counts, so percentages (Python round) and status buckets are
+        identical to the scalar function.
+
+    Args:
+        arrays (dict): Columns from load_slot_arrays.
+
+    Returns:
+        list: The per-area summary rows, sorted by area number.
+    """
+    return [
+        _area_summary(area_num, data['total_slots'], data['occupied_slots'], data['last_updated'])
+        for area_num, data in sorted(area_occupancy_state(arrays).items())
+    ]
+
+
+def floor_status_counts(arrays: dict) -> dict:
+    """
+    Description:
+        Slot counts per (area, floor) and 'status' value, e.g. to rebuild
+        the materialized occupancy counters.
+
+    Args:
+        arrays (dict): Columns from load_slot_arrays.
+
+    Returns:
+        dict: { (area_number, floor_number): { 'total', 'empty', 'occupied',
+              'maintenance', 'other' } }
+    """
+    if len(arrays['area']) == 0:
+        return {}
+
+    keys = (arrays['area'] << 32) | arrays['floor']
+    groups, totals, _, _, status_counts = _grouped(keys, arrays)
+    return {
+        (int(key >> 32), int(key & 0xFFFFFFFF)): dict(_status_breakdown(counts), total=int(total))
+        for key, total, counts in zip(groups, totals, status_counts)
+    }
+
+
+def calculate_floor_occupancy_vectorized(arrays: dict) -> list:
+    """
+    Description:
+        Per-floor occupancy in the same row format, plus the slot count per
+        'status' value. Floors are the finest grouping the slot model has
+        (there is no separate zone attribute).
+
+    Args:
+        arrays (dict): Columns from load_slot_arrays.
+
+    Returns:
+        list: Rows with the _area_summary fields, 'floor_number' and
+              'status_counts' ({'empty', 'occupied', 'maintenance', 'other'}),
+              sorted by (area, floor).
+    """
+    if len(arrays['area']) == 0:
+        return []
+
+    # One int64 key per (area, floor); floor numbers stay far below 2**32
+    keys = (arrays['area'] << 32) | arrays['floor']
+    groups, totals, occupied, latest, status_counts = _grouped(keys, arrays)
+
+    results = []
+    for key, total, occupied_count, last, counts in zip(groups, totals, occupied, latest, status_counts):
+        row = _area_summary(int(key >> 32), int(total), int(occupied_count), str(last) or None)
+        row['floor_number'] = int(key & 0xFFFFFFFF)
+        row['status_counts'] = _status_breakdown(counts)
+        results.append(row)
+    return results
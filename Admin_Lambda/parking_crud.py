@@ -1,18 +1,83 @@
 import os
 import boto3
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Key, Attr
+
+from admin_module.slot_keys import FREE_SLOT_INDEX, STATUS_AREA_FLOOR_INDEX, EXPECTED_EXIT_INDEX, INDEX_ATTRIBUTE_NAMES, index_attributes, new_slot_item, slot_status_update
+from admin_module.parking_session import ACTIVE_SESSIONS_TABLE_NAME, session_from_slot
+from admin_module.occupancy_counters import rebuild_counters
+from admin_module.occupancy_checkpoint import rebuild_checkpoint
+from admin_module.occupancy_vectorized import scan_slot_arrays, area_occupancy_state, floor_status_counts
+from admin_module.scan_util import parallel_scan
+from admin_module.expiry_schedule import schedule_table, schedule_items
+from admin_module.bulk_loader import LoadStats, parallel_batch_write
 
 # Initializing clients outside handlers for reuse
 dynamodb = boto3.resource('dynamodb')
 dynamodb_client = boto3.client('dynamodb')
 
+SLOT_ATTRIBUTE_DEFINITIONS = [
+    {'AttributeName': 'parking_id', 'AttributeType': 'S'},
+    {'AttributeName': 'area_number', 'AttributeType': 'N'},
+    {'AttributeName': 'floor_number', 'AttributeType': 'N'},
+    {'AttributeName': 'slot_number', 'AttributeType': 'N'},
+    {'AttributeName': 'free_area', 'AttributeType': 'N'},
+    {'AttributeName': 'free_floor_slot', 'AttributeType': 'S'},
+    {'AttributeName': 'status_area_floor', 'AttributeType': 'S'},
+    {'AttributeName': 'expected_time', 'AttributeType': 'S'},
+]
+
+SLOT_SECONDARY_INDEXES = [
+    {
+        'IndexName': 'AreaFloorIndex',
+        'KeySchema': [
+            {'AttributeName': 'area_number', 'KeyType': 'HASH'}, # GSI Partition Key
+            {'AttributeName': 'floor_number', 'KeyType': 'RANGE'}, # GSI Sort Key
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+    },
+    {
+        # Sparse index: only free slots carry these keys
+        'IndexName': FREE_SLOT_INDEX,
+        'KeySchema': [
+            {'AttributeName': 'free_area', 'KeyType': 'HASH'},
+            {'AttributeName': 'free_floor_slot', 'KeyType': 'RANGE'},
+        ],
+        'Projection': {
+            'ProjectionType': 'INCLUDE',
+            'NonKeyAttributes': ['area_number', 'floor_number', 'slot_number'],
+        },
+    },
+    {
+        # One floor's slots of one status, ordered by slot number
+        'IndexName': STATUS_AREA_FLOOR_INDEX,
+        'KeySchema': [
+            {'AttributeName': 'status_area_floor', 'KeyType': 'HASH'},
+            {'AttributeName': 'slot_number', 'KeyType': 'RANGE'},
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+    },
+    {
+        # One floor's occupied slots, soonest expected exit first
+        'IndexName': EXPECTED_EXIT_INDEX,
+        'KeySchema': [
+            {'AttributeName': 'status_area_floor', 'KeyType': 'HASH'},
+            {'AttributeName': 'expected_time', 'KeyType': 'RANGE'},
+        ],
+        'Projection': {'ProjectionType': 'KEYS_ONLY'},
+    },
+]
+
 
 def _create_table_if_not_exists(table_name: str) -> None:
     """
     Description:
         Checks if a DynamoDB table exists. If not, it creates one with the
-        primary key ('parking_id') and the 'AreaFloorIndex' Global Secondary Index.
+        primary key ('parking_id') and the SLOT_SECONDARY_INDEXES: the
+        'AreaFloorIndex', the sparse 'FreeSlotIndex' used for slot allocation,
+        the 'status-area_floor-index' used for floor availability and the
+        expected-exit index used for waiting times. The
+        table stream feeds the occupancy counters and the status monitor.
         It uses a waiter to handle race conditions and ensure the table is active.
 
     Args:
@@ -27,24 +92,15 @@ def _create_table_if_not_exists(table_name: str) -> None:
             try:
                 dynamodb_client.create_table(
                     TableName=table_name,
-                    AttributeDefinitions=[
-                        {'AttributeName': 'parking_id', 'AttributeType': 'S'},
-                        {'AttributeName': 'area_number', 'AttributeType': 'N'},
-                        {'AttributeName': 'floor_number', 'AttributeType': 'N'},
-                    ],
+                    AttributeDefinitions=SLOT_ATTRIBUTE_DEFINITIONS,
                     KeySchema=[
                         {'AttributeName': 'parking_id', 'KeyType': 'HASH'}, # Partition Key
                     ],
-                    GlobalSecondaryIndexes=[
-                        {
-                            'IndexName': 'AreaFloorIndex',
-                            'KeySchema': [
-                                {'AttributeName': 'area_number', 'KeyType': 'HASH'}, # GSI Partition Key
-                                {'AttributeName': 'floor_number', 'KeyType': 'RANGE'}, # GSI Sort Key
-                            ],
-                            'Projection': {'ProjectionType': 'ALL'},
-                        }
-                    ],
+                    GlobalSecondaryIndexes=SLOT_SECONDARY_INDEXES,
+                    StreamSpecification={
+                        'StreamEnabled': True,
+                        'StreamViewType': 'NEW_AND_OLD_IMAGES'
+                    },
                     BillingMode='PAY_PER_REQUEST'
                 )
                 print(f"Waiting for table '{table_name}' to become active...")
@@ -59,66 +115,105 @@ def _create_table_if_not_exists(table_name: str) -> None:
             raise
 
 
-def _initialize_system(table_name: str, parking_layout: list) -> list:
+def _validate_layout(parking_layout: list) -> list:
+    """
+    Checks every area entry of a layout before anything is written.
+
+    Returns:
+        list: (area, floors, slots_per_floor) tuples, in layout order.
+
+    Raises:
+        ValueError: If an entry is malformed or contains invalid values.
+    """
+    areas = []
+    for area_config in parking_layout:
+        if not isinstance(area_config, dict) or not all(k in area_config for k in ['area', 'floors', 'slots_per_floor']):
+            raise ValueError(f"Malformed area data entry: {area_config}. Expected {{'area': int, 'floors': int, 'slots_per_floor': int}}")
+
+        area = area_config['area']
+        floors = area_config['floors']
+        slots_per_floor = area_config['slots_per_floor']
+
+        if not isinstance(area, int) or area <= 0:
+            raise ValueError(f"Invalid area number: {area}. Must be a positive integer.")
+        if not isinstance(floors, int) or floors <= 0:
+            raise ValueError(f"Invalid number of floors for area {area}: {floors}. Must be a positive integer.")
+        if not isinstance(slots_per_floor, int) or slots_per_floor <= 0:
+            raise ValueError(f"Invalid number of slots_per_floor for area {area}: {slots_per_floor}. Must be a positive integer.")
+
+        areas.append((area, floors, slots_per_floor))
+    return areas
+
+
+def _floor_slot_items(area: int, floor: int, slots_per_floor: int):
+    """Yields the new slot items of one floor, built only as the writer asks for them."""
+    for slot in range(1, slots_per_floor + 1):
+        yield new_slot_item(area, floor, slot)
+
+
+def _initialize_system(table_name: str, parking_layout: list, include_slots: bool = False,
+                       workers: int = None) -> dict:
     """
     Description:
         Core logic to initialize parking slots based on a layout with areas,
-        floors, and slots. It performs detailed input validation and uses a
-        batch_writer for efficient bulk insertion.
+        floors, and slots. The whole layout is validated first, then every
+        floor is written as its own unit by parallel batch writers; items are
+        generated lazily, throttling is absorbed with adaptive backoff, and
+        progress is printed while the load runs.
 
     Args:
         table_name (str): The name of the DynamoDB table.
         parking_layout (list): A list of dictionaries, where each dictionary defines
                             the configuration for a parking area.
                             e.g., [{'area': 1, 'floors': 10, 'slots_per_floor': 15}]
+        include_slots (bool): Also return every created item. Off by default,
+                              since large layouts make the list very big.
+        workers (int): Number of writer threads. Defaults to INIT_WRITE_WORKERS.
 
     Returns:
-        list: A list of all the item dictionaries created and added to the table.
+        dict: 'created_count', a per-area 'areas' summary, the load statistics
+              under 'load', and 'created_slots' when include_slots is set.
 
     Raises:
         ValueError: If the 'parking_layout' data is malformed or contains invalid values.
+        BulkWriteError: If a batch could not be written despite retries.
         ClientError: If there's an issue with DynamoDB operations.
     """
     table = dynamodb.Table(table_name)
-    created_slots = []
+    areas = _validate_layout(parking_layout)
 
-    with table.batch_writer() as batch:
-        for area_config in parking_layout:
-            # --- Input Validation ---
-            if not isinstance(area_config, dict) or not all(k in area_config for k in ['area', 'floors', 'slots_per_floor']):
-                raise ValueError(f"Malformed area data entry: {area_config}. Expected {{'area': int, 'floors': int, 'slots_per_floor': int}}")
-
-            area = area_config['area']
-            floors = area_config['floors']
-            slots_per_floor = area_config['slots_per_floor']
-
-            if not isinstance(area, int) or area <= 0:
-                raise ValueError(f"Invalid area number: {area}. Must be a positive integer.")
-            if not isinstance(floors, int) or floors <= 0:
-                raise ValueError(f"Invalid number of floors for area {area}: {floors}. Must be a positive integer.")
-            if not isinstance(slots_per_floor, int) or slots_per_floor <= 0:
-                raise ValueError(f"Invalid number of slots_per_floor for area {area}: {slots_per_floor}. Must be a positive integer.")
-            
-            # Item creation
-            for floor in range(1, floors + 1):
-                for slot in range(1, slots_per_floor + 1):
-                    parking_id = f"A{area}F{floor}S{slot}"
-                    item = {
-                        'parking_id'   : parking_id,
-                        'area_number'  : area,
-                        'floor_number' : floor,
-                        'slot_number'  : slot,
-                        'status'       : 'empty'
-                    }
-                    batch.put_item(Item=item)
-                    created_slots.append(item)
-
-    return created_slots
-
-
-# In parking_manager.py
+    units = (
+        ((area, floor), _floor_slot_items(area, floor, slots_per_floor))
+        for area, floors, slots_per_floor in areas
+        for floor in range(1, floors + 1)
+    )
+    stats = LoadStats(total=sum(floors * slots for _, floors, slots in areas), label='slots')
+    parallel_batch_write(table, units, workers=workers, stats=stats)
+
+    summary = []
+    for area, floors, slots_per_floor in areas:
+        summary.append({
+            'area': area,
+            'floors': floors,
+            'slots_per_floor': slots_per_floor,
+            'slots_created': sum(stats.written_by_unit.get((area, floor), 0) for floor in range(1, floors + 1))
+        })
+
+    result = {
+        'created_count': stats.written,
+        'areas': summary,
+        'load': stats.as_dict()
+    }
+    if include_slots:
+        # Slot items are deterministic, so they are rebuilt rather than kept during the load
+        result['created_slots'] = [
+            item
+            for area, floors, slots_per_floor in areas
+            for floor in range(1, floors + 1)
+            for item in _floor_slot_items(area, floor, slots_per_floor)
+        ]
+    return result
 
-from boto3.dynamodb.conditions import Key
 
 def _add_new_slots(table_name: str, area: int, floor: int, new_slots_count: int) -> list:
     """
@@ -168,25 +263,20 @@ def _add_new_slots(table_name: str, area: int, floor: int, new_slots_count: int)
         # Starting numbering the new slots from max_existing_slot + 1
         for i in range(1, new_slots_count + 1):
             new_slot_number = max_existing_slot + i
-            parking_id = f"A{area}F{floor}S{new_slot_number}"
-            item = {
-                'parking_id'   : parking_id,
-                'area_number'  : area,
-                'floor_number' : floor,
-                'slot_number'  : new_slot_number,
-                'status'       : 'empty'
-            }
+            item = new_slot_item(area, floor, new_slot_number)
             batch.put_item(Item=item)
             added_slots.append(item)
 
     return added_slots
 
 
-def _delete_slots_by_id(table_name: str, parking_id_list: list) -> int:
+def _delete_slots_by_id(table_name: str, parking_id_list: list) -> tuple:
     """
     Description:
         Deletes one or more parking slots from the table using a list of parking_ids.
-        This function uses a batch_writer for efficient bulk deletion.
+        Occupied slots are skipped: their vehicle has an active session that
+        only an exit can close, so they must be vacated via manual exit first.
+        Each delete is conditional, so slots are deleted one at a time.
 
     Args:
         table_name (str): The name of the DynamoDB table.
@@ -194,7 +284,7 @@ def _delete_slots_by_id(table_name: str, parking_id_list: list) -> int:
                                 'parking_id' to be deleted.
 
     Returns:
-        int: The number of items processed for deletion.
+        tuple: (deleted parking_ids, skipped occupied parking_ids).
 
     Raises:
         ValueError: If the provided 'parking_id_list' is empty.
@@ -204,49 +294,218 @@ def _delete_slots_by_id(table_name: str, parking_id_list: list) -> int:
         
     table = dynamodb.Table(table_name)
     
-    with table.batch_writer() as batch:
-        for parking_id in parking_id_list:
-            batch.delete_item(Key={'parking_id': parking_id})
+    deleted, skipped = [], []
+    for parking_id in parking_id_list:
+        try:
+            table.delete_item(
+                Key={'parking_id': parking_id},
+                ConditionExpression='attribute_not_exists(parking_id) OR #status <> :occupied',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':occupied': 'occupied'}
+            )
+            deleted.append(parking_id)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            skipped.append(parking_id)
             
-    return len(parking_id_list)
+    return deleted, skipped
 
 
 def _reset_all_slots(table_name: str) -> int:
     """
     Description:
         Deletes all items from the DynamoDB table, effectively resetting it to an
-        empty state. It performs a paginated scan to retrieve all primary keys,
-        then uses a batch_writer to delete all items efficiently.
+        empty state. It streams the primary keys from a parallel segmented scan
+        straight into a batch_writer, so keys are never collected in memory.
+        The active session items are cleared as well.
 
     Args:
         table_name (str): The name of the DynamoDB table to reset.
 
     Returns:
-        int: The total count of items that were deleted.
+        int: The total count of slot items that were deleted.
     """
     table = dynamodb.Table(table_name)
-    all_keys = []
-    
-    # Step 1: Scaning the table to get all primary keys.
+    deleted = 0
+
+    # Step 1: Scaning the table for all primary keys and batch deleting them as they arrive.
     # ProjectionExpression minimizes read cost by only fetching the key.
-    scan_kwargs = {'ProjectionExpression': 'parking_id'}
-    
-    done = False
-    start_key = None
-    while not done:
-        if start_key:
-            scan_kwargs['ExclusiveStartKey'] = start_key
-        response = table.scan(**scan_kwargs)
-        all_keys.extend(response.get('Items', []))
-        start_key = response.get('LastEvaluatedKey', None)
-        done = start_key is None
-
-    if not all_keys:
-        return 0 # Table is already empty
-
-    # Step 2: Batch deleting the all items.
     with table.batch_writer() as batch:
-        for key in all_keys:
+        for key in parallel_scan(table, projection=['parking_id']):
+            batch.delete_item(Key=key)
+            deleted += 1
+
+    # Step 2: Active sessions point at the deleted slots, so they go too.
+    sessions_table = dynamodb.Table(ACTIVE_SESSIONS_TABLE_NAME)
+    with sessions_table.batch_writer() as batch:
+        for key in parallel_scan(sessions_table, projection=['vehicle_id']):
             batch.delete_item(Key=key)
             
-    return len(all_keys)
\ No newline at end of file
+    return deleted
+
+
+def _backfill_index_attributes(table_name: str) -> int:
+    """
+    Description:
+        Migrates an existing table to the derived index attributes (e.g. the
+        FreeSlotIndex keys) by recomputing them from each slot's status and
+        rewriting the items whose attributes are missing or stale. Items are
+        read with a parallel segmented scan. Slots held for a waitlisted
+        driver are left alone, since their index attributes are managed by
+        the waitlist. Slots whose status or hold changes mid-run are skipped
+        by a condition and stay correct because every live write path
+        maintains the attributes itself.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to migrate.
+
+    Returns:
+        int: The number of slot items that were updated.
+    """
+    table = dynamodb.Table(table_name)
+    updated = 0
+
+    for item in parallel_scan(table):
+        if 'status' not in item or 'held_for' in item:
+            continue
+        expected = index_attributes(item.get('status'), item['area_number'], item['floor_number'], item['slot_number'])
+        current = {name: item[name] for name in INDEX_ATTRIBUTE_NAMES if name in item}
+        if current == expected:
+            continue
+
+        update_params = slot_status_update(item.get('status'), item['area_number'], item['floor_number'], item['slot_number'])
+        update_params['ExpressionAttributeValues'][':current_status'] = item.get('status')
+        try:
+            table.update_item(
+                Key={'parking_id': item['parking_id']},
+                ConditionExpression='#status = :current_status AND attribute_not_exists(held_for)',
+                **update_params
+            )
+            updated += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    return updated
+
+
+def _backfill_active_sessions(table_name: str) -> int:
+    """
+    Description:
+        Creates the missing ActiveParkingSessions items for vehicles that were
+        parked before the session table existed, so their exits can find them.
+        Existing session items are never overwritten.
+
+    Args:
+        table_name (str): The name of the parking slot table.
+
+    Returns:
+        int: The number of session items that were created.
+    """
+    table = dynamodb.Table(table_name)
+    sessions_table = dynamodb.Table(ACTIVE_SESSIONS_TABLE_NAME)
+    created = 0
+
+    for item in parallel_scan(table, filter_expression=Attr('status').eq('occupied')):
+        if not item.get('vehicle_id'):
+            continue
+        try:
+            sessions_table.put_item(
+                Item=session_from_slot(item),
+                ConditionExpression='attribute_not_exists(vehicle_id)'
+            )
+            created += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    return created
+
+
+def _backfill_expiry_schedule(table_name: str) -> int:
+    """
+    Description:
+        Writes the expiry reminders of vehicles that were parked before the
+        schedule was fed by the slot stream, so they are reminded too. Stages
+        that are already due are skipped; rewriting an existing reminder is
+        harmless, since the notification ledger sends each stage only once.
+
+    Args:
+        table_name (str): The name of the parking slot table.
+
+    Returns:
+        int: The number of schedule items written.
+    """
+    table = dynamodb.Table(table_name)
+    written = 0
+    occupied = parallel_scan(table, filter_expression=Attr('status').eq('occupied'))
+    with schedule_table.batch_writer() as batch:
+        for item in occupied:
+            for reminder in schedule_items(item):
+                batch.put_item(Item=reminder)
+                written += 1
+    return written
+
+
+def _rebuild_occupancy_counters(table_name: str) -> int:
+    """
+    Description:
+        Recomputes the materialized occupancy counters and the real-time
+        occupancy checkpoint from the slot table. Needed once to seed them for
+        an existing table, and afterwards only to reconcile drift. The table
+        is read as raw column arrays and reduced with NumPy
+        (occupancy_vectorized), which skips boto3's per-item deserialization.
+
+    Args:
+        table_name (str): The name of the parking slot table.
+
+    Returns:
+        int: The number of counter rows written.
+    """
+    arrays = scan_slot_arrays(dynamodb_client, table_name)
+    rebuild_checkpoint(area_occupancy_state(arrays))
+    return rebuild_counters(floor_status_counts(arrays))
+
+
+def _ensure_secondary_indexes(table_name: str) -> dict:
+    """
+    Description:
+        Adds the SLOT_SECONDARY_INDEXES that an existing table is missing.
+        DynamoDB builds one new index per UpdateTable call and rejects the
+        next one until the first is active, so each run starts at most one
+        index; run the migration again until nothing is pending.
+
+    Args:
+        table_name (str): The name of the parking slot table.
+
+    Returns:
+        dict: 'created' (index started by this run, or None), 'building'
+              (indexes still being built) and 'pending' (missing indexes
+              left for a later run).
+    """
+    description = dynamodb_client.describe_table(TableName=table_name)['Table']
+    existing = {index['IndexName']: index.get('IndexStatus') for index in description.get('GlobalSecondaryIndexes', [])}
+    building = [name for name, status in existing.items() if status != 'ACTIVE']
+    missing = [index for index in SLOT_SECONDARY_INDEXES if index['IndexName'] not in existing]
+
+    created = None
+    if missing and not building:
+        index = missing.pop(0)
+        key_names = {key['AttributeName'] for key in index['KeySchema']}
+        dynamodb_client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=[
+                definition for definition in SLOT_ATTRIBUTE_DEFINITIONS
+                if definition['AttributeName'] in key_names
+            ],
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+        created = index['IndexName']
+        building.append(created)
+
+    return {
+        'created': created,
+        'building': building,
+        'pending': [index['IndexName'] for index in missing]
+    }
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+import uuid
+import boto3
+from datetime import datetime, timezone
+
+from admin_module.slot_keys import slot_status_update
+
+dynamodb = boto3.resource('dynamodb')
+
+# One item per parked vehicle, keyed by vehicle_id. It is written and deleted
+# in the same transaction as the slot update, so "is this car parked / where
+# is it" is a single strongly consistent get_item.
+ACTIVE_SESSIONS_TABLE_NAME = os.environ.get('ACTIVE_SESSIONS_TABLE', 'ActiveParkingSessions')
+sessions_table = dynamodb.Table(ACTIVE_SESSIONS_TABLE_NAME)
+
+# Attributes that describe the current occupant of a slot
+OCCUPANT_ATTRIBUTES = ('vehicle_id', 'expected_time', 'entry_timestamp', 'email')
+
+# Attributes stored on an active session item
+SESSION_ATTRIBUTES = ('vehicle_id', 'parking_id', 'area_number', 'floor_number', 'slot_number',
+                      'entry_timestamp', 'expected_time', 'email')
+
+
+class VehicleAlreadyParkedError(Exception):
+    """Raised when a vehicle that already has an active session tries to enter."""
+
+
+def build_session(slot: dict, occupant: dict) -> dict:
+    """
+    Description:
+        Builds the active session item for a vehicle entering `slot`.
+
+    Args:
+        slot (dict): The slot being claimed ('parking_id', 'area_number',
+                     'floor_number', 'slot_number').
+        occupant (dict): The occupant attributes written to the slot.
+
+    Returns:
+        dict: The session item, ready for put_item.
+    """
+    session = {**slot, **occupant}
+    return {name: session[name] for name in SESSION_ATTRIBUTES if session.get(name) is not None}
+
+
+def session_from_slot(slot_data: dict) -> dict:
+    """
+    Description:
+        Derives the session of an occupied slot from the slot item itself, for
+        paths that start from a parking_id rather than a vehicle_id.
+
+    Args:
+        slot_data (dict): The current data of the parking slot from DynamoDB.
+
+    Returns:
+        dict: The session item.
+
+    Raises:
+        ValueError: If the slot is not found or is not occupied.
+    """
+    if not slot_data:
+        raise ValueError("Parking slot data cannot be empty.")
+    if slot_data.get('status') != 'occupied':
+        raise ValueError(f"Slot is not occupied. Current status: {slot_data.get('status')}")
+    return build_session(slot_data, {})
+
+
+def find_active_session(vehicle_id: str):
+    """
+    Description:
+        Returns the active session of a vehicle with one strongly consistent
+        get_item on the session table.
+
+    Args:
+        vehicle_id (str): The vehicle to look up.
+
+    Returns:
+        dict | None: The session item ('parking_id', 'area_number', ...), or
+                     None if the vehicle is not parked.
+    """
+    response = sessions_table.get_item(Key={'vehicle_id': vehicle_id}, ConsistentRead=True)
+    return response.get('Item')
+
+
+def find_active_sessions(vehicle_ids: list) -> dict:
+    """
+    Description:
+        Bulk version of find_active_session: strongly consistent batch reads,
+        100 keys per request, retrying any unprocessed keys.
+
+    Args:
+        vehicle_ids (list): The vehicles to look up.
+
+    Returns:
+        dict: vehicle_id -> session item for every vehicle that is parked.
+    """
+    sessions = {}
+    unique_ids = list(dict.fromkeys(vehicle_ids))
+    for start in range(0, len(unique_ids), 100):
+        request = {
+            ACTIVE_SESSIONS_TABLE_NAME: {
+                'Keys': [{'vehicle_id': vehicle_id} for vehicle_id in unique_ids[start:start + 100]],
+                'ConsistentRead': True
+            }
+        }
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(ACTIVE_SESSIONS_TABLE_NAME, []):
+                sessions[item['vehicle_id']] = item
+            request = response.get('UnprocessedKeys') or None
+    return sessions
+
+
+def build_history_item(session: dict, exit_dt: datetime) -> dict:
+    """
+    Description:
+        Builds the ParkingHistory record for a session that ends at `exit_dt`.
+        Keys with None values are dropped so DynamoDB accepts the item.
+
+    Args:
+        session (dict): The active session being closed.
+        exit_dt (datetime): The timezone-aware exit time.
+
+    Returns:
+        dict: The history item, ready for put_item.
+    """
+    exit_timestamp = exit_dt.isoformat()
+
+    duration_minutes = None
+    entry_timestamp_str = session.get('entry_timestamp')
+    if entry_timestamp_str:
+        duration = exit_dt - datetime.fromisoformat(entry_timestamp_str)
+        duration_minutes = int(duration.total_seconds() / 60)
+
+    log_item = {
+        'session_id': str(uuid.uuid4()),
+        'date': exit_dt.strftime('%Y-%m-%d'),
+        'exit_timestamp': exit_timestamp,
+        'area_id': session.get('area_number'),
+        'vehicle_id': session.get('vehicle_id'),
+        'parking_id': session.get('parking_id'),
+        'entry_timestamp': entry_timestamp_str,
+        'expected_time': session.get('expected_time'),
+        'duration_minutes': duration_minutes,
+        'floor_number': session.get('floor_number'),
+        'email': session.get('email')
+    }
+    return {k: v for k, v in log_item.items() if v is not None}
+
+
+def release_slot(table, logs_table, session: dict) -> dict:
+    """
+    Description:
+        Ends a parking session in one atomic transaction: the slot is freed
+        (restoring its FreeSlotIndex keys), the session is written to the
+        history table and the active session item is deleted, so a crash can
+        no longer free a slot without logging it. The slot update is
+        conditional on the same vehicle still occupying the slot, which also
+        makes concurrent exits safe.
+
+    Args:
+        table: The boto3 Table resource for the parking slot table.
+        logs_table: The boto3 Table resource for the ParkingHistory table.
+        session (dict): The active session, from find_active_session or
+                        session_from_slot.
+
+    Returns:
+        dict: The history item that was written.
+
+    Raises:
+        ValueError: If the vehicle no longer occupies the slot.
+    """
+    exit_dt = datetime.now(timezone.utc)
+    history_item = build_history_item(session, exit_dt)
+
+    update_params = slot_status_update(
+        'empty',
+        session['area_number'], session['floor_number'], session['slot_number'],
+        extra_remove=OCCUPANT_ATTRIBUTES
+    )
+    update_params['ExpressionAttributeValues'].update({
+        ':occupied': 'occupied',
+        ':current_vehicle': session.get('vehicle_id')
+    })
+
+    client = table.meta.client
+    try:
+        client.transact_write_items(
+            TransactItems=[
+                {
+                    'Update': {
+                        'TableName': table.name,
+                        'Key': {'parking_id': session['parking_id']},
+                        'ConditionExpression': '#status = :occupied AND vehicle_id = :current_vehicle',
+                        **update_params
+                    }
+                },
+                {
+                    'Put': {
+                        'TableName': logs_table.name,
+                        'Item': history_item
+                    }
+                },
+                {
+                    'Delete': {
+                        'TableName': ACTIVE_SESSIONS_TABLE_NAME,
+                        'Key': {'vehicle_id': session.get('vehicle_id')}
+                    }
+                }
+            ]
+        )
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+        if 'ConditionalCheckFailed' in reasons:
+            raise ValueError(
+                f"Vehicle {session.get('vehicle_id')} no longer occupies slot {session['parking_id']}."
+            ) from e
+        raise
+
+    return history_item
@@ -17,6 +17,37 @@ def get_occupancy_status(percentage: float) -> str:
     return "Available"
 
 
+def _slot_occupancy_facts(item: dict) -> tuple:
+    """
+    Extracts what the occupancy summary needs from one slot item.
+
+    A slot counts as occupied when its status is 'occupied'. The slot table
+    keeps no modification time, so an area's last update is the latest
+    entry_timestamp among its slots (only occupied slots carry one).
+
+    Args:
+        item: A parking slot item (from a scan or a decoded stream image).
+
+    Returns:
+        A tuple (area_number, is_occupied, entry_timestamp or None).
+    """
+    return int(item['area_number']), item.get('status') == 'occupied', item.get('entry_timestamp')
+
+
+def _area_summary(area_num: int, total_slots: int, occupied_slots: int, last_updated: str) -> dict:
+    """Builds the summary row of one area in the shape returned to callers."""
+    occupancy_percentage = round((occupied_slots / total_slots) * 100, 2) if total_slots > 0 else 0.0
+    return {
+        "area_number"          : area_num,
+        "total_slots"          : total_slots,
+        "occupied_slots"       : occupied_slots,
+        "available_slots"      : total_slots - occupied_slots,
+        "occupancy_percentage" : occupancy_percentage,
+        "status"               : get_occupancy_status(occupancy_percentage),
+        "last_updated"         : last_updated or datetime.utcnow().isoformat() + 'Z'
+    }
+
+
 def _calculate_realtime_occupancy(slot_items: list) -> list:
     """
     Calculates real-time occupancy data from a list of parking slot items.
@@ -36,43 +67,79 @@ def _calculate_realtime_occupancy(slot_items: list) -> list:
     if not slot_items:
         return []
 
-    area_data = {} # Format: { area_number: { 'total_slots': int, 'occupied_slots': int, 'timestamps': [str] } }
-
+    aggregator = OccupancyAggregator()
     for item in slot_items:
-        # Ensuring area_number is treated as an integer
-        area_num = int(item['area_number'])
-        if area_num not in area_data:
-            area_data[area_num] = {'total_slots': 0, 'occupied_slots': 0, 'timestamps': []}
-        
-        area_data[area_num]['total_slots'] += 1
-        if item.get('is_occupied', False):
-            area_data[area_num]['occupied_slots'] += 1
-        
-        # Ensuring timestamp exists before appending
-        if 'last_updated_timestamp' in item:
-            area_data[area_num]['timestamps'].append(item['last_updated_timestamp'])
-
-    final_results = []
-    for area_num, data in area_data.items():
-        total_slots = data['total_slots']
-        occupied_slots = data['occupied_slots']
-        available_slots = total_slots - occupied_slots
-        
-        # Finding the most recent timestamp for the area
-        last_updated = max(data['timestamps']) if data['timestamps'] else datetime.utcnow().isoformat() + 'Z'
-        
-        occupancy_percentage = round((occupied_slots / total_slots) * 100, 2) if total_slots > 0 else 0.0
-        status = get_occupancy_status(occupancy_percentage)
-
-        final_results.append({
-            "area_number"          : area_num,
-            "total_slots"          : total_slots,
-            "occupied_slots"       : occupied_slots,
-            "available_slots"      : available_slots,
-            "occupancy_percentage" : occupancy_percentage,
-            "status"               : status,
-            "last_updated"         : last_updated
+        aggregator.add_slot(item)
+    return aggregator.results()
+
+
+class OccupancyAggregator:
+    """
+    Per-area occupancy state that is kept current by applying slot changes
+    one at a time, so the summary never needs the full slot list. Every
+    change costs O(1); results() costs O(areas).
+
+    The state round-trips through to_checkpoint()/from_checkpoint() so a
+    stream consumer can persist it between invocations.
+    """
+
+    def __init__(self, areas: dict = None):
+        # Format: { area_number: { 'total_slots': int, 'occupied_slots': int, 'last_updated': str | None } }
+        self.areas = areas or {}
+
+    def _area(self, area_num: int) -> dict:
+        if area_num not in self.areas:
+            self.areas[area_num] = {'total_slots': 0, 'occupied_slots': 0, 'last_updated': None}
+        return self.areas[area_num]
+
+    def add_slot(self, item: dict) -> None:
+        area_num, is_occupied, timestamp = _slot_occupancy_facts(item)
+        area = self._area(area_num)
+        area['total_slots'] += 1
+        if is_occupied:
+            area['occupied_slots'] += 1
+        # Only ever moves forward: a removed slot does not roll the area back in time
+        if timestamp and (area['last_updated'] is None or timestamp > area['last_updated']):
+            area['last_updated'] = timestamp
+
+    def remove_slot(self, item: dict) -> None:
+        area_num, is_occupied, _ = _slot_occupancy_facts(item)
+        area = self._area(area_num)
+        area['total_slots'] -= 1
+        if is_occupied:
+            area['occupied_slots'] -= 1
+
+    def apply_change(self, old_item: dict = None, new_item: dict = None) -> None:
+        """
+        Applies one INSERT (new only), MODIFY (old and new) or REMOVE (old only).
+
+        Args:
+            old_item: The slot before the change, or None.
+            new_item: The slot after the change, or None.
+        """
+        if old_item:
+            self.remove_slot(old_item)
+        if new_item:
+            self.add_slot(new_item)
+
+    def results(self) -> list:
+        """Returns the same list _calculate_realtime_occupancy builds, sorted by area."""
+        return [
+            _area_summary(area_num, data['total_slots'], data['occupied_slots'], data['last_updated'])
+            for area_num, data in sorted(self.areas.items())
+            if data['total_slots'] > 0
+        ]
+
+    def to_checkpoint(self) -> dict:
+        return {str(area_num): dict(data) for area_num, data in self.areas.items()}
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: dict) -> 'OccupancyAggregator':
+        return cls({
+            int(area_num): {
+                'total_slots': int(data.get('total_slots', 0)),
+                'occupied_slots': int(data.get('occupied_slots', 0)),
+                'last_updated': data.get('last_updated')
+            }
+            for area_num, data in (checkpoint or {}).items()
         })
-        
-    # Sorting the final result by area number for consistent output
-    return sorted(final_results, key=lambda x: x['area_number'])
@@ -0,0 +1,24 @@
+import json
+
+from admin_module.occupancy_checkpoint import load_checkpoint
+
+
+def lambda_handler(event, context):
+    """
+    Description:
+        Returns the real-time occupancy summary in the
+        _calculate_realtime_occupancy format. The per-area checkpoint it
+        reads is kept current from the slot table's stream by the
+        'realtime_occupancy' handler of monitor_status_lambda, so no
+        invocation ever reads the full slot list.
+    """
+    aggregator, _ = load_checkpoint()
+    return {
+        'statusCode': 200,
+        "headers": {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Allow-Methods": "OPTIONS,GET"
+        },
+        'body': json.dumps(aggregator.results())
+    }
@@ -0,0 +1,122 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of parallel scan segments (one worker thread per segment)
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+
+_SEGMENT_DONE = object()
+
+
+class ScanStats:
+    """Counters collected while a parallel scan runs; safe to read after the scan finishes."""
+
+    def __init__(self):
+        self.pages = 0
+        self.scanned_count = 0
+        self.item_count = 0
+        self.consumed_capacity = 0.0
+        self._lock = threading.Lock()
+
+    def _add_page(self, response: dict) -> None:
+        with self._lock:
+            self.pages += 1
+            self.scanned_count += response.get('ScannedCount', 0)
+            self.item_count += response.get('Count', 0)
+            self.consumed_capacity += (response.get('ConsumedCapacity') or {}).get('CapacityUnits', 0.0)
+
+    def as_dict(self) -> dict:
+        return {
+            'pages': self.pages,
+            'scanned_count': self.scanned_count,
+            'item_count': self.item_count,
+            'consumed_capacity': self.consumed_capacity
+        }
+
+
+def parallel_scan(table, segments: int = None, projection=None, filter_expression=None,
+                  page_size: int = None, stats: ScanStats = None):
+    """
+    Description:
+        Reads a whole table with a segmented scan (Segment/TotalSegments), one
+        worker thread per segment, and yields the items as pages arrive. A
+        bounded hand-off queue keeps memory flat: workers pause while the
+        consumer is behind. Closing the generator early stops the workers.
+
+    Args:
+        table: The boto3 Table resource to scan.
+        segments (int): Number of parallel segments. Defaults to SCAN_SEGMENTS.
+        projection (iterable): Attribute names to return (reserved words are fine).
+        filter_expression: A boto3 condition (e.g. Attr('status').eq('occupied')).
+        page_size (int): Optional Limit per scan request.
+        stats (ScanStats): Optional collector for page, item and capacity counts.
+
+    Yields:
+        dict: The scanned items, in no particular order.
+    """
+    segments = max(1, segments or SCAN_SEGMENTS)
+
+    scan_kwargs = {}
+    if projection:
+        names = {f"#proj{i}": name for i, name in enumerate(projection)}
+        scan_kwargs['ProjectionExpression'] = ', '.join(names)
+        scan_kwargs['ExpressionAttributeNames'] = names
+    if filter_expression is not None:
+        scan_kwargs['FilterExpression'] = filter_expression
+    if page_size:
+        scan_kwargs['Limit'] = page_size
+    if stats is not None:
+        scan_kwargs['ReturnConsumedCapacity'] = 'TOTAL'
+
+    pages = queue.Queue(maxsize=segments * 2)
+    stop = threading.Event()
+
+    def _hand_off(payload) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(payload, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _scan_segment(segment: int) -> None:
+        try:
+            # Copies, since boto3 fills in the expression attributes in place
+            kwargs = {
+                key: dict(value) if isinstance(value, dict) else value
+                for key, value in scan_kwargs.items()
+            }
+            kwargs.update(Segment=segment, TotalSegments=segments)
+            while not stop.is_set():
+                response = table.scan(**kwargs)
+                if stats is not None:
+                    stats._add_page(response)
+                if not _hand_off(response.get('Items', [])):
+                    return
+                start_key = response.get('LastEvaluatedKey')
+                if not start_key:
+                    break
+                kwargs['ExclusiveStartKey'] = start_key
+            _hand_off(_SEGMENT_DONE)
+        except Exception as e:
+            _hand_off(e)
+
+    executor = ThreadPoolExecutor(max_workers=segments)
+    try:
+        for segment in range(segments):
+            executor.submit(_scan_segment, segment)
+
+        remaining = segments
+        while remaining:
+            payload = pages.get()
+            if payload is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(payload, Exception):
+                raise payload
+            else:
+                yield from payload
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
@@ -0,0 +1,27 @@
+import json
+from admin_module.ses_dispatcher import dispatch, SPILLED
+
+def lambda_handler(event, context):
+    """
+    Drains the SES spillover queue filled by ses_dispatcher.dispatch when a
+    burst could not be sent before its Lambda's deadline.
+
+    The jobs are sent through the same rate-limited dispatcher. Jobs that are
+    still unsent when this invocation runs out of time are reported as batch
+    item failures, so SQS redelivers their messages instead of the dispatcher
+    queueing them a second time. Rejected jobs are dropped.
+    """
+    jobs = []
+    message_ids = []
+    for record in event.get('Records', []):
+        try:
+            jobs.append(json.loads(record['body']))
+            message_ids.append(record['messageId'])
+        except (KeyError, TypeError, ValueError):
+            print(f"[WARN] Dropping malformed SES job: {record.get('body')}")
+
+    result = dispatch(jobs, context=context, spill=False)
+    unsent = [id(job) for job in result[SPILLED]]
+    failures = [{'itemIdentifier': message_id} for job, message_id in zip(jobs, message_ids) if id(job) in unsent]
+
+    return {'batchItemFailures': failures}
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.exceptions import ClientError
+
+from admin_module import notification_ledger
+
+ses_client = boto3.client('ses')
+sqs_client = boto3.client('sqs')
+
+# Sends per second this container may issue. SES enforces the limit per account,
+# so set this to the account's max send rate divided by the expected concurrency.
+SEND_RATE = float(os.environ.get('SES_SEND_RATE', '14'))
+WORKERS = int(os.environ.get('SES_DISPATCH_WORKERS', '8'))
+MAX_ATTEMPTS = int(os.environ.get('SES_MAX_ATTEMPTS', '5'))
+BACKOFF_BASE_SECONDS = float(os.environ.get('SES_BACKOFF_BASE_SECONDS', '0.2'))
+BACKOFF_MAX_SECONDS = float(os.environ.get('SES_BACKOFF_MAX_SECONDS', '5'))
+# Stop sending this long before the Lambda times out and spill the rest
+DEADLINE_MARGIN_SECONDS = float(os.environ.get('SES_DEADLINE_MARGIN_SECONDS', '10'))
+DEFAULT_BUDGET_SECONDS = float(os.environ.get('SES_DEFAULT_BUDGET_SECONDS', '60'))
+
+# Queue drained by ses_dispatch_worker_lambda; jobs not sent before the deadline go here
+SPILLOVER_QUEUE_URL = os.environ.get('SES_SPILLOVER_QUEUE_URL')
+
+THROTTLING_CODES = ('Throttling', 'ThrottlingException', 'TooManyRequestsException')
+
+SENT = 'sent'
+FAILED = 'failed'
+SPILLED = 'spilled'
+# The job's ledger claim lapsed and another sender took the stage over
+SUPERSEDED = 'superseded'
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to
+    `capacity`. A rate of 0 or less never hands out a token, which pauses
+    sending: every job is spilled to the queue instead.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity if rate > 0 else 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        """Takes one token, waiting for it if needed. Returns False if none is available before `deadline`."""
+        if self.rate <= 0:
+            return False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+# Shared by every dispatch in this container, so back-to-back invocations respect the rate too
+_bucket = TokenBucket(SEND_RATE)
+
+
+def email_job(to: str, subject: str, body: str, source: str, ledger_key: dict = None) -> dict:
+    """
+    Builds a send job. With a ledger_key ({'session_key', 'stage'}) of a
+    stage the caller has claimed (including the 'claim_id' the claim
+    returned), the dispatcher renews the claim right before sending and
+    confirms, queues or releases that ledger entry according to the outcome.
+    """
+    job = {'kind': 'email', 'to': to, 'subject': subject, 'body': body, 'source': source}
+    if ledger_key:
+        job['ledger_key'] = ledger_key
+    return job
+
+
+def verify_job(email: str) -> dict:
+    """Builds a job that requests an SES verification mail for an address."""
+    return {'kind': 'verify', 'email': email}
+
+
+def _send(job: dict) -> None:
+    if job['kind'] == 'verify':
+        ses_client.verify_email_identity(EmailAddress=job['email'])
+    else:
+        ses_client.send_email(
+            Source=job['source'],
+            Destination={'ToAddresses': [job['to']]},
+            Message={
+                'Subject': {'Data': job['subject']},
+                'Body': {'Text': {'Data': job['body']}}
+            }
+        )
+
+
+def _is_throttled(error: ClientError) -> bool:
+    code = error.response.get('Error', {}).get('Code')
+    message = error.response.get('Error', {}).get('Message', '')
+    return code in THROTTLING_CODES or 'Maximum sending rate exceeded' in message
+
+
+def _renew_claim(job: dict) -> bool:
+    """Renews the ledger claim of a job right before it is sent; jobs without one always pass."""
+    ledger_key = job.get('ledger_key') or {}
+    if not ledger_key.get('claim_id'):
+        return True
+    return notification_ledger.renew(ledger_key['session_key'], ledger_key['stage'], ledger_key['claim_id'])
+
+
+def _run_job(job: dict, deadline: float) -> str:
+    """Sends one job within the rate limit, backing off on throttling. Returns its outcome."""
+    for attempt in range(MAX_ATTEMPTS):
+        if not _bucket.acquire(deadline):
+            return SPILLED
+        if not _renew_claim(job):
+            return SUPERSEDED
+        try:
+            _send(job)
+            return SENT
+        except ClientError as e:
+            if not _is_throttled(e):
+                print(f"[ERROR] SES rejected {job['kind']} job for {job.get('to') or job.get('email')}: {e}")
+                return FAILED
+            # Full jitter keeps the workers from retrying in lockstep
+            backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if time.monotonic() + backoff > deadline:
+                return SPILLED
+            time.sleep(backoff)
+        except Exception as e:
+            print(f"[ERROR] Failed to send {job['kind']} job for {job.get('to') or job.get('email')}: {e}")
+            return FAILED
+    return SPILLED
+
+
+def _spill(jobs: list) -> list:
+    """Puts jobs on the spillover queue, 10 per call. Returns the jobs that could not be queued."""
+    if not SPILLOVER_QUEUE_URL:
+        return list(jobs)
+    not_queued = []
+    for start in range(0, len(jobs), 10):
+        chunk = jobs[start:start + 10]
+        try:
+            response = sqs_client.send_message_batch(
+                QueueUrl=SPILLOVER_QUEUE_URL,
+                Entries=[{'Id': str(i), 'MessageBody': json.dumps(job)} for i, job in enumerate(chunk)]
+            )
+            failed_ids = {entry['Id'] for entry in response.get('Failed', [])}
+            not_queued.extend(job for i, job in enumerate(chunk) if str(i) in failed_ids)
+        except Exception as e:
+            print(f"[ERROR] Failed to spill {len(chunk)} SES jobs: {e}")
+            not_queued.extend(chunk)
+    return not_queued
+
+
+def _settle_ledger(job: dict, outcome: str) -> None:
+    ledger_key = job.get('ledger_key')
+    if not ledger_key:
+        return
+    if outcome == SENT:
+        notification_ledger.confirm(ledger_key['session_key'], ledger_key['stage'])
+    elif outcome == SPILLED:
+        notification_ledger.mark_queued(ledger_key['session_key'], ledger_key['stage'])
+    else:
+        notification_ledger.release(ledger_key['session_key'], ledger_key['stage'])
+
+
+def dispatch(jobs: list, context=None, spill: bool = True, budget_seconds: float = None) -> dict:
+    """
+    Description:
+        Sends a burst of SES jobs from a bounded thread pool. Every call waits
+        for a token of the container-wide rate limiter, throttling errors are
+        retried with jittered exponential backoff, and whatever is not sent
+        before the deadline (the Lambda's remaining time minus
+        DEADLINE_MARGIN_SECONDS) goes to the spillover queue instead of being
+        lost with the timeout.
+
+    Args:
+        jobs (list): Jobs built with email_job() / verify_job().
+        context: The Lambda context, used for the deadline. Without one the
+                 dispatcher allows itself DEFAULT_BUDGET_SECONDS.
+        spill (bool): False keeps unsent jobs out of the queue and reports
+                      them as 'spilled' to the caller, e.g. for a queue
+                      consumer that lets SQS redeliver them instead.
+        budget_seconds (float): Caps the time spent sending, e.g. for a
+                                caller on a request path. The earlier of
+                                this and the context's deadline applies.
+
+    Returns:
+        dict: {'sent': [...], 'failed': [...], 'spilled': [...],
+              'superseded': [...]} lists of jobs. 'failed' jobs were rejected
+              (or could not be queued) and will not be retried by the
+              dispatcher; 'superseded' jobs lost their ledger claim while
+              waiting to be sent and were left to its new owner.
+    """
+    if context is not None:
+        budget = context.get_remaining_time_in_millis() / 1000.0 - DEADLINE_MARGIN_SECONDS
+    else:
+        budget = DEFAULT_BUDGET_SECONDS
+    if budget_seconds is not None:
+        budget = min(budget, budget_seconds)
+    deadline = time.monotonic() + max(budget, 0)
+
+    result = {SENT: [], FAILED: [], SPILLED: [], SUPERSEDED: []}
+    if not jobs:
+        return result
+
+    with ThreadPoolExecutor(max_workers=min(WORKERS, len(jobs))) as executor:
+        outcomes = list(executor.map(lambda job: _run_job(job, deadline), jobs))
+    for job, outcome in zip(jobs, outcomes):
+        result[outcome].append(job)
+
+    if spill and result[SPILLED]:
+        not_queued = _spill(result[SPILLED])
+        if not_queued:
+            queued = [job for job in result[SPILLED] if job not in not_queued]
+            result[SPILLED] = queued
+            result[FAILED].extend(not_queued)
+
+    for outcome, settled in result.items():
+        if outcome == SPILLED and not spill:
+            continue # Still owned by the queue message that will be redelivered
+        if outcome == SUPERSEDED:
+            continue # Owned by the sender that took the claim over
+        for job in settled:
+            try:
+                _settle_ledger(job, outcome)
+            except Exception as e:
+                # One failed ledger write must not leave the remaining jobs unsettled
+                print(f"[ERROR] Failed to settle ledger entry {job.get('ledger_key')} as {outcome}: {e}")
+
+    print(f"SES dispatch: {len(result[SENT])} sent, {len(result[SPILLED])} spilled, {len(result[FAILED])} failed.")
+    return result
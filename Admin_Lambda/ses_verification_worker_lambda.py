@@ -0,0 +1,121 @@
+import json
+import os
+import time
+import boto3
+from datetime import datetime, timezone
+from admin_module.ses_dispatcher import dispatch, verify_job, SENT, SPILLED
+
+dynamodb = boto3.resource('dynamodb')
+ses_client = boto3.client('ses')
+
+VERIFIED_EMAIL_TABLE_NAME = os.environ.get('VERIFIED_EMAIL_TABLE', 'VerifiedEmailIdentities')
+verified_table = dynamodb.Table(VERIFIED_EMAIL_TABLE_NAME)
+
+# A pending address gets a fresh verification mail at most this often
+RESEND_AFTER_SECONDS = int(os.environ.get('SES_VERIFICATION_RESEND_AFTER', '86400'))
+
+
+def lambda_handler(event, context):
+    """
+    Drains the deferred SES verification queue filled by the entry path.
+
+    Each SQS batch is deduplicated, checked against the VerifiedEmailIdentities
+    table with one batch read, and the remaining addresses are checked against
+    SES with one bulk get_identity_verification_attributes call per 100
+    addresses. Only addresses SES does not know yet (or whose verification
+    failed or went stale) get a new verify_email_identity request.
+
+    Returns a partial batch response so that only the messages whose address
+    could not be processed are retried.
+    """
+    message_ids_by_email = {}
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            email = json.loads(record['body'])['email']
+            message_ids_by_email.setdefault(email, []).append(record['messageId'])
+        except (KeyError, TypeError, ValueError):
+            print(f"[WARN] Dropping malformed verification message: {record.get('body')}")
+
+    failed_emails = process_emails(list(message_ids_by_email), context)
+    for email in failed_emails:
+        failures.extend({'itemIdentifier': message_id} for message_id in message_ids_by_email[email])
+
+    print(f"Processed {len(message_ids_by_email)} addresses, {len(failed_emails)} failed.")
+    return {'batchItemFailures': failures}
+
+
+def process_emails(emails: list, context=None) -> list:
+    """
+    Ensures every address is verified or has a verification mail on its way.
+    New verification mails go through the rate-limited SES dispatcher.
+
+    Returns:
+        list: The addresses that could not be processed.
+    """
+    if not emails:
+        return []
+
+    now = int(time.time())
+    known = {}
+    for start in range(0, len(emails), 100):
+        keys = [{'email': email} for email in emails[start:start + 100]]
+        request = {VERIFIED_EMAIL_TABLE_NAME: {'Keys': keys}}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(VERIFIED_EMAIL_TABLE_NAME, []):
+                known[item['email']] = item
+            request = response.get('UnprocessedKeys') or None
+
+    to_check = [
+        email for email in emails
+        if known.get(email, {}).get('verification_status') != 'Success'
+        and not (known.get(email, {}).get('verification_status') == 'Pending'
+                 and now - int(known[email].get('requested_at', 0)) < RESEND_AFTER_SECONDS)
+    ]
+
+    failed = []
+    to_verify = []
+    with verified_table.batch_writer() as batch:
+        for start in range(0, len(to_check), 100):
+            chunk = to_check[start:start + 100]
+            try:
+                attributes = ses_client.get_identity_verification_attributes(Identities=chunk)['VerificationAttributes']
+            except Exception as e:
+                print(f"[ERROR] Could not read SES verification status for {len(chunk)} addresses: {e}")
+                failed.extend(chunk)
+                continue
+
+            for email in chunk:
+                status = attributes.get(email, {}).get('VerificationStatus')
+                item = {
+                    'email': email,
+                    'checked_at': datetime.now(timezone.utc).isoformat()
+                }
+                if status == 'Success':
+                    item['verification_status'] = 'Success'
+                elif status == 'Pending' and (email not in known or now - int(known[email].get('requested_at', 0)) < RESEND_AFTER_SECONDS):
+                    # Someone else already asked SES; wait for the user to click
+                    item['verification_status'] = 'Pending'
+                    item['requested_at'] = int(known.get(email, {}).get('requested_at', now))
+                else:
+                    to_verify.append(email)
+                    continue
+                batch.put_item(Item=item)
+
+        result = dispatch([verify_job(email) for email in to_verify], context=context)
+        requested = {job['email'] for job in result[SENT] + result[SPILLED]}
+        for email in to_verify:
+            if email not in requested:
+                print(f"[ERROR] Failed to initiate SES verification for {email}.")
+                failed.append(email)
+                continue
+            print(f"Successfully sent SES verification request to {email}.")
+            batch.put_item(Item={
+                'email': email,
+                'checked_at': datetime.now(timezone.utc).isoformat(),
+                'verification_status': 'Pending',
+                'requested_at': now
+            })
+
+    return failed
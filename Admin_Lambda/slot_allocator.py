@@ -0,0 +1,191 @@
+import os
+import time
+import zlib
+import random
+from boto3.dynamodb.conditions import Key
+
+from admin_module.slot_keys import FREE_SLOT_INDEX, HELD_ATTRIBUTES, free_floor_prefix, slot_status_update
+from admin_module.parking_session import ACTIVE_SESSIONS_TABLE_NAME, build_session, VehicleAlreadyParkedError
+from admin_module.waitlist import held_slot_for, complete_hold
+
+# 'lowest' always tries the lowest-numbered free slot first (deterministic, but
+# concurrent gates collide on it); 'spread' starts each request at a different
+# point of the candidate pool so concurrent entries land on different slots.
+ALLOCATION_MODE = os.environ.get('SLOT_ALLOCATION_MODE', 'spread')
+CANDIDATE_POOL_SIZE = int(os.environ.get('SLOT_CANDIDATE_POOL_SIZE', '10'))
+MAX_ALLOCATION_ATTEMPTS = int(os.environ.get('SLOT_MAX_ALLOCATION_ATTEMPTS', '5'))
+
+
+class AllocationConflictError(Exception):
+    """Raised when every attempt within the retry budget lost its race."""
+
+
+def find_free_slots(table, area: int, floor: int = None, limit: int = 1) -> list:
+    """
+    Description:
+        Returns up to `limit` free slots in an area (optionally on one floor),
+        lowest-numbered first, with a single bounded query against the sparse
+        FreeSlotIndex. Only free slots carry the index keys, so the cost does
+        not depend on how many slots the table holds.
+
+    Args:
+        table: The boto3 Table resource for the parking slot table.
+        area (int): The area number to allocate in.
+        floor (int): Optional floor number to restrict the search to.
+        limit (int): The maximum number of free slots to return.
+
+    Returns:
+        list: Index items ('parking_id', 'area_number', 'floor_number',
+              'slot_number', ...) ordered by (floor_number, slot_number).
+    """
+    key_condition = Key('free_area').eq(int(area))
+    if floor:
+        key_condition = key_condition & Key('free_floor_slot').begins_with(free_floor_prefix(floor))
+
+    response = table.query(
+        IndexName=FREE_SLOT_INDEX,
+        KeyConditionExpression=key_condition,
+        Limit=limit
+    )
+    return response.get('Items', [])
+
+
+def claim_slot(table, candidate: dict, occupant: dict) -> bool:
+    """
+    Description:
+        Marks one free slot as occupied and creates the vehicle's active
+        session in a single transaction. The slot update is conditional on
+        'status = empty', so exactly one of several concurrent claims on the
+        same slot succeeds, and on the slot not being held by the waitlist for
+        another vehicle; the session put is conditional on the vehicle not
+        having a session yet, so a car cannot be parked twice.
+
+    Args:
+        table: The boto3 Table resource for the parking slot table.
+        candidate (dict): A FreeSlotIndex item ('parking_id', 'area_number',
+                          'floor_number', 'slot_number').
+        occupant (dict): Attributes to SET on the slot, e.g. vehicle_id.
+
+    Returns:
+        bool: True if the slot was claimed, False if it was no longer empty.
+
+    Raises:
+        VehicleAlreadyParkedError: If the vehicle already has an active session.
+    """
+    update_params = slot_status_update(
+        'occupied',
+        candidate['area_number'], candidate['floor_number'], candidate['slot_number'],
+        extra_set=occupant, extra_remove=HELD_ATTRIBUTES
+    )
+    update_params['ExpressionAttributeValues'].update({
+        ':empty': 'empty',
+        ':holder': occupant.get('vehicle_id', ''),
+        ':now': int(time.time())
+    })
+
+    client = table.meta.client
+    try:
+        client.transact_write_items(
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': ACTIVE_SESSIONS_TABLE_NAME,
+                        'Item': build_session(candidate, occupant),
+                        'ConditionExpression': 'attribute_not_exists(vehicle_id)'
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': table.name,
+                        'Key': {'parking_id': candidate['parking_id']},
+                        'ConditionExpression': '#status = :empty AND (attribute_not_exists(held_for) '
+                                               'OR held_for = :holder OR held_until < :now)',
+                        **update_params
+                    }
+                }
+            ]
+        )
+        return True
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+        if reasons and reasons[0] == 'ConditionalCheckFailed':
+            raise VehicleAlreadyParkedError(f"Vehicle {occupant.get('vehicle_id')} is already parked.") from e
+        if len(reasons) > 1 and reasons[1] == 'ConditionalCheckFailed':
+            return False
+        raise
+
+
+def _order_candidates(candidates: list, vehicle_id: str, mode: str) -> list:
+    """
+    Orders the candidate pool for one request. In 'spread' mode the pool is
+    rotated by a hash of the vehicle_id plus a random offset, so two gates
+    working on the same area start from different slots instead of both
+    going for the lowest one.
+    """
+    if mode != 'spread' or len(candidates) < 2:
+        return list(candidates)
+    start = (zlib.crc32(str(vehicle_id).encode('utf-8')) + random.randrange(len(candidates))) % len(candidates)
+    return candidates[start:] + candidates[:start]
+
+
+def allocate_slot(table, area: int, floor: int, vehicle_id: str, occupant: dict,
+                  mode: str = None, max_attempts: int = None):
+    """
+    Description:
+        Claims a free slot for a vehicle. A slot the waitlist holds for this
+        vehicle is claimed first. Otherwise candidates come from FreeSlotIndex
+        and each claim is a conditional update on the slot ('status = empty').
+        When the condition fails because another gate won the race, the next
+        candidate is tried until the retry budget is spent; the pool is
+        re-read once it runs out.
+
+    Args:
+        table: The boto3 Table resource for the parking slot table.
+        area (int): The area number to allocate in.
+        floor (int): Optional floor number to restrict the search to.
+        vehicle_id (str): The vehicle being parked; seeds the candidate order.
+        occupant (dict): Attributes to SET on the claimed slot, e.g.
+                         vehicle_id, email, entry_timestamp, expected_time.
+        mode (str): 'spread' or 'lowest'. Defaults to SLOT_ALLOCATION_MODE.
+        max_attempts (int): Conditional writes allowed before giving up.
+                            Defaults to SLOT_MAX_ALLOCATION_ATTEMPTS.
+
+    Returns:
+        dict | None: The index item of the claimed slot, or None if the
+                     area/floor has no free slot left.
+
+    Raises:
+        AllocationConflictError: If every attempt within the budget lost its race.
+        VehicleAlreadyParkedError: If the vehicle already has an active session.
+    """
+    mode = mode or ALLOCATION_MODE
+    max_attempts = max_attempts or MAX_ALLOCATION_ATTEMPTS
+    pool_size = CANDIDATE_POOL_SIZE if mode == 'spread' else 1
+
+    held = held_slot_for(vehicle_id, area, floor)
+    if held and claim_slot(table, held, occupant):
+        complete_hold(vehicle_id, held['waitlist_queue'])
+        return held
+
+    attempts = 0
+    lost = set()
+    while attempts < max_attempts:
+        # The GSI is eventually consistent, so slots we already lost may still be listed
+        candidates = [
+            item for item in find_free_slots(table, area, floor, limit=pool_size + len(lost))
+            if item['parking_id'] not in lost
+        ]
+        if not candidates:
+            return None
+
+        for candidate in _order_candidates(candidates, vehicle_id, mode):
+            if attempts >= max_attempts:
+                break
+            attempts += 1
+
+            if claim_slot(table, candidate, occupant):
+                return candidate
+            print(f"Lost race for slot {candidate['parking_id']} (attempt {attempts}/{max_attempts}).")
+            lost.add(candidate['parking_id'])
+
+    raise AllocationConflictError(f"Could not claim a slot in area {area} after {max_attempts} attempts.")
@@ -0,0 +1,202 @@
+import os
+import time
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from admin_module.stream_util import stream_image
+
+dynamodb = boto3.resource('dynamodb')
+
+# Change feed of slot mutations, written from the slot table's stream.
+# Partition key 'feed' (S), sort key 'version' (N). Every change item lives
+# under FEED with a unique, increasing version; the item (META, 0) holds the
+# last reserved version. Items (MARKS, <start of hour, epoch seconds>) hold
+# 'first_version', the lowest version reserved in that hour, so a reader can
+# tell versions that were never written from versions that expired. Change
+# and mark items expire through the 'expires_at' TTL.
+SLOT_CHANGES_TABLE_NAME = os.environ.get('SLOT_CHANGES_TABLE', 'ParkingSlotChanges')
+changes_table = dynamodb.Table(SLOT_CHANGES_TABLE_NAME)
+
+FEED = 'slots'
+META_KEY = {'feed': 'meta', 'version': 0}
+MARKS = 'marks'
+MARK_SECONDS = 3600
+RETENTION_SECONDS = int(os.environ.get('SLOT_CHANGE_RETENTION_SECONDS', '86400'))
+# A missing version older than this is treated as a failed writer, not an in-flight one
+GAP_TIMEOUT_SECONDS = int(os.environ.get('SLOT_CHANGE_GAP_TIMEOUT_SECONDS', '60'))
+PAGE_SIZE = int(os.environ.get('SLOT_CHANGE_PAGE_SIZE', '500'))
+
+SLOT_FIELDS = ('parking_id', 'area_number', 'floor_number', 'slot_number', 'status',
+               'vehicle_id', 'email', 'entry_timestamp', 'expected_time')
+
+
+def current_version() -> int:
+    """Returns the last reserved version, i.e. the cursor a fresh snapshot corresponds to."""
+    item = changes_table.get_item(Key=META_KEY, ConsistentRead=True).get('Item')
+    return int(item.get('last_version', 0)) if item else 0
+
+
+def _slot_state(slot: dict) -> dict:
+    return {field: slot[field] for field in SLOT_FIELDS if slot.get(field) is not None}
+
+
+def record_changes(records: list) -> int:
+    """
+    Description:
+        Appends the slot changes of one stream batch to the feed. Only the
+        final state of each slot within the batch is kept, and the versions
+        for the whole batch are reserved with one atomic counter update.
+
+    Args:
+        records (list): DynamoDB stream records (NEW_AND_OLD_IMAGES).
+
+    Returns:
+        int: The number of change items written.
+    """
+    latest = {}
+    for record in records:
+        new_image = stream_image(record, 'NewImage')
+        old_image = stream_image(record, 'OldImage')
+        image = new_image or old_image
+        if not image or 'parking_id' not in image:
+            continue
+
+        # Re-inserting keeps the dict ordered by each slot's last change
+        latest.pop(image['parking_id'], None)
+        if new_image:
+            latest[image['parking_id']] = {'slot': _slot_state(new_image)}
+        else:
+            latest[image['parking_id']] = {'deleted': True}
+
+    if not latest:
+        return 0
+
+    now = int(time.time())
+    response = changes_table.update_item(
+        Key=META_KEY,
+        UpdateExpression='ADD last_version :count SET updated_at = :now',
+        ExpressionAttributeValues={':count': len(latest), ':now': now},
+        ReturnValues='UPDATED_NEW'
+    )
+    version = int(response['Attributes']['last_version']) - len(latest)
+    _mark_reservation(version + 1, now)
+
+    with changes_table.batch_writer() as batch:
+        for parking_id, change in latest.items():
+            version += 1
+            batch.put_item(Item={
+                'feed': FEED,
+                'version': version,
+                'parking_id': parking_id,
+                'recorded_at': now,
+                'expires_at': now + RETENTION_SECONDS,
+                **change
+            })
+
+    return len(latest)
+
+
+def _mark_reservation(first_version: int, now: int) -> None:
+    """Lowers the first_version of the current hour's mark to `first_version` if needed."""
+    try:
+        changes_table.update_item(
+            Key={'feed': MARKS, 'version': now - now % MARK_SECONDS},
+            UpdateExpression='SET first_version = :first, expires_at = :expires_at',
+            ConditionExpression='attribute_not_exists(first_version) OR first_version > :first',
+            ExpressionAttributeValues={':first': first_version, ':expires_at': now + RETENTION_SECONDS + 2 * MARK_SECONDS}
+        )
+    except changes_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass # A lower version was already reserved this hour
+
+
+def _retained_from(now: int):
+    """
+    Returns the lowest version whose change cannot have expired yet: the
+    first version reserved in the oldest hour that lies entirely inside
+    the retention window. Without such a mark nothing is known to be
+    retained.
+    """
+    response = changes_table.query(
+        KeyConditionExpression=Key('feed').eq(MARKS) & Key('version').gte(now - RETENTION_SECONDS),
+        Limit=1,
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+    return int(items[0]['first_version']) if items else None
+
+
+def read_changes(since: int, limit: int = None) -> dict:
+    """
+    Description:
+        Returns the slot changes after a cursor. Only a contiguous run of
+        versions is returned, so a version that is reserved but not yet
+        written holds the cursor back instead of being skipped; a gap older
+        than GAP_TIMEOUT_SECONDS (a writer that died) is stepped over. A gap
+        right after the cursor only forces a resync if the missing changes
+        may have expired, i.e. if they were reserved before the oldest
+        retained hour mark.
+
+    Args:
+        since (int): The client's cursor (the 'cursor' of its previous call,
+                     or the 'version' of its snapshot).
+        limit (int): Maximum number of changes to return. Defaults to PAGE_SIZE.
+
+    Returns:
+        dict: 'changes' (list of {'version', 'parking_id', 'slot' | 'deleted'}),
+              'cursor' (the cursor for the next call), 'has_more' and
+              'resync'. When 'resync' is True the changes after `since` are
+              no longer retained and the client must reload a full snapshot.
+    """
+    limit = limit or PAGE_SIZE
+    now = int(time.time())
+    meta = changes_table.get_item(Key=META_KEY, ConsistentRead=True).get('Item') or {}
+    latest = int(meta.get('last_version', 0))
+
+    result = {'changes': [], 'cursor': since, 'has_more': False, 'resync': False}
+    if since > latest:
+        # The cursor is from a feed that no longer exists
+        result['resync'] = True
+        return result
+    if since == latest:
+        return result
+
+    response = changes_table.query(
+        KeyConditionExpression=Key('feed').eq(FEED) & Key('version').gt(since),
+        Limit=limit,
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+
+    def _abandoned(first_missing):
+        retained_from = _retained_from(now)
+        return retained_from is not None and first_missing >= retained_from
+
+    if not items:
+        if now - int(meta.get('updated_at', 0)) > GAP_TIMEOUT_SECONDS:
+            if _abandoned(since + 1):
+                result['cursor'] = latest # Only versions that were never written are left
+            else:
+                result['resync'] = True # Everything after the cursor has expired
+        return result
+
+    cursor = since
+    for item in items:
+        version = int(item['version'])
+        if version != cursor + 1 and now - int(item['recorded_at']) <= GAP_TIMEOUT_SECONDS:
+            break # Wait for the missing versions to be written
+        if version != cursor + 1 and cursor == since and not _abandoned(since + 1):
+            # Older changes are gone (expired), the client cannot catch up
+            result['resync'] = True
+            return result
+
+        change = {'version': version, 'parking_id': item['parking_id']}
+        if item.get('deleted'):
+            change['deleted'] = True
+        else:
+            change['slot'] = item.get('slot', {})
+        result['changes'].append(change)
+        cursor = version
+
+    result['cursor'] = cursor
+    result['has_more'] = cursor < latest and len(result['changes']) == len(items) and 'LastEvaluatedKey' in response
+    return result
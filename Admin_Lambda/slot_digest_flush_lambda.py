@@ -0,0 +1,12 @@
+from admin_module.freed_slot_digest import flush_pending_digests
+
+def lambda_handler(event, context):
+    """
+    Runs every minute. Publishes the freed-slot digests that the debounce
+    window held back when no later slot release on the same floor came along
+    to carry them.
+    """
+    counts = flush_pending_digests()
+    print(f"Pending digests: {counts['published']} published, {counts['dropped']} taken slots dropped, "
+          f"{counts['failed']} failed.")
+    return {'statusCode': 200, 'body': 'Freed-slot digest flush completed.'}
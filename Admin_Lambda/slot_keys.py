@@ -0,0 +1,139 @@
+import re
+
+# Sparse GSI holding only the slots that are currently free.
+# Partition key 'free_area' (N), sort key 'free_floor_slot' (S).
+FREE_SLOT_INDEX = 'FreeSlotIndex'
+
+# Index over every slot, partition key 'status_area_floor' (S) such as
+# 'empty#1#3', sort key 'slot_number' (N): one floor's slots of one status, in order.
+# An empty slot held for a waitlisted driver is filed under 'held#1#3' instead,
+# so it is not listed as available.
+STATUS_AREA_FLOOR_INDEX = 'status-area_floor-index'
+HELD_KEY_STATUS = 'held'
+
+# Same partition key, sort key 'expected_time' (S, UTC ISO-8601). Only occupied
+# slots carry expected_time, so 'occupied#1#3' lists floor 3's soonest exits first.
+EXPECTED_EXIT_INDEX = 'status_area_floor-expected_time-index'
+
+# Derived attributes that exist purely to feed secondary indexes.
+INDEX_ATTRIBUTE_NAMES = ('free_area', 'free_floor_slot', 'status_area_floor')
+
+# Set on an empty slot while it is held for a waitlisted driver (see waitlist).
+HELD_ATTRIBUTES = ('held_for', 'held_until')
+
+_PARKING_ID_PATTERN = re.compile(r'^A(\d+)F(\d+)S(\d+)$')
+
+
+def parse_parking_id(parking_id: str) -> tuple:
+    """
+    Splits a parking_id of the form 'A{area}F{floor}S{slot}' into its numbers.
+
+    Args:
+        parking_id (str): e.g. 'A1F3S12'.
+
+    Returns:
+        tuple: (area, floor, slot) as integers.
+
+    Raises:
+        ValueError: If the parking_id does not follow the naming scheme.
+    """
+    match = _PARKING_ID_PATTERN.match(parking_id or '')
+    if not match:
+        raise ValueError(f"Invalid parking_id: {parking_id}. Expected format 'A<area>F<floor>S<slot>'.")
+    return tuple(int(part) for part in match.groups())
+
+
+def free_floor_prefix(floor: int) -> str:
+    """Returns the sort key prefix that selects one floor inside FreeSlotIndex."""
+    return f"F{int(floor):04d}#"
+
+
+def free_floor_slot(floor: int, slot: int) -> str:
+    """
+    Builds the FreeSlotIndex sort key. Zero padding keeps the lexicographic
+    order identical to the numeric (floor_number, slot_number) order, so the
+    first item of a query is always the lowest-numbered free slot.
+    """
+    return f"{free_floor_prefix(floor)}S{int(slot):06d}"
+
+
+def status_area_floor(status: str, area: int, floor: int) -> str:
+    """Builds the STATUS_AREA_FLOOR_INDEX partition key, e.g. 'empty#1#3'."""
+    return f"{status}#{int(area)}#{int(floor)}"
+
+
+def index_attributes(status: str, area: int, floor: int, slot: int) -> dict:
+    """
+    Computes the derived index attributes a slot must carry for a given status.
+
+    Args:
+        status (str): The slot status ('empty', 'occupied', 'maintenance').
+        area (int): The area number of the slot.
+        floor (int): The floor number of the slot.
+        slot (int): The slot number on that floor.
+
+    Returns:
+        dict: Attribute name -> value for every derived attribute that should
+              be present. Names from INDEX_ATTRIBUTE_NAMES that are missing
+              from the result must be removed from the item.
+    """
+    attributes = {'status_area_floor': status_area_floor(status, area, floor)}
+    if status == 'empty':
+        attributes['free_area'] = int(area)
+        attributes['free_floor_slot'] = free_floor_slot(floor, slot)
+    return attributes
+
+
+def slot_status_update(status: str, area: int, floor: int, slot: int,
+                       extra_set: dict = None, extra_remove: tuple = ()) -> dict:
+    """
+    Builds update_item parameters that move a slot to `status` while keeping
+    its index attributes in step with the new status.
+
+    Args:
+        status (str): The new slot status.
+        area (int): The area number of the slot.
+        floor (int): The floor number of the slot.
+        slot (int): The slot number on that floor.
+        extra_set (dict): Additional plain attributes to SET, e.g. vehicle_id.
+        extra_remove (tuple): Additional plain attributes to REMOVE.
+
+    Returns:
+        dict: 'UpdateExpression', 'ExpressionAttributeNames' and
+              'ExpressionAttributeValues', ready to be passed to update_item.
+              Callers may add a ConditionExpression and extra values.
+    """
+    derived = index_attributes(status, area, floor, slot)
+    set_values = dict(extra_set or {})
+    set_values.update(derived)
+
+    set_parts = ['#status = :status']
+    values = {':status': status}
+    for name, value in set_values.items():
+        set_parts.append(f"{name} = :{name}")
+        values[f":{name}"] = value
+
+    remove_names = list(extra_remove) + [name for name in INDEX_ATTRIBUTE_NAMES if name not in derived]
+
+    expression = 'SET ' + ', '.join(set_parts)
+    if remove_names:
+        expression += ' REMOVE ' + ', '.join(remove_names)
+
+    return {
+        'UpdateExpression': expression,
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': values
+    }
+
+
+def new_slot_item(area: int, floor: int, slot: int) -> dict:
+    """Returns a fresh, empty slot item including its index attributes."""
+    item = {
+        'parking_id'   : f"A{area}F{floor}S{slot}",
+        'area_number'  : area,
+        'floor_number' : floor,
+        'slot_number'  : slot,
+        'status'       : 'empty'
+    }
+    item.update(index_attributes('empty', area, floor, slot))
+    return item
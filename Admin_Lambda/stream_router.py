@@ -0,0 +1,257 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+
+from admin_module.stream_util import stream_image
+
+dynamodb = boto3.resource('dynamodb')
+
+# Per-handler progress inside a batch that failed. Partition key
+# 'checkpoint_key' (S, '<router>#<handler>#<sequence number>'): after a failure
+# the stream redelivers starting exactly at the reported sequence number, so
+# the redelivered batch's first record identifies the checkpoints to consult.
+# 'through' is the last sequence number the handler had already applied.
+# Items expire through the 'expires_at' TTL.
+CHECKPOINT_TABLE_NAME = os.environ.get('STREAM_CHECKPOINT_TABLE', 'StreamHandlerCheckpoints')
+CHECKPOINT_RETENTION_SECONDS = int(os.environ.get('STREAM_CHECKPOINT_RETENTION', str(24 * 3600)))
+checkpoint_table = dynamodb.Table(CHECKPOINT_TABLE_NAME)
+
+# Records a handler kept failing on, set aside so the shard can move on.
+# Partition key 'handler' (S, '<router>#<handler>'), sort key 'sequence_number'
+# (S). 'record' is the stream record as JSON, ready to be replayed once the
+# cause is fixed. Items expire through the 'expires_at' TTL.
+FAILURE_TABLE_NAME = os.environ.get('STREAM_FAILURE_TABLE', 'StreamHandlerFailures')
+FAILURE_RETENTION_SECONDS = int(os.environ.get('STREAM_FAILURE_RETENTION', str(14 * 24 * 3600)))
+failure_table = dynamodb.Table(FAILURE_TABLE_NAME)
+
+# Deliveries a handler may fail on the same record before that record is set aside
+MAX_HANDLER_ATTEMPTS = int(os.environ.get('STREAM_MAX_HANDLER_ATTEMPTS', '3'))
+
+
+def _sequence(record: dict) -> int:
+    return int(record['dynamodb']['SequenceNumber'])
+
+
+class StreamRouter:
+    """
+    Fans one DynamoDB stream batch out to several in-process handlers, so
+    every derived view is maintained from a single read of the stream.
+
+    A handler is a function taking the list of records it has not applied
+    yet. Raising counts as failing its first record, so the records it did
+    apply before raising are delivered to it again: a handler whose writes
+    are not idempotent must either skip records it already applied (as
+    occupancy_counters does with per-record markers) or be registered with
+    reports_failures=True and return the sequence numbers of the records it
+    failed on (other handlers' return values are ignored). Images are
+    decoded once per record (stream_util.stream_image) and shared by all
+    handlers, which must treat them as read-only.
+
+    Handlers run concurrently and in isolation: one that fails does not stop
+    the others. A handler registered with after='<handler>' starts only once
+    that handler has finished the batch, for views that must see its writes
+    (e.g. the digests must not announce slots the waitlist is about to
+    hold); if the earlier handler failed, the later one stops short of the
+    failed record and picks it up with the redelivery. When any handler fails, the batch is reported as failed from
+    the lowest failed sequence number, and every handler's own progress past
+    that point is checkpointed, so on redelivery each handler only sees the
+    records it has not applied yet.
+
+    Retries are bounded per handler: once a handler has failed on the same
+    record MAX_HANDLER_ATTEMPTS times, the records it keeps failing on are
+    written to the failure table instead, so one broken view (e.g. SNS being
+    down for the digests) cannot hold every other view at the same record.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.handlers = []  # Format: [ (handler_name, function) ]
+        self._reports_failures = set()
+        self._after = {}  # Format: { handler_name: handler it waits for }
+
+    def register(self, handler_name: str, function, reports_failures: bool = False, after: str = None) -> None:
+        if any(name == handler_name for name, _ in self.handlers):
+            raise ValueError(f"Stream handler '{handler_name}' is already registered.")
+        if after is not None and not any(name == after for name, _ in self.handlers):
+            raise ValueError(f"Stream handler '{handler_name}' must be registered after '{after}'.")
+        self.handlers.append((handler_name, function))
+        if reports_failures:
+            self._reports_failures.add(handler_name)
+        if after is not None:
+            self._after[handler_name] = after
+
+    def _checkpoint_key(self, handler_name: str, sequence: int) -> str:
+        return f"{self.name}#{handler_name}#{sequence}"
+
+    def _read_checkpoints(self, first_sequence: int) -> dict:
+        """Returns {handler_name: through_sequence} for a redelivered batch, one batch read."""
+        keys = {self._checkpoint_key(name, first_sequence): name for name, _ in self.handlers}
+        request = {CHECKPOINT_TABLE_NAME: {'Keys': [{'checkpoint_key': key} for key in keys]}}
+        through = {}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(CHECKPOINT_TABLE_NAME, []):
+                through[keys[item['checkpoint_key']]] = int(item['through'])
+            request = response.get('UnprocessedKeys') or None
+        return through
+
+    def _write_checkpoints(self, retry_from: int, through: dict) -> None:
+        expires_at = int(time.time()) + CHECKPOINT_RETENTION_SECONDS
+        with checkpoint_table.batch_writer() as batch:
+            for handler_name, sequence in through.items():
+                batch.put_item(Item={
+                    'checkpoint_key': self._checkpoint_key(handler_name, retry_from),
+                    'through': sequence,
+                    'expires_at': expires_at
+                })
+
+    def _count_attempt(self, handler_name: str, sequence: int) -> int:
+        """Counts one more failed delivery of `sequence` to a handler; returns the total so far."""
+        response = checkpoint_table.update_item(
+            Key={'checkpoint_key': f"{self._checkpoint_key(handler_name, sequence)}#attempts"},
+            UpdateExpression='ADD attempts :one SET expires_at = :expires_at',
+            ExpressionAttributeValues={':one': 1, ':expires_at': int(time.time()) + CHECKPOINT_RETENTION_SECONDS},
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['attempts'])
+
+    def _dead_letter(self, handler_name: str, records: list, error: str) -> None:
+        """Sets records aside in the failure table for one handler."""
+        failed_at = int(time.time())
+        with failure_table.batch_writer() as batch:
+            for record in records:
+                raw = {key: value for key, value in record.items() if key != '_decoded'}
+                batch.put_item(Item={
+                    'handler': f"{self.name}#{handler_name}",
+                    'sequence_number': record['dynamodb']['SequenceNumber'],
+                    'event_name': record.get('eventName'),
+                    'error': error,
+                    'record': json.dumps(raw, default=str),
+                    'failed_at': failed_at,
+                    'expires_at': failed_at + FAILURE_RETENTION_SECONDS
+                })
+        print(f"[ERROR] Stream handler '{handler_name}' gave up on {len(records)} records "
+              f"after {MAX_HANDLER_ATTEMPTS} attempts; they are in {FAILURE_TABLE_NAME}.")
+
+    def _apply(self, handler_name: str, function, records: list) -> tuple:
+        """
+        Calls a handler once. Returns (failed sequence numbers in order,
+        error message, whether the handler raised).
+        """
+        try:
+            result = function(records)
+        except Exception as e:
+            return [_sequence(records[0])], f"{type(e).__name__}: {e}", True
+        if handler_name not in self._reports_failures:
+            return [], None, False
+        failed = sorted(int(sequence) for sequence in result or [])
+        return failed, 'Reported as failed by the handler.', False
+
+    def _give_up(self, handler_name: str, function, records: list, failed: list, error: str, raised: bool) -> None:
+        """
+        Moves past records a handler has exhausted its attempts on. Reported
+        failures are dead-lettered as they are; a handler that raised does not
+        say which record broke it, so it gets the records one at a time and
+        only the ones that fail again are dead-lettered.
+        """
+        if not raised:
+            failed = set(failed)
+            self._dead_letter(handler_name, [record for record in records if _sequence(record) in failed], error)
+            return
+        for record in records:
+            record_failed, record_error, _ = self._apply(handler_name, function, [record])
+            if record_failed:
+                self._dead_letter(handler_name, [record], record_error)
+
+    def _run(self, handler_name: str, function, records: list):
+        """Runs one handler; returns the lowest sequence number it failed on, or None."""
+        if not records:
+            return None
+        started = time.monotonic()
+        failed, error, raised = self._apply(handler_name, function, records)
+        if failed:
+            print(f"[ERROR] Stream handler '{handler_name}' failed from sequence {failed[0]}: {error}")
+            if self._count_attempt(handler_name, failed[0]) >= MAX_HANDLER_ATTEMPTS:
+                self._give_up(handler_name, function, records, failed, error, raised)
+                failed = []
+        elapsed_ms = (time.monotonic() - started) * 1000
+        print(f"Stream handler '{handler_name}' processed {len(records)} records in {elapsed_ms:.0f} ms"
+              + (f", {len(failed)} failed." if failed else "."))
+        return failed[0] if failed else None
+
+    def _run_after(self, handler_name: str, function, records: list, dependency):
+        """
+        Runs one handler once the handler it waits for is done. Records from
+        the dependency's failure onwards are left for the redelivery, and
+        reported as this handler's failure without counting an attempt.
+        """
+        blocked_from = dependency.result()
+        if blocked_from is None:
+            return self._run(handler_name, function, records)
+        failed = self._run(handler_name, function, [record for record in records if _sequence(record) < blocked_from])
+        return blocked_from if failed is None else min(failed, blocked_from)
+
+    def process(self, records: list) -> dict:
+        """
+        Description:
+            Runs every registered handler over a batch.
+
+        Args:
+            records (list): DynamoDB stream records, in stream order.
+
+        Returns:
+            dict: The partial batch response, {'batchItemFailures': [...]},
+                  with at most one entry: the sequence number to resume from.
+        """
+        if not records:
+            return {'batchItemFailures': []}
+
+        # Decode up front so the handler threads share the cached images
+        for record in records:
+            stream_image(record, 'NewImage')
+            stream_image(record, 'OldImage')
+
+        sequences = [_sequence(record) for record in records]
+        done = self._read_checkpoints(sequences[0])
+
+        pending = {}
+        for handler_name, function in self.handlers:
+            skip_through = done.get(handler_name)
+            pending[handler_name] = [record for record, sequence in zip(records, sequences)
+                                     if skip_through is None or sequence > skip_through]
+            if skip_through is not None:
+                print(f"Stream handler '{handler_name}' resumes after sequence {skip_through}.")
+
+        # One worker per handler, so a handler waiting for another never starves it
+        with ThreadPoolExecutor(max_workers=max(len(self.handlers), 1)) as executor:
+            futures = {}
+            for handler_name, function in self.handlers:
+                after = self._after.get(handler_name)
+                if after is None:
+                    futures[handler_name] = executor.submit(self._run, handler_name, function, pending[handler_name])
+                else:
+                    futures[handler_name] = executor.submit(self._run_after, handler_name, function,
+                                                            pending[handler_name], futures[after])
+            failures = {handler_name: future.result() for handler_name, future in futures.items()}
+
+        failed = [sequence for sequence in failures.values() if sequence is not None]
+        if not failed:
+            return {'batchItemFailures': []}
+
+        retry_from = min(failed)
+        through = {}
+        for handler_name, _ in self.handlers:
+            handler_failed = failures[handler_name]
+            applied = [sequence for sequence in sequences
+                       if handler_failed is None or sequence < handler_failed]
+            if applied and applied[-1] >= retry_from:
+                through[handler_name] = max(applied[-1], done.get(handler_name, 0))
+            elif handler_name in done and done[handler_name] >= retry_from:
+                through[handler_name] = done[handler_name]
+        self._write_checkpoints(retry_from, through)
+
+        print(f"Retrying from sequence {retry_from}; handlers already past it: {sorted(through)}.")
+        identifier = records[sequences.index(retry_from)]['dynamodb']['SequenceNumber']
+        return {'batchItemFailures': [{'itemIdentifier': identifier}]}
@@ -0,0 +1,55 @@
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+
+# Decoded images are cached on the record under this key, so every handler
+# that looks at the same record shares one decoding.
+DECODED_KEY = '_decoded'
+
+
+def _decode_map(value: dict) -> dict:
+    return {key: decode_attribute(item) for key, item in value.items()}
+
+
+_DECODERS = {
+    'S': lambda value: value,
+    'N': Decimal,
+    'BOOL': lambda value: value,
+    'NULL': lambda value: None,
+    'M': _decode_map,
+    'L': lambda value: [decode_attribute(item) for item in value],
+    'SS': set,
+    'NS': lambda value: {Decimal(number) for number in value},
+    'B': Binary,
+    'BS': lambda value: {Binary(item) for item in value},
+}
+
+
+def decode_attribute(value: dict):
+    """
+    Decodes one typed attribute value ({'S': 'x'}, {'N': '3'}, ...) into the
+    same Python value boto3's TypeDeserializer returns, with a single dict
+    lookup per value instead of its per-call validation and method dispatch.
+    """
+    (kind, data), = value.items()
+    return _DECODERS[kind](data)
+
+
+def stream_image(record: dict, name: str):
+    """
+    Decodes one image of a DynamoDB stream record into plain Python values.
+    The result is cached on the record, so repeated calls (from several
+    handlers of the same batch) decode it only once. Callers must not
+    modify the returned dict.
+
+    Args:
+        record (dict): A DynamoDB stream record.
+        name (str): 'NewImage' or 'OldImage'.
+
+    Returns:
+        dict | None: The decoded item, or None if the record has no such image.
+    """
+    cache = record.setdefault(DECODED_KEY, {})
+    if name not in cache:
+        image = record.get('dynamodb', {}).get(name)
+        cache[name] = _decode_map(image) if image else None
+    return cache[name]
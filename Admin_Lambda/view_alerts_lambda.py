@@ -6,6 +6,7 @@ from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 
 from admin_module.logging_util import create_admin_log
+from admin_module.scan_util import parallel_scan
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb')
@@ -38,21 +39,13 @@ def lambda_handler(event, context):
         table = dynamodb.Table(table_name)
         
         # --- MODIFIED LOGIC: Using Scan instead of Query ---
-        # A scan reads the entire table, which can be inefficient for large tables.
-        scan_kwargs = {
-            'FilterExpression': Key('status').eq('occupied')
-        }
-        
-        occupied_slots = []
-        done = False
-        start_key = None
-        while not done:
-            if start_key:
-                scan_kwargs['ExclusiveStartKey'] = start_key
-            response = table.scan(**scan_kwargs)
-            occupied_slots.extend(response.get('Items', []))
-            start_key = response.get('LastEvaluatedKey', None)
-            done = start_key is None
+        # A scan reads the entire table; the segments are read in parallel and
+        # only the attributes needed for an alert are returned.
+        occupied_slots = parallel_scan(
+            table,
+            projection=['parking_id', 'vehicle_id', 'email', 'expected_time'],
+            filter_expression=Key('status').eq('occupied')
+        )
         # ----------------------------------------------------
         
         alerts = []
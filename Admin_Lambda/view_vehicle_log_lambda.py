@@ -5,6 +5,7 @@ from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 
 from admin_module.logging_util import create_admin_log
+from admin_module.scan_util import parallel_scan
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb')
@@ -30,21 +31,9 @@ def lambda_handler(event, context):
         
         # --- Scan Operation with Filter ---
         # This reads the entire table and then filters, which can be inefficient
-        # on very large tables without a GSI on the 'date' attribute.
-        scan_kwargs = {
-            'FilterExpression': Key('date').eq(target_date)
-        }
-        
-        matching_logs = []
-        done = False
-        start_key = None
-        while not done:
-            if start_key:
-                scan_kwargs['ExclusiveStartKey'] = start_key
-            response = table.scan(**scan_kwargs)
-            matching_logs.extend(response.get('Items', []))
-            start_key = response.get('LastEvaluatedKey', None)
-            done = start_key is None
+        # on very large tables without a GSI on the 'date' attribute. The
+        # segments are scanned in parallel to cut the wall-clock time.
+        matching_logs = list(parallel_scan(table, filter_expression=Key('date').eq(target_date)))
         # ---------------------------------
         
         # Log the admin action
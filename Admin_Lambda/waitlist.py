@@ -0,0 +1,332 @@
+import os
+import time
+from datetime import datetime, timezone
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from admin_module.slot_keys import HELD_KEY_STATUS, index_attributes, status_area_floor
+from admin_module.stream_util import stream_image
+from admin_module.expiry_schedule import minute_bucket, buckets_after
+from admin_module.ses_dispatcher import dispatch, email_job
+from admin_module import notification_ledger
+
+dynamodb = boto3.resource('dynamodb')
+slots_table = dynamodb.Table(os.environ.get('DYNAMODB_TABLE_NAME', 'ParkingSlotDatabase'))
+
+# Per-floor priority queues of drivers waiting for a slot. Partition key
+# 'area_floor' (S), sort key 'queue_key' (S); four kinds of items:
+#   'A1#F3'           / 'Q#<priority:02d>#<joined_at>#<vehicle_id>'  queue entry,
+#                       lowest priority first, then first come first served
+#   'A1#F3'           / 'SEQ'   join sequence numbers: 'last_seq' handed out,
+#                       'head_seq' of the entry last served
+#   'VEHICLE#<id>'    / 'A1#F3'   the vehicle's membership: 'waiting' or 'held'
+#                       (with 'parking_id' and 'held_until')
+#   'HOLDS#<minute>'  / '<parking_id>#<vehicle_id>'  holds lapsing in that minute
+# User_Lambda/waitlist.py writes entries, memberships and 'last_seq' when a
+# driver joins; 'head_seq' lets it estimate a joiner's position in O(1).
+WAITLIST_TABLE_NAME = os.environ.get('WAITLIST_TABLE', 'FloorWaitlist')
+waitlist_table = dynamodb.Table(WAITLIST_TABLE_NAME)
+
+QUEUE_PREFIX = 'Q#'
+SEQUENCE_KEY = 'SEQ'
+HOLD_SECONDS = int(os.environ.get('WAITLIST_HOLD_SECONDS', '300'))
+# Most minutes of lapsed holds one sweep catches up on after its checkpoint
+HOLD_SWEEP_MAX_CATCHUP_MINUTES = int(os.environ.get('WAITLIST_HOLD_MAX_CATCHUP_MINUTES', '1440'))
+SWEEPER_NAME = 'WaitlistHoldSweeper'
+MAX_OFFER_ATTEMPTS = 5
+SENDER_EMAIL = "rjagdale2523@gmail.com"  # Verified sender email
+
+
+def area_floor(area_number, floor_number) -> str:
+    return f"A{int(area_number)}#F{int(floor_number)}"
+
+
+def vehicle_key(vehicle_id: str) -> str:
+    return f"VEHICLE#{vehicle_id}"
+
+
+def _queue_head(queue: str):
+    response = waitlist_table.query(
+        KeyConditionExpression=Key('area_floor').eq(queue) & Key('queue_key').begins_with(QUEUE_PREFIX),
+        Limit=1,
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+
+def _pop(entry: dict) -> bool:
+    """Removes a queue entry; False if another offer already took it."""
+    try:
+        waitlist_table.delete_item(
+            Key={'area_floor': entry['area_floor'], 'queue_key': entry['queue_key']},
+            ConditionExpression='attribute_exists(queue_key)'
+        )
+        return True
+    except waitlist_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def _advance_head(entry: dict) -> None:
+    """Records that the queue has been served up to `entry`, for position estimates."""
+    if 'seq' not in entry:
+        return # Joined before entries carried a sequence number
+    try:
+        waitlist_table.update_item(
+            Key={'area_floor': entry['area_floor'], 'queue_key': SEQUENCE_KEY},
+            UpdateExpression='SET head_seq = :seq',
+            ConditionExpression='attribute_not_exists(head_seq) OR head_seq < :seq',
+            ExpressionAttributeValues={':seq': entry['seq']}
+        )
+    except waitlist_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass # Already served past it
+
+
+def _hold(slot: dict, vehicle_id: str, held_until: int, previous_holder: str = None) -> bool:
+    """
+    Reserves an empty slot for one vehicle. The slot leaves FreeSlotIndex
+    and moves to the 'held' partition of the status index while held, so
+    neither other gates nor the public floor status see it; the
+    allocator's claim condition also refuses it to anyone but the holder.
+    """
+    values = {
+        ':empty': 'empty', ':vehicle': vehicle_id, ':until': held_until,
+        ':held_key': status_area_floor(HELD_KEY_STATUS, slot['area_number'], slot['floor_number'])
+    }
+    if previous_holder:
+        condition = '#status = :empty AND held_for = :previous'
+        values[':previous'] = previous_holder
+    else:
+        condition = '#status = :empty AND (attribute_not_exists(held_for) OR held_until < :now)'
+        values[':now'] = int(time.time())
+    try:
+        slots_table.update_item(
+            Key={'parking_id': slot['parking_id']},
+            UpdateExpression='SET held_for = :vehicle, held_until = :until, status_area_floor = :held_key '
+                             'REMOVE free_area, free_floor_slot',
+            ConditionExpression=condition,
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues=values
+        )
+        return True
+    except slots_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def _release(slot: dict, previous_holder: str) -> bool:
+    """Returns a lapsed hold to the free pool if it is still empty and still held by `previous_holder`."""
+    free = index_attributes('empty', slot['area_number'], slot['floor_number'], slot['slot_number'])
+    try:
+        slots_table.update_item(
+            Key={'parking_id': slot['parking_id']},
+            UpdateExpression='SET free_area = :free_area, free_floor_slot = :free_floor_slot, '
+                             'status_area_floor = :status_area_floor REMOVE held_for, held_until',
+            ConditionExpression='#status = :empty AND held_for = :previous',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':empty': 'empty', ':previous': previous_holder,
+                ':free_area': free['free_area'], ':free_floor_slot': free['free_floor_slot'],
+                ':status_area_floor': free['status_area_floor']
+            }
+        )
+        return True
+    except slots_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def offer_slot(slot: dict, previous_holder: str = None):
+    """
+    Description:
+        Hands a freed slot to the head of its floor's queue with a hold of
+        HOLD_SECONDS. Each step is one key lookup or conditional write on the
+        queue's sort key, so the cost does not grow with the queue length.
+        Entries whose own deadline passed are dropped on the way.
+
+    Args:
+        slot (dict): The slot item ('parking_id', 'area_number',
+                     'floor_number', 'slot_number').
+        previous_holder (str): Set when re-offering a lapsed hold; the slot
+                               must still be held by this vehicle.
+
+    Returns:
+        dict | None: The queue entry the slot is now held for, or None if the
+                     queue is empty or the slot was taken meanwhile.
+    """
+    queue = area_floor(slot['area_number'], slot['floor_number'])
+    now = int(time.time())
+    for _ in range(MAX_OFFER_ATTEMPTS):
+        head = _queue_head(queue)
+        if not head:
+            return None
+        if not _pop(head):
+            continue # Another offer took this entry; look again
+        if int(head.get('expires_at', now + 1)) <= now:
+            try:
+                # The driver may have rejoined since; only drop the membership this entry belongs to
+                waitlist_table.delete_item(
+                    Key={'area_floor': vehicle_key(head['vehicle_id']), 'queue_key': queue},
+                    ConditionExpression='entry_key = :entry',
+                    ExpressionAttributeValues={':entry': head['queue_key']}
+                )
+            except waitlist_table.meta.client.exceptions.ConditionalCheckFailedException:
+                pass
+            _advance_head(head)
+            continue
+
+        held_until = now + HOLD_SECONDS
+        if not _hold(slot, head['vehicle_id'], held_until, previous_holder):
+            # The slot was claimed before we could hold it; the driver keeps their place
+            waitlist_table.put_item(Item=head)
+            return None
+        _advance_head(head)
+
+        waitlist_table.put_item(Item={
+            'area_floor': f"HOLDS#{minute_bucket(datetime.fromtimestamp(held_until, timezone.utc))}",
+            'queue_key': f"{slot['parking_id']}#{head['vehicle_id']}",
+            'parking_id': slot['parking_id'],
+            'area_number': int(slot['area_number']),
+            'floor_number': int(slot['floor_number']),
+            'slot_number': int(slot['slot_number']),
+            'vehicle_id': head['vehicle_id'],
+            'expires_at': held_until + 24 * 3600
+        })
+        waitlist_table.update_item(
+            Key={'area_floor': vehicle_key(head['vehicle_id']), 'queue_key': queue},
+            UpdateExpression='SET #state = :held, parking_id = :parking_id, held_until = :until',
+            ExpressionAttributeNames={'#state': 'state'},
+            ExpressionAttributeValues={':held': 'held', ':parking_id': slot['parking_id'], ':until': held_until}
+        )
+        head['parking_id'] = slot['parking_id']
+        head['held_until'] = held_until
+        return head
+    return None
+
+
+def _offer_message(entry: dict) -> str:
+    until = datetime.fromtimestamp(int(entry['held_until']), timezone.utc).strftime('%H:%M')
+    return (f"Good news! Slot {entry['parking_id']} is now reserved for vehicle {entry['vehicle_id']}.\n"
+            f"Please enter before {until} UTC, after which the slot goes to the next driver in line.")
+
+
+def offer_freed_slots(records: list) -> int:
+    """
+    Stream handler: offers every slot that became empty in the batch to its
+    floor's waitlist, and mails the drivers who got a hold through the SES
+    dispatcher.
+
+    Returns:
+        int: The number of holds placed.
+    """
+    offers = []
+    for record in records:
+        old_image = stream_image(record, 'OldImage')
+        new_image = stream_image(record, 'NewImage')
+        if not new_image or new_image.get('status') != 'empty':
+            continue
+        if old_image and old_image.get('status') == 'empty':
+            continue # Hold bookkeeping and other updates of an already free slot
+        entry = offer_slot(new_image)
+        if entry:
+            offers.append(entry)
+
+    jobs = [email_job(entry['email'], "Your parking slot is reserved", _offer_message(entry), SENDER_EMAIL)
+            for entry in offers if entry.get('email')]
+    if jobs:
+        dispatch(jobs)
+    return len(offers)
+
+
+def held_slot_for(vehicle_id: str, area: int, floor: int = None):
+    """
+    Returns the slot currently held for a vehicle in an area (and floor, if
+    given) as a FreeSlotIndex-like item, or None.
+    """
+    response = waitlist_table.query(
+        KeyConditionExpression=Key('area_floor').eq(vehicle_key(vehicle_id)),
+        ConsistentRead=True
+    )
+    now = int(time.time())
+    for membership in response.get('Items', []):
+        queue = membership['queue_key']
+        if membership.get('state') != 'held' or int(membership.get('held_until', 0)) <= now:
+            continue
+        if not (queue == area_floor(area, floor) if floor else queue.startswith(f"A{int(area)}#F")):
+            continue
+        area_number, floor_number = (int(part[1:]) for part in queue.split('#'))
+        return {
+            'parking_id': membership['parking_id'],
+            'area_number': area_number,
+            'floor_number': floor_number,
+            'slot_number': int(membership['parking_id'].split('S')[-1]),
+            'waitlist_queue': queue
+        }
+    return None
+
+
+def complete_hold(vehicle_id: str, queue: str) -> None:
+    """Drops a vehicle's membership once it has parked in its held slot."""
+    waitlist_table.delete_item(Key={'area_floor': vehicle_key(vehicle_id), 'queue_key': queue})
+
+
+def sweep_lapsed_holds(moment: datetime = None) -> dict:
+    """
+    Description:
+        Re-offers holds whose driver did not arrive in time. Lapsing holds are
+        filed under their minute, so a sweep reads the buckets after its
+        checkpoint (at most HOLD_SWEEP_MAX_CATCHUP_MINUTES of them) instead of
+        every slot, and a late or skipped sweep is caught up. Each lapsed
+        hold goes to the next driver in line, or back to the free pool;
+        releases are idempotent, so re-reading a bucket is harmless.
+
+    Returns:
+        dict: {'reoffered': int, 'released': int}
+    """
+    moment = moment or datetime.now(timezone.utc)
+    now = int(moment.timestamp())
+    counts = {'reoffered': 0, 'released': 0}
+    offers = []
+    checkpoint = notification_ledger.read_checkpoint(SWEEPER_NAME)
+    buckets = buckets_after(checkpoint, moment, HOLD_SWEEP_MAX_CATCHUP_MINUTES)
+    read_buckets = []
+    failed_buckets = set()
+    for bucket in buckets:
+        try:
+            response = waitlist_table.query(KeyConditionExpression=Key('area_floor').eq(f"HOLDS#{bucket}"))
+        except Exception as e:
+            print(f"[ERROR] Failed to read lapsed holds for {bucket}: {e}")
+            break
+        read_buckets.append(bucket)
+        for hold in response.get('Items', []):
+            try:
+                slot = slots_table.get_item(Key={'parking_id': hold['parking_id']}, ConsistentRead=True).get('Item')
+                if (not slot or slot.get('held_for') != hold['vehicle_id']
+                        or int(slot.get('held_until', 0)) > now):
+                    continue # Already taken, released or re-held
+
+                waitlist_table.delete_item(Key={'area_floor': vehicle_key(hold['vehicle_id']),
+                                                'queue_key': area_floor(hold['area_number'], hold['floor_number'])})
+                entry = offer_slot(slot, previous_holder=hold['vehicle_id'])
+                if entry:
+                    offers.append(entry)
+                    counts['reoffered'] += 1
+                elif _release(slot, hold['vehicle_id']):
+                    counts['released'] += 1
+            except Exception as e:
+                print(f"[ERROR] Failed to sweep hold on {hold.get('parking_id')}: {e}")
+                failed_buckets.add(bucket)
+
+    # Advance over the fully handled buckets; the first failed one is read again next
+    # sweep. Holds in the current minute may not have lapsed yet, so it is read again too.
+    handled = None
+    for bucket in read_buckets[:-1]:
+        if bucket in failed_buckets:
+            break
+        handled = bucket
+    if handled:
+        notification_ledger.advance_checkpoint(SWEEPER_NAME, handled)
+
+    jobs = [email_job(entry['email'], "Your parking slot is reserved", _offer_message(entry), SENDER_EMAIL)
+            for entry in offers if entry.get('email')]
+    if jobs:
+        dispatch(jobs)
+    return counts
@@ -0,0 +1,11 @@
+from admin_module.waitlist import sweep_lapsed_holds
+
+def lambda_handler(event, context):
+    """
+    Runs every minute. Slots held for a waitlisted driver who did not arrive
+    in time go to the next driver in the floor's queue, or back to the free
+    pool when nobody is waiting.
+    """
+    counts = sweep_lapsed_holds()
+    print(f"Lapsed holds: {counts['reoffered']} re-offered, {counts['released']} released.")
+    return {'statusCode': 200, 'body': 'Waitlist hold sweep completed.'}
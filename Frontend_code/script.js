@@ -2,6 +2,8 @@ document.addEventListener('DOMContentLoaded', () => {
     // --- CONFIGURATION ---
     // IMPORTANT: Replace this with your actual API Gateway Invoke URL
     const API_BASE_URL = 'XXXXXXXXXXXXXXXXXXXXXX';
+    // Polls only fetch the slots changed since the last cursor, so they are cheap
+    const SYNC_INTERVAL_MS = 5000;
 
     // --- DOM ELEMENT SELECTORS ---
     const pages = document.querySelectorAll('.page');
@@ -11,11 +13,17 @@ document.addEventListener('DOMContentLoaded', () => {
     const modal = document.getElementById('manual-entry-modal');
     const closeModalBtn = document.querySelector('.close-button');
 
+    // --- DELTA SYNC STATE ---
+    const slotsById = new Map();
+    let syncCursor = null;
+    let syncInFlight = false;
+
     // --- INITIALIZATION ---
     function initializeDashboard() {
         fetchDashboardStatus();
         fetchAlerts();
         setupEventListeners();
+        setInterval(syncSlotChanges, SYNC_INTERVAL_MS);
         // Set today's date in the log viewer
         document.getElementById('log-date').valueAsDate = new Date();
     }
@@ -92,22 +100,96 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- DATA FETCHING & RENDERING ---
 
-    // Fetches main dashboard stats and slot list (from get_parking_status_lambda)
-    async function fetchDashboardStatus() {
+    // Fetches main dashboard stats and, unless withSlots is false, the slot list (from get_parking_status_lambda)
+    async function fetchDashboardStatus({ withSlots = true } = {}) {
         try {
-            const data = await apiRequest('/admin/status', 'GET');
+            const data = await apiRequest(withSlots ? '/admin/status?detail=slots&format=compact' : '/admin/status', 'GET');
             document.getElementById('total-spots').textContent = data.total_spots;
             document.getElementById('occupied-spots').textContent = data.occupied_spots;
             document.getElementById('available-spots').textContent = data.available_spots;
             document.getElementById('occupancy-rate').textContent = `${data.occupancy_rate.toFixed(1)}%`;
-            renderParkingTable(data.slots);
+            if (withSlots) {
+                const slots = data.snapshot ? decodeCompactSnapshot(data.snapshot) : (data.slots || []);
+                slotsById.clear();
+                slots.forEach(slot => slotsById.set(slot.parking_id, slot));
+                syncCursor = data.version;
+                renderParkingTable(slots);
+            }
         } catch (error) {
             console.error('Failed to fetch dashboard status.');
         }
     }
 
+    // Expands the compact snapshot (slot ranges + run-length status codes per floor) into slot objects
+    function decodeCompactSnapshot(snapshot) {
+        const slots = [];
+        snapshot.floors.forEach(floor => {
+            const occupants = new Map(floor.occupants.map(([slotNumber, vehicleId, email]) => [slotNumber, { vehicleId, email }]));
+            const statuses = [];
+            for (let i = 0; i < floor.runs.length; i += 2) {
+                const status = snapshot.status_codes[floor.runs[i]];
+                for (let n = 0; n < floor.runs[i + 1]; n++) statuses.push(status);
+            }
+            let index = 0;
+            floor.ranges.forEach(([first, count]) => {
+                for (let slotNumber = first; slotNumber < first + count; slotNumber++) {
+                    const occupant = occupants.get(slotNumber);
+                    slots.push({
+                        parking_id: `A${floor.area_number}F${floor.floor_number}S${slotNumber}`,
+                        area_number: floor.area_number,
+                        floor_number: floor.floor_number,
+                        slot_number: slotNumber,
+                        status: statuses[index++],
+                        vehicle_id: occupant ? occupant.vehicleId : undefined,
+                        email: occupant ? occupant.email : undefined
+                    });
+                }
+            });
+        });
+        return slots;
+    }
+
+    // Applies the slot changes since the last snapshot/cursor (from get_slot_changes_lambda)
+    async function syncSlotChanges() {
+        if (syncInFlight) return;
+        if (syncCursor === null || syncCursor === undefined) {
+            return fetchDashboardStatus();
+        }
+        syncInFlight = true;
+        try {
+            let changed = false;
+            let hasMore = true;
+            while (hasMore) {
+                const data = await apiRequest(`/admin/status/changes?since=${syncCursor}`, 'GET');
+                if (data.resync) {
+                    await fetchDashboardStatus();
+                    return;
+                }
+                data.changes.forEach(change => {
+                    if (change.deleted) {
+                        slotsById.delete(change.parking_id);
+                    } else {
+                        slotsById.set(change.parking_id, change.slot);
+                    }
+                });
+                changed = changed || data.changes.length > 0;
+                syncCursor = data.cursor;
+                hasMore = data.has_more;
+            }
+            if (changed) {
+                renderParkingTable(Array.from(slotsById.values()));
+                fetchDashboardStatus({ withSlots: false });
+            }
+        } catch (error) {
+            console.error('Failed to sync slot changes.');
+        } finally {
+            syncInFlight = false;
+        }
+    }
+
     // Renders the main table with all parking spots
     function renderParkingTable(slots) {
+        const selectedIds = new Set(getSelectedSlotIds()); // Keep selections across background syncs
         parkingDataBody.innerHTML = ''; // Clear existing data
         if (!slots || slots.length === 0) {
             parkingDataBody.innerHTML = `<tr><td colspan="6">No parking spots found. Initialize the system.</td></tr>`;
@@ -121,7 +203,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
             const row = document.createElement('tr');
             row.innerHTML = `
-                <td><input type="checkbox" class="slot-checkbox" data-id="${slot.parking_id}"></td>
+                <td><input type="checkbox" class="slot-checkbox" data-id="${slot.parking_id}" ${selectedIds.has(slot.parking_id) ? 'checked' : ''}></td>
                 <td><b>${slot.parking_id}</b></td>
                 <td><span class="status-badge ${statusClass}">${slot.status}</span></td>
                 <td>${slot.vehicle_id || 'N/A'}</td>
@@ -1,75 +1,92 @@
+import os
 from datetime import datetime, timezone
-import boto3
- 
-# Initialize AWS services
-dynamodb = boto3.resource('dynamodb')
-ses = boto3.client('ses')
-table = dynamodb.Table('ParkingSlotDatabase')
+from admin_module.expiry_schedule import due_reminders, buckets_after, reminder_session_key, is_current_stage
+from admin_module import notification_ledger
+from admin_module.ses_dispatcher import dispatch, email_job, SENT, SPILLED, FAILED
  
 SENDER_EMAIL = "rjagdale2523@gmail.com"  # Verified sender email
+SENDER_NAME = 'SlotExpiryNotifier'
+# Minutes of missed ticks to catch up on; older reminders are no longer useful
+MAX_CATCHUP_MINUTES = int(os.environ.get('EXPIRY_MAX_CATCHUP_MINUTES', '10'))
+ 
+def claim_reminder(reminder):
+    """
+    Claims one reminder stage in the notification ledger and returns its send
+    job, or None if the stage is already sent or being sent, or is no longer
+    one of the reminder stages.
+    """
+    if not is_current_stage(reminder):
+        return None
+    session_key = reminder_session_key(reminder)
+    stage = reminder['stage']
+    claim_id = notification_ledger.claim(session_key, stage, {'email': reminder['email'], 'parking_id': reminder['parking_id']})
+    if not claim_id:
+        print(f"[DEBUG] Skipping {session_key} {stage}: already sent")
+        return None
+    return email_job(
+        to=reminder['email'],
+        subject="Smart Parking Expiry Notification",
+        body=reminder['message'],
+        source=SENDER_EMAIL,
+        ledger_key={'session_key': session_key, 'stage': stage, 'claim_id': claim_id}
+    )
  
 def lambda_handler(event, context):
+    """
+    Runs every minute. Reminders are written into per-minute buckets of the
+    expiry schedule when a vehicle parks (see admin_module.expiry_schedule).
+    Each tick reads the buckets after its checkpoint up to the current minute,
+    so a late or skipped tick is caught up, and the notification ledger makes
+    overlapping or repeated reads send every stage exactly once.
+ 
+    The claimed reminders are sent by the rate-limited SES dispatcher; what it
+    cannot send before the deadline is spilled to its queue, not lost.
+    """
     now = datetime.now(timezone.utc)
-    print(f"[DEBUG] Current UTC time: {now}")
  
     try:
-        response = table.scan(
-            FilterExpression=boto3.dynamodb.conditions.Attr('status').eq('occupied')
-        )
+        checkpoint = notification_ledger.read_checkpoint(SENDER_NAME)
+        buckets = buckets_after(checkpoint, now, MAX_CATCHUP_MINUTES)
     except Exception as e:
-        print(f"[ERROR] Failed to scan table: {e}")
-        return {'statusCode': 500, 'body': 'DynamoDB scan failed'}
- 
-    items = response.get('Items', [])
-    print(f"[DEBUG] Found {len(items)} occupied slots")
- 
-    for item in items:
+        print(f"[ERROR] Failed to read notifier checkpoint: {e}")
+        return {'statusCode': 500, 'body': 'Checkpoint read failed'}
+    print(f"[DEBUG] Current UTC time: {now}, checkpoint {checkpoint}, buckets {buckets[0]}..{buckets[-1]}")
+ 
+    jobs = []
+    failed_buckets = set()
+    read_buckets = []
+    for bucket in buckets:
         try:
-            parking_id = item.get('parking_id')
-            email = item.get('email')
-            expected_time_str = item.get('expected_time')
- 
-            if not all([parking_id, email, expected_time_str]):
-                print(f"[WARN] Skipping incomplete item: {item}")
-                continue
- 
-            expiry = datetime.fromisoformat(expected_time_str)
-            if expiry.tzinfo is None:
-                expiry = expiry.replace(tzinfo=timezone.utc)
- 
-            diff_mins = (expiry - now).total_seconds() / 60
-            msg = None
- 
-            # ✅ Case 1: Only send if exactly 10 minutes left (within ±30 sec)
-            if 9.5 <= diff_mins <= 10.5:
-                msg = f"Reminder: Your slot {parking_id} will expire in 10 minutes."
- 
-            # ✅ Case 2: Send once when 1–3 minutes left
-            elif 1 <= round(diff_mins) <= 3:
-                msg = f"Final warning: Your slot {parking_id} will expire in {round(diff_mins)} minutes."
- 
-            # ✅ Case 3: On-time expiry
-            elif -0.5 <= diff_mins <= 0.5:
-                msg = f"Notice: Your slot {parking_id} has now expired."
- 
-            # ✅ Case 4: Every 10 minutes after expiry (like 10, 20, 30 min)
-            elif diff_mins < 0:
-                mins_expired = int(abs(diff_mins))
-                if mins_expired in [10, 20, 30]:
-                    msg = f"Reminder: Your slot {parking_id} expired {mins_expired} minutes ago."
- 
-            if msg:
-                ses.send_email(
-                    Source=SENDER_EMAIL,
-                    Destination={'ToAddresses': [email]},
-                    Message={
-                        'Subject': {'Data': "Smart Parking Expiry Notification"},
-                        'Body': {'Text': {'Data': msg}}
-                    }
-                )
-                print(f"[INFO] Email sent to {email} - {msg}")
- 
+            reminders = due_reminders(bucket=bucket)
         except Exception as e:
-            print(f"[ERROR] Failed to process slot {item.get('parking_id')}: {e}")
- 
-    return {'statusCode': 200, 'body': 'Notification cycle completed.'}
+            print(f"[ERROR] Failed to read expiry schedule bucket {bucket}: {e}")
+            break
+ 
+        print(f"[DEBUG] Found {len(reminders)} reminders due in {bucket}")
+        read_buckets.append(bucket)
+        for reminder in reminders:
+            try:
+                job = claim_reminder(reminder)
+            except Exception as e:
+                print(f"[ERROR] Failed to claim reminder {reminder.get('reminder_id')}: {e}")
+                failed_buckets.add(bucket)
+                continue
+            if job:
+                job['bucket'] = bucket
+                jobs.append(job)
+ 
+    result = dispatch(jobs, context=context)
+    failed_buckets.update(job['bucket'] for job in result[FAILED])
+ 
+    # Advance over the fully handled buckets; the first failed one is retried next tick.
+    # The current minute can still receive late schedule writes, so it is read again too.
+    handled = None
+    for bucket in read_buckets[:-1]:
+        if bucket in failed_buckets:
+            break
+        handled = bucket
+    if handled:
+        notification_ledger.advance_checkpoint(SENDER_NAME, handled)
+ 
+    return {'statusCode': 200, 'body': f"Notification cycle completed. Sent {len(result[SENT])} reminders, "
+                                       f"queued {len(result[SPILLED])}, {len(result[FAILED])} failed."}
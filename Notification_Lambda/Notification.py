@@ -1,75 +1,320 @@
-import json
-import boto3
-import os
-from datetime import datetime, timezone
- 
-AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-SUBSCRIPTION_TABLE_NAME = "UserSubscriptions"
-SNS_TOPIC_ARN = "arn:aws:sns:ap-south-1:180651458429:parking-slot-notifications"
- 
-# Initialize DynamoDB and SNS clients
-# dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-# subscriptions_table = dynamodb.Table(SUBSCRIPTION_TABLE_NAME)
-sns_client = boto3.client('sns', region_name=AWS_REGION)
- 
-def create_response(status_code, body):
-    return {
-        'statusCode': status_code,
-        'headers': {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
-        },
-        'body': json.dumps(body)
-    }
- 
-def lambda_handler(event, context):
-    try:
-        if event['httpMethod'] == 'OPTIONS':
-            return create_response(200, {})
- 
-        if event['httpMethod'] != 'POST':
-            return create_response(405, {'message': 'Method Not Allowed'})
- 
-        body = json.loads(event['body'])
-        email = body.get('email')
-        area_number = body.get('area_number')
-        floor_number = body.get('floor_number')
- 
-        if not email or not isinstance(area_number, int) or not isinstance(floor_number, int):
-            return create_response(400, {'message': 'Email, area_number (integer), and floor_number (integer) are required.'})
- 
-        subscription_id = f"{email.lower()}-{area_number}-{floor_number}"
-        
-        subscribe_response = sns_client.subscribe(
-            TopicArn=SNS_TOPIC_ARN,
-            Protocol='email',
-            Endpoint=email,
-            ReturnSubscriptionArn=True
-        )
-        subscription_arn = subscribe_response['SubscriptionArn']
- 
-        filter_policy = {
-            'area_number': [str(area_number)],  
-            'floor_number': [str(floor_number)]
-        }
- 
-        sns_client.set_subscription_attributes(
-            SubscriptionArn=subscription_arn,
-            AttributeName='FilterPolicy',
-            AttributeValue=json.dumps(filter_policy)
-        )
-        print(f"Set FilterPolicy for {subscription_arn}: {json.dumps(filter_policy)}")
-
- 
-        return create_response(200, {
-            'message': 'Subscription request sent successfully! Please check your email to confirm your subscription.',
-            'subscriptionId': subscription_id,
-            'subscription_arn': subscription_arn  # (Can be removed in prod)
-        })
- 
-    except json.JSONDecodeError:
-        return create_response(400, {'message': 'Invalid JSON in request body.'})
-    except Exception as e:
-        print(f"Error in subscribe_handler: {e}")
-        return create_response(500, {'message': f'An internal server error occurred: {str(e)}'})
+import json
+import boto3
+import os
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+ 
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+SUBSCRIPTION_TABLE_NAME = os.getenv("SUBSCRIPTION_TABLE", "UserSubscriptions")
+SNS_TOPIC_ARN = "arn:aws:sns:ap-south-1:180651458429:parking-slot-notifications"
+BULK_IMPORT_MAX = int(os.getenv("SUBSCRIPTION_BULK_IMPORT_MAX", "5000"))
+BULK_IMPORT_WORKERS = int(os.getenv("SUBSCRIPTION_BULK_IMPORT_WORKERS", "8"))
+# Large imports are queued here and run by SubscriptionImportWorker, since an
+# address costs up to three SNS calls and API Gateway gives up after 29 s.
+# Without a queue, only imports up to BULK_IMPORT_SYNC_MAX entries are accepted.
+IMPORT_QUEUE_URL = os.getenv("SUBSCRIPTION_IMPORT_QUEUE_URL")
+BULK_IMPORT_SYNC_MAX = int(os.getenv("SUBSCRIPTION_BULK_IMPORT_SYNC_MAX", "100"))
+IMPORT_MESSAGE_EMAILS = int(os.getenv("SUBSCRIPTION_IMPORT_MESSAGE_EMAILS", "25"))
+ 
+# Subscription registry, partition key 'subscription_id' (S).
+#   '<email>-<area>-<floor>' -> one row per area/floor an address follows
+#   '<email>'                -> the address's SNS subscription_arn and the
+#                               'area_floors' set its filter policy matches
+# The SNS topic has one subscription per address, so every area/floor of an
+# address has to live in that subscription's single filter policy.
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+subscriptions_table = dynamodb.Table(SUBSCRIPTION_TABLE_NAME)
+sns_client = boto3.client('sns', region_name=AWS_REGION)
+sqs_client = boto3.client('sqs', region_name=AWS_REGION)
+ 
+def create_response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'POST,OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
+        },
+        'body': json.dumps(body)
+    }
+ 
+def area_floor(area_number, floor_number):
+    """The 'area_floor' message attribute value published with every digest, e.g. 'A1#F3'."""
+    return f"A{int(area_number)}#F{int(floor_number)}"
+ 
+def filter_policy(area_floors):
+    return {'area_floor': sorted(area_floors)}
+ 
+def load_registry(emails):
+    """
+    Reads the address rows of the registry for many emails, 100 keys per
+    batch call. Returns { email: row }.
+    """
+    rows = {}
+    emails = list(emails)
+    for start in range(0, len(emails), 100):
+        request = {SUBSCRIPTION_TABLE_NAME: {'Keys': [{'subscription_id': email} for email in emails[start:start + 100]]}}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(SUBSCRIPTION_TABLE_NAME, []):
+                rows[item['subscription_id']] = item
+            request = response.get('UnprocessedKeys') or None
+    return rows
+ 
+def subscription_exists(subscription_arn):
+    """
+    Checks that an SNS subscription still exists. SNS deletes unconfirmed
+    email subscriptions after 3 days, and the unsubscribe link deletes
+    confirmed ones, without the registry hearing about either.
+    """
+    try:
+        sns_client.get_subscription_attributes(SubscriptionArn=subscription_arn)
+        return True
+    except sns_client.exceptions.NotFoundException:
+        return False
+ 
+def _forget_subscription(email, registry_row):
+    """Deletes the per-area/floor rows of an address whose SNS subscription is gone."""
+    with subscriptions_table.batch_writer() as batch:
+        for value in registry_row.get('area_floors', set()):
+            area_part, floor_part = value.split('#')
+            batch.delete_item(Key={'subscription_id': f"{email}-{area_part[1:]}-{floor_part[1:]}"})
+ 
+def subscribe_email(email, pairs, registry_row=None, max_attempts=3):
+    """
+    Adds (area, floor) pairs to one address's subscription with at most one
+    subscribe call and one filter policy update, then records them in the
+    registry. Pairs the address already follows are skipped; if there is
+    nothing new, the only SNS call checks that the recorded subscription
+    still exists. When it is gone, the address starts over with a new
+    subscription for the requested pairs.
+ 
+    The address row is written conditionally on its 'policy_version', so two
+    requests changing the same address concurrently cannot drop each other's
+    area/floors: the loser reloads the row and writes the merged policy.
+ 
+    Returns:
+        dict: 'subscription_arn', 'added' (list of subscription ids) and
+              'already_subscribed' (list of subscription ids).
+    """
+    for attempt in range(1, max_attempts + 1):
+        known = set(registry_row.get('area_floors', set())) if registry_row else set()
+        subscription_arn = registry_row.get('subscription_arn') if registry_row else None
+        version = int(registry_row.get('policy_version', 0)) if registry_row else 0
+ 
+        if subscription_arn and not subscription_exists(subscription_arn):
+            print(f"Subscription {subscription_arn} of {email} no longer exists, subscribing again.")
+            _forget_subscription(email, registry_row)
+            known = set()
+            subscription_arn = None
+ 
+        already = []
+        new_pairs = {}
+        for area_number, floor_number in pairs:
+            subscription_id = f"{email}-{area_number}-{floor_number}"
+            if area_floor(area_number, floor_number) in known:
+                already.append(subscription_id)
+            else:
+                new_pairs[area_floor(area_number, floor_number)] = (subscription_id, area_number, floor_number)
+ 
+        if not new_pairs:
+            return {'subscription_arn': subscription_arn, 'added': [], 'already_subscribed': already}
+ 
+        if not subscription_arn:
+            subscribe_response = sns_client.subscribe(
+                TopicArn=SNS_TOPIC_ARN,
+                Protocol='email',
+                Endpoint=email,
+                ReturnSubscriptionArn=True
+            )
+            subscription_arn = subscribe_response['SubscriptionArn']
+ 
+        area_floors = known | set(new_pairs)
+        policy = filter_policy(area_floors)
+        sns_client.set_subscription_attributes(
+            SubscriptionArn=subscription_arn,
+            AttributeName='FilterPolicy',
+            AttributeValue=json.dumps(policy)
+        )
+        print(f"Set FilterPolicy for {subscription_arn}: {json.dumps(policy)}")
+ 
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            subscriptions_table.put_item(
+                Item={
+                    'subscription_id': email,
+                    'email': email,
+                    'subscription_arn': subscription_arn,
+                    'area_floors': area_floors,
+                    'policy_version': version + 1,
+                    'updated_at': now
+                },
+                ConditionExpression='attribute_not_exists(subscription_id) OR policy_version = :version',
+                ExpressionAttributeValues={':version': version}
+            )
+        except subscriptions_table.meta.client.exceptions.ConditionalCheckFailedException:
+            print(f"Registry row for {email} changed concurrently (attempt {attempt}/{max_attempts}), merging.")
+            registry_row = load_registry([email]).get(email)
+            continue
+ 
+        with subscriptions_table.batch_writer() as batch:
+            for subscription_id, area_number, floor_number in new_pairs.values():
+                batch.put_item(Item={
+                    'subscription_id': subscription_id,
+                    'email': email,
+                    'area_number': area_number,
+                    'floor_number': floor_number,
+                    'subscription_arn': subscription_arn,
+                    'created_at': now
+                })
+ 
+        return {'subscription_arn': subscription_arn,
+                'added': [subscription_id for subscription_id, _, _ in new_pairs.values()],
+                'already_subscribed': already}
+ 
+    raise RuntimeError(f"Could not update the subscription of {email} after {max_attempts} attempts.")
+ 
+def _valid_pair(entry):
+    return (isinstance(entry, dict) and entry.get('email')
+            and isinstance(entry.get('area_number'), int) and isinstance(entry.get('floor_number'), int))
+ 
+def group_entries(entries):
+    """
+    Groups bulk import entries per address. Returns (pairs_by_email,
+    indexes of the rejected entries).
+    """
+    pairs_by_email = {}
+    rejected = []
+    for index, entry in enumerate(entries):
+        if not _valid_pair(entry):
+            rejected.append(index)
+            continue
+        pairs = pairs_by_email.setdefault(entry['email'].strip().lower(), [])
+        if (entry['area_number'], entry['floor_number']) not in pairs:
+            pairs.append((entry['area_number'], entry['floor_number']))
+    return pairs_by_email, rejected
+ 
+def queue_import(pairs_by_email):
+    """
+    Puts grouped addresses on the import queue, IMPORT_MESSAGE_EMAILS per
+    message and 10 messages per call. Returns (messages queued, emails that
+    could not be queued).
+    """
+    emails = list(pairs_by_email)
+    bodies = [
+        json.dumps({'pairs_by_email': {email: pairs_by_email[email] for email in emails[start:start + IMPORT_MESSAGE_EMAILS]}})
+        for start in range(0, len(emails), IMPORT_MESSAGE_EMAILS)
+    ]
+    queued = 0
+    not_queued = []
+    for start in range(0, len(bodies), 10):
+        chunk = bodies[start:start + 10]
+        try:
+            response = sqs_client.send_message_batch(
+                QueueUrl=IMPORT_QUEUE_URL,
+                Entries=[{'Id': str(i), 'MessageBody': body} for i, body in enumerate(chunk)]
+            )
+            failed_ids = {entry['Id'] for entry in response.get('Failed', [])}
+        except Exception as e:
+            print(f"Error queueing {len(chunk)} subscription import messages: {e}")
+            failed_ids = {str(i) for i in range(len(chunk))}
+        for i, body in enumerate(chunk):
+            if str(i) in failed_ids:
+                not_queued.extend(json.loads(body)['pairs_by_email'])
+            else:
+                queued += 1
+    return queued, not_queued
+ 
+def import_pairs(pairs_by_email):
+    """
+    Subscribes grouped addresses. The registry is read in batches, and each
+    address then costs at most one subscribe and one filter policy update
+    however many area/floors it gets.
+    """
+    registry = load_registry(pairs_by_email)
+ 
+    def import_email(email):
+        try:
+            return email, subscribe_email(email, pairs_by_email[email], registry.get(email)), None
+        except Exception as e:
+            print(f"Error importing subscriptions for {email}: {e}")
+            return email, None, str(e)
+ 
+    summary = {'emails': len(pairs_by_email), 'added': 0, 'already_subscribed': 0, 'failed': []}
+    with ThreadPoolExecutor(max_workers=BULK_IMPORT_WORKERS) as executor:
+        for email, result, error in executor.map(import_email, list(pairs_by_email)):
+            if error:
+                summary['failed'].append({'email': email, 'error': error})
+                continue
+            summary['added'] += len(result['added'])
+            summary['already_subscribed'] += len(result['already_subscribed'])
+    return summary
+ 
+def bulk_import(entries):
+    """Onboards many drivers at once, synchronously; see import_pairs."""
+    pairs_by_email, rejected = group_entries(entries)
+    return {**import_pairs(pairs_by_email), 'rejected': rejected}
+ 
+def lambda_handler(event, context):
+    try:
+        if event['httpMethod'] == 'OPTIONS':
+            return create_response(200, {})
+ 
+        if event['httpMethod'] != 'POST':
+            return create_response(405, {'message': 'Method Not Allowed'})
+ 
+        body = json.loads(event['body'])
+ 
+        # Bulk import: {"subscriptions": [{"email", "area_number", "floor_number"}, ...]}
+        if 'subscriptions' in body:
+            entries = body['subscriptions']
+            if not isinstance(entries, list) or not entries:
+                return create_response(400, {'message': '"subscriptions" must be a non-empty list.'})
+            limit = BULK_IMPORT_MAX if IMPORT_QUEUE_URL else BULK_IMPORT_SYNC_MAX
+            if len(entries) > limit:
+                return create_response(400, {'message': f'At most {limit} subscriptions per request.'})
+            if not IMPORT_QUEUE_URL:
+                summary = bulk_import(entries)
+                return create_response(200, {'message': 'Bulk import completed.', **summary})
+ 
+            pairs_by_email, rejected = group_entries(entries)
+            queued, not_queued = queue_import(pairs_by_email)
+            return create_response(202, {
+                'message': 'Bulk import accepted; confirmation emails go out as it is processed.',
+                'emails': len(pairs_by_email),
+                'queued_messages': queued,
+                'not_queued': not_queued,
+                'rejected': rejected
+            })
+ 
+        email = body.get('email')
+        area_number = body.get('area_number')
+        floor_number = body.get('floor_number')
+ 
+        if not email or not isinstance(area_number, int) or not isinstance(floor_number, int):
+            return create_response(400, {'message': 'Email, area_number (integer), and floor_number (integer) are required.'})
+ 
+        email = email.strip().lower()
+        subscription_id = f"{email}-{area_number}-{floor_number}"
+ 
+        # A repeat request costs one registry read plus one subscription existence check
+        registry_row = load_registry([email]).get(email)
+        result = subscribe_email(email, [(area_number, floor_number)], registry_row)
+        if result['already_subscribed']:
+            return create_response(200, {
+                'message': 'You are already subscribed to this area and floor.',
+                'subscriptionId': subscription_id,
+                'subscription_arn': result['subscription_arn']  # (Can be removed in prod)
+            })
+ 
+        return create_response(200, {
+            'message': 'Subscription request sent successfully! Please check your email to confirm your subscription.',
+            'subscriptionId': subscription_id,
+            'subscription_arn': result['subscription_arn']  # (Can be removed in prod)
+        })
+ 
+    except json.JSONDecodeError:
+        return create_response(400, {'message': 'Invalid JSON in request body.'})
+    except Exception as e:
+        print(f"Error in subscribe_handler: {e}")
+        return create_response(500, {'message': f'An internal server error occurred: {str(e)}'})
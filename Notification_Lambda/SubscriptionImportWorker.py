@@ -0,0 +1,28 @@
+import json
+from Notification import import_pairs
+ 
+def lambda_handler(event, context):
+    """
+    Drains the subscription import queue filled by Notification.py's bulk
+    import. Each message holds a group of addresses with their area/floor
+    pairs. A message with an address that failed is reported as a batch
+    item failure, so SQS redelivers it; addresses that already went through
+    are skipped on the retry, since their pairs are in the registry by then.
+    The event source mapping must enable ReportBatchItemFailures.
+    """
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            pairs_by_email = {email: [tuple(pair) for pair in pairs]
+                              for email, pairs in json.loads(record['body'])['pairs_by_email'].items()}
+        except (KeyError, TypeError, ValueError):
+            print(f"[WARN] Dropping malformed subscription import message: {record.get('body')}")
+            continue
+ 
+        summary = import_pairs(pairs_by_email)
+        print(f"Imported {summary['emails']} addresses: {summary['added']} added, "
+              f"{summary['already_subscribed']} already subscribed, {len(summary['failed'])} failed.")
+        if summary['failed']:
+            failures.append({'itemIdentifier': record['messageId']})
+ 
+    return {'batchItemFailures': failures}
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+import boto3
+
+
+dynamodb = boto3.resource('dynamodb')
+# Invalidation channel: partition key 'area_floor' (S), e.g. 'A1#F3', with a
+# 'generation' counter that the slot stream router (admin_module
+# floor_status_generations) bumps on every change to that floor. Containers
+# compare their cached generations against it.
+GENERATION_TABLE_NAME = os.environ.get('FLOOR_STATUS_GENERATION_TABLE', 'FloorStatusGenerations')
+generation_table = dynamodb.Table(GENERATION_TABLE_NAME)
+
+# An entry is served without any check for at most the staleness bound; after
+# that one batched generation read decides whether it is still current.
+CACHE_TTL_SECONDS = float(os.environ.get('FLOOR_STATUS_CACHE_TTL', '30'))
+MAX_STALENESS_SECONDS = float(os.environ.get('FLOOR_STATUS_MAX_STALENESS', '2'))
+CACHE_MAX_ENTRIES = int(os.environ.get('FLOOR_STATUS_CACHE_SIZE', '256'))
+METRICS_INTERVAL_SECONDS = float(os.environ.get('FLOOR_STATUS_METRICS_INTERVAL', '60'))
+BATCH_GET_LIMIT = 100
+
+
+def area_floor_key(area_number, floor_number) -> str:
+    return f"A{int(area_number)}#F{int(floor_number)}"
+
+
+class FloorStatusCache:
+    """
+    Read-through LRU cache of get_floor_status results for one warm
+    container. Entries expire after CACHE_TTL_SECONDS and are invalidated
+    within MAX_STALENESS_SECONDS (plus stream lag) of a slot change on their
+    floor, by polling the generation table for all cached floors at once.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_staleness=MAX_STALENESS_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # area_floor -> (value, fetched_at, generation)
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'expirations': 0, 'generation_reads': 0}
+        self._last_emit = time.monotonic()
+
+    def _read_generations(self, keys: list) -> dict:
+        generations = {}
+        for start in range(0, len(keys), BATCH_GET_LIMIT):
+            request = {GENERATION_TABLE_NAME: {'Keys': [{'area_floor': key} for key in keys[start:start + BATCH_GET_LIMIT]]}}
+            while request:
+                response = dynamodb.batch_get_item(RequestItems=request)
+                for item in response['Responses'].get(GENERATION_TABLE_NAME, []):
+                    generations[item['area_floor']] = int(item.get('generation', 0))
+                request = response.get('UnprocessedKeys') or None
+        self.metrics['generation_reads'] += 1
+        return generations
+
+    def _revalidate(self, now: float) -> None:
+        """Drops every cached floor whose generation moved since it was loaded."""
+        if now - self._last_poll < self.max_staleness or not self._entries:
+            return
+        self._last_poll = now
+        current = self._read_generations(list(self._entries))
+        for key, (_, _, generation) in list(self._entries.items()):
+            if current.get(key, 0) != generation:
+                del self._entries[key]
+                self.metrics['invalidations'] += 1
+
+    def get(self, area_number, floor_number, loader):
+        """
+        Returns the cached result for (area, floor) or calls loader() and
+        caches its result. Results whose 'status' is 'ERROR' are not cached.
+        """
+        key = area_floor_key(area_number, floor_number)
+        with self._lock:
+            now = time.monotonic()
+            self._revalidate(now)
+
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.metrics['hits'] += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+                self.metrics['expirations'] += 1
+            self.metrics['misses'] += 1
+
+        # Reading the generation before the load means a change that races the
+        # load bumps it past the stored value and invalidates the entry.
+        generation = self._read_generations([key]).get(key, 0)
+        value = loader()
+        if value.get('status') == 'ERROR':
+            return value
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic(), generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+        return value
+
+    def emit_metrics(self, force: bool = False) -> None:
+        """
+        Prints the counters since the last emit as a CloudWatch Embedded Metric
+        Format line (namespace 'SmartParking/FloorStatusCache'), at most once
+        per METRICS_INTERVAL_SECONDS.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_emit < METRICS_INTERVAL_SECONDS:
+            return
+        with self._lock:
+            counts, self.metrics = self.metrics, dict.fromkeys(self.metrics, 0)
+            size = len(self._entries)
+        self._last_emit = now
+
+        lookups = counts['hits'] + counts['misses']
+        payload = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': 'SmartParking/FloorStatusCache',
+                    'Dimensions': [[]],
+                    'Metrics': [{'Name': name, 'Unit': 'Count'} for name in counts]
+                              + [{'Name': 'entries', 'Unit': 'Count'}, {'Name': 'hit_ratio', 'Unit': 'None'}]
+                }]
+            },
+            **counts,
+            'entries': size,
+            'hit_ratio': counts['hits'] / lookups if lookups else 0.0
+        }
+        print(json.dumps(payload))
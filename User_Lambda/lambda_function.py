@@ -1,6 +1,10 @@
 import json
 from decimal import Decimal
 import slot_utils
+from floor_status_cache import FloorStatusCache
+
+# Lives as long as the warm container; see floor_status_cache for the staleness bound
+floor_cache = FloorStatusCache()
 
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -32,7 +36,8 @@ def lambda_handler(event, context):
         floor_num = int(floor)
         
         
-        result = slot_utils.get_floor_status(area_num, floor_num)
+        result = floor_cache.get(area_num, floor_num, lambda: slot_utils.get_floor_status(area_num, floor_num))
+        floor_cache.emit_metrics()
         
         return create_response(200, result)
 
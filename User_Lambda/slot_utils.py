@@ -3,15 +3,29 @@ import boto3
 from boto3.dynamodb.conditions import Key
 from datetime import datetime, timezone
 import random 
+import wait_time_predictor
 
 
-GSI_NAME = "status-area_number-index"
+# Partition key 'status_area_floor' (e.g. 'empty#1#3'), sort key 'slot_number'.
+# The key format is maintained by admin_module.slot_keys on every slot write.
+GSI_NAME = "status-area_floor-index"
+# Same partition key, sort key 'expected_time'; only occupied slots carry it.
+EXPECTED_EXIT_GSI_NAME = "status_area_floor-expected_time-index"
+WAITING_SLOTS_LIMIT = 3
+# Soonest future exits considered
+WAITING_CANDIDATES = 10
+# Most recently overdue cars considered; they only count once history can estimate them
+OVERDUE_CANDIDATES = 10
 
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('ParkingSlotDatabase')
 
 
+def status_area_floor(status, area_number, floor_number):
+    return f"{status}#{int(area_number)}#{int(floor_number)}"
+
+
 def get_floor_status(area_number, floor_number):
     """
     Finds and returns all available slots on a given floor.
@@ -19,12 +33,21 @@ def get_floor_status(area_number, floor_number):
     This function READS data only; it does not allocate.
     """
     try:
-        response = table.query(
-            IndexName=GSI_NAME,
-            KeyConditionExpression=Key('status').eq('empty') & Key('area_number').eq(area_number),
-            FilterExpression=Key('floor_number').eq(floor_number)
-        )
-        available_slots = sorted(response.get('Items', []), key=lambda x: x['slot_number'])
+        # Reads only this floor's empty slots, already ordered by slot_number
+        query_kwargs = {
+            'IndexName': GSI_NAME,
+            'KeyConditionExpression': Key('status_area_floor').eq(status_area_floor('empty', area_number, floor_number))
+        }
+        available_slots = []
+        done = False
+        start_key = None
+        while not done:
+            if start_key:
+                query_kwargs['ExclusiveStartKey'] = start_key
+            response = table.query(**query_kwargs)
+            available_slots.extend(response.get('Items', []))
+            start_key = response.get('LastEvaluatedKey', None)
+            done = start_key is None
         
         if available_slots:
             return {
@@ -41,30 +64,53 @@ def get_floor_status(area_number, floor_number):
         print(f"Error in get_floor_status: {e}")
         return {'status': 'ERROR', 'message': 'An internal error occurred.'}
 
+def _with_entry_times(slots):
+    """Adds each slot's entry_timestamp (the index is keys-only) for the dwell-time fallback."""
+    if not slots:
+        return slots
+    entries = {}
+    request = {table.name: {
+        'Keys': [{'parking_id': slot['parking_id']} for slot in slots],
+        'ProjectionExpression': 'parking_id, entry_timestamp'
+    }}
+    while request:
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response['Responses'].get(table.name, []):
+            entries[item['parking_id']] = item.get('entry_timestamp')
+        request = response.get('UnprocessedKeys') or None
+    return [dict(slot, entry_timestamp=entries.get(slot['parking_id'])) for slot in slots]
+
+
 def find_waiting_time(area_number, floor_number):
     """
     Finds the top 3 soonest-to-be-vacant slots on a full floor.
-    .
+    The expected-exit index returns the floor's occupied slots ordered by
+    expected_time, so two bounded queries yield the WAITING_CANDIDATES
+    soonest future exits and the OVERDUE_CANDIDATES most recently overdue
+    cars, regardless of how many cars are parked. Their waits are then
+    corrected by the learned overstay and dwell distributions (see
+    wait_time_predictor); overdue cars without history are left out, so
+    they never crowd out the future exits.
     """
     try:
-        response = table.scan(
-            FilterExpression=Key('area_number').eq(area_number) & Key('floor_number').eq(floor_number) & Key('status').eq('occupied')
-        )
-        
-        upcoming_slots = []
         now_utc = datetime.now(timezone.utc)
+        # expected_time is stored as UTC isoformat(), which sorts chronologically as a string
+        partition = Key('status_area_floor').eq(status_area_floor('occupied', area_number, floor_number))
+        upcoming = table.query(
+            IndexName=EXPECTED_EXIT_GSI_NAME,
+            KeyConditionExpression=partition & Key('expected_time').gt(now_utc.isoformat()),
+            Limit=WAITING_CANDIDATES
+        )
+        overdue = table.query(
+            IndexName=EXPECTED_EXIT_GSI_NAME,
+            KeyConditionExpression=partition & Key('expected_time').lte(now_utc.isoformat()),
+            ScanIndexForward=False,
+            Limit=OVERDUE_CANDIDATES
+        )
         
-        for slot in response.get('Items', []):
-            if 'expected_time' in slot:
-                exit_time = datetime.fromisoformat(slot['expected_time']).astimezone(timezone.utc)
-                wait_delta = exit_time - now_utc
-                if wait_delta.total_seconds() > 0:
-                    upcoming_slots.append({
-                        'parking_id': slot['parking_id'],
-                        'wait_minutes': int(wait_delta.total_seconds() / 60)
-                    })
-        
-        top_3_slots = sorted(upcoming_slots, key=lambda x: x['wait_minutes'])[:3]
+        candidates = upcoming.get('Items', []) + _with_entry_times(overdue.get('Items', []))
+        estimates = wait_time_predictor.estimate_waits(area_number, floor_number, candidates, now_utc)
+        top_3_slots = estimates[:WAITING_SLOTS_LIMIT]
         
         return {
             'status': 'FULL',
@@ -0,0 +1,321 @@
+import os
+import time
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import boto3
+
+
+dynamodb = boto3.resource('dynamodb')
+# Partition key 'sketch_key' (S), e.g. 'A1#F3#L14' or 'A1#F3#ALL'.
+# Each item holds log-bucket histograms as top-level counters:
+#   'o_<i>' -> sessions whose overstay fell in bucket i (keyed by the hour of expected exit)
+#   'd_<i>' -> sessions whose dwell time fell in bucket i (keyed by the hour of entry)
+# plus 'overstay_count' and 'dwell_count'. Updates are atomic ADDs applied in
+# transactions together with one 'APPLIED#<stream event id>' marker item per
+# closed session, so a redelivered stream record is never counted twice.
+# Markers expire through the 'expires_at' TTL.
+SKETCH_TABLE_NAME = os.environ.get('WAIT_TIME_SKETCH_TABLE', 'WaitTimeSketches')
+sketch_table = dynamodb.Table(SKETCH_TABLE_NAME)
+MARKER_PREFIX = 'APPLIED#'
+MARKER_RETENTION_SECONDS = int(os.environ.get('WAIT_TIME_MARKER_RETENTION', str(2 * 24 * 3600)))
+MAX_TRANSACTION_ITEMS = 100
+
+# Hours are those of the lot's wall clock, so the profile follows local rush hours.
+# The 'L' in the hour keys marks local hours; older 'H' (UTC) sketches are no longer read.
+try:
+    LOT_TIMEZONE = ZoneInfo(os.environ.get('LOT_TIMEZONE', 'Asia/Kolkata'))
+except ZoneInfoNotFoundError as e:
+    # Without the tz database the profile is still usable, only shifted
+    print(f"Warning: unknown LOT_TIMEZONE, bucketing hours in UTC: {e}")
+    LOT_TIMEZONE = timezone.utc
+
+# Bucket i >= 1 covers [GAMMA**(i-1), GAMMA**i) minutes: ~7% relative error, 80 buckets span 40+ days
+BUCKET_GAMMA = 1.15
+MAX_BUCKET = 80
+ALL_HOURS = 'ALL'
+# Below this many samples an hour falls back to the floor's all-hours sketch, then to expected_time
+MIN_SAMPLES = int(os.environ.get('WAIT_TIME_MIN_SAMPLES', '20'))
+WAIT_QUANTILE = float(os.environ.get('WAIT_TIME_QUANTILE', '0.5'))
+WAIT_QUANTILE_HIGH = float(os.environ.get('WAIT_TIME_QUANTILE_HIGH', '0.8'))
+
+
+def bucket_index(minutes: float) -> int:
+    if minutes < 1:
+        return 0
+    return min(MAX_BUCKET, 1 + int(math.log(minutes) / math.log(BUCKET_GAMMA)))
+
+
+def bucket_bounds(index: int) -> tuple:
+    if index == 0:
+        return 0.0, 1.0
+    return BUCKET_GAMMA ** (index - 1), BUCKET_GAMMA ** index
+
+
+def sketch_key(area_number, floor_number, hour) -> str:
+    """`hour` is a local hour of day (see LOT_TIMEZONE) or ALL_HOURS."""
+    hour_part = hour if hour == ALL_HOURS else f"L{int(hour):02d}"
+    return f"A{int(area_number)}#F{int(floor_number)}#{hour_part}"
+
+
+def _utc(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp).astimezone(timezone.utc)
+
+
+def local_hour(moment: datetime) -> int:
+    """The hour of day of `moment` on the lot's clock."""
+    return moment.astimezone(LOT_TIMEZONE).hour
+
+
+def history_updates(history_item: dict) -> dict:
+    """
+    Description:
+        Turns one closed session (a ParkingHistory item) into sketch counter
+        increments for its hour and for the floor's all-hours sketch.
+
+    Args:
+        history_item (dict): A ParkingHistory item ('area_id', 'floor_number',
+                             'entry_timestamp', 'exit_timestamp',
+                             'expected_time', 'duration_minutes').
+
+    Returns:
+        dict: { sketch_key: { attribute: increment } }; empty if the item
+              lacks the location.
+    """
+    area = history_item.get('area_id')
+    floor = history_item.get('floor_number')
+    if area is None or floor is None:
+        return {}
+
+    updates = defaultdict(lambda: defaultdict(int))
+
+    def _count(hour, prefix, minutes):
+        for key in (sketch_key(area, floor, hour), sketch_key(area, floor, ALL_HOURS)):
+            updates[key][f"{prefix}_{bucket_index(minutes)}"] += 1
+            updates[key]['overstay_count' if prefix == 'o' else 'dwell_count'] += 1
+
+    if history_item.get('duration_minutes') is not None and history_item.get('entry_timestamp'):
+        _count(local_hour(_utc(history_item['entry_timestamp'])), 'd', max(0, int(history_item['duration_minutes'])))
+
+    if history_item.get('expected_time') and history_item.get('exit_timestamp'):
+        expected = _utc(history_item['expected_time'])
+        overstay = (_utc(history_item['exit_timestamp']) - expected).total_seconds() / 60
+        # Early and on-time exits all land in bucket 0
+        _count(local_hour(expected), 'o', max(0.0, overstay))
+
+    return {key: dict(counts) for key, counts in updates.items()}
+
+
+def _merge(sessions: list) -> dict:
+    merged = defaultdict(lambda: defaultdict(int))
+    for _, updates in sessions:
+        for key, counts in updates.items():
+            for attribute, count in counts.items():
+                merged[key][attribute] += count
+    return merged
+
+
+def _chunks(sessions: list):
+    """Splits sessions into groups whose markers and sketch items fit in one transaction."""
+    chunk, keys = [], set()
+    for session in sessions:
+        session_keys = keys | set(session[1])
+        if chunk and len(chunk) + 1 + len(session_keys) > MAX_TRANSACTION_ITEMS:
+            yield chunk
+            chunk, session_keys = [], set(session[1])
+        chunk.append(session)
+        keys = session_keys
+    if chunk:
+        yield chunk
+
+
+def _apply_chunk(sessions: list) -> int:
+    """
+    Applies one group in a single transaction. Sessions whose marker already
+    exists were applied by an earlier delivery; they are dropped and the rest
+    retried. Returns the number of sessions applied.
+    """
+    client = dynamodb.meta.client
+    expires_at = int(time.time()) + MARKER_RETENTION_SECONDS
+    while sessions:
+        markers = [{
+            'Put': {
+                'TableName': SKETCH_TABLE_NAME,
+                'Item': {'sketch_key': f"{MARKER_PREFIX}{marker_id}", 'expires_at': expires_at},
+                'ConditionExpression': 'attribute_not_exists(sketch_key)'
+            }
+        } for marker_id, _ in sessions]
+        increments = []
+        for key, counts in _merge(sessions).items():
+            increments.append({
+                'Update': {
+                    'TableName': SKETCH_TABLE_NAME,
+                    'Key': {'sketch_key': key},
+                    'UpdateExpression': 'ADD ' + ', '.join(f"#c{i} :c{i}" for i in range(len(counts))),
+                    'ExpressionAttributeNames': {f"#c{i}": attribute for i, attribute in enumerate(counts)},
+                    'ExpressionAttributeValues': {f":c{i}": count for i, count in enumerate(counts.values())}
+                }
+            })
+        try:
+            client.transact_write_items(TransactItems=markers + increments)
+            return len(sessions)
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            applied = {index for index, code in enumerate(reasons[:len(sessions)]) if code == 'ConditionalCheckFailed'}
+            if not applied:
+                raise
+            sessions = [session for index, session in enumerate(sessions) if index not in applied]
+    return 0
+
+
+def apply_updates(sessions: list) -> int:
+    """
+    Description:
+        Applies the sketch increments of closed sessions exactly once.
+        Increments are merged per sketch item and written in transactions
+        together with a marker per session; a session whose marker exists
+        is skipped, so a redelivered stream batch does not inflate the
+        histograms.
+
+    Args:
+        sessions (list): (marker_id, updates) pairs, where marker_id is
+                         unique per closed session (e.g. the stream
+                         record's eventID) and updates come from
+                         history_updates.
+
+    Returns:
+        int: The number of sessions applied by this call.
+    """
+    return sum(_apply_chunk(chunk) for chunk in _chunks([session for session in sessions if session[1]]))
+
+
+def _buckets(item: dict, prefix: str) -> dict:
+    """Returns the { bucket index: count } histogram stored under `prefix` ('o' or 'd')."""
+    return {int(name[2:]): int(count) for name, count in item.items() if name.startswith(prefix + '_') and count}
+
+
+def _read_sketches(keys: set) -> dict:
+    """Reads sketch items in one BatchGetItem, retrying UnprocessedKeys. Missing sketches are absent."""
+    sketches = {}
+    request = {SKETCH_TABLE_NAME: {'Keys': [{'sketch_key': key} for key in keys]}}
+    while request:
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response['Responses'].get(SKETCH_TABLE_NAME, []):
+            sketches[item['sketch_key']] = item
+        request = response.get('UnprocessedKeys') or None
+    return sketches
+
+
+def conditional_remaining(buckets: dict, elapsed: float, quantile: float):
+    """
+    Description:
+        Estimates how much longer a car stays, given that it is already
+        `elapsed` minutes past its expected exit: the quantile of the overstay
+        distribution restricted to overstays longer than `elapsed`, minus
+        `elapsed`.
+
+    Args:
+        buckets (dict): { bucket index: count } of an overstay sketch.
+        elapsed (float): Minutes already overstayed (0 if not yet due).
+        quantile (float): e.g. 0.5 for the median.
+
+    Returns:
+        float | None: Remaining minutes, or None if fewer than MIN_SAMPLES
+                      sessions overstayed at least that long.
+    """
+    tail = [(index, count) for index, count in sorted(buckets.items()) if bucket_bounds(index)[1] > elapsed]
+    total = sum(count for _, count in tail)
+    if total < MIN_SAMPLES:
+        return None
+
+    target = quantile * total
+    running = 0
+    for index, count in tail:
+        running += count
+        if running >= target:
+            lower, upper = bucket_bounds(index)
+            return (max(lower, elapsed) + upper) / 2 - elapsed
+    return None
+
+
+def estimate_waits(area_number, floor_number, candidates: list, now_utc: datetime = None) -> list:
+    """
+    Description:
+        Estimates when each of a floor's occupied slots will be vacated. A
+        car's expected_time is corrected by the learned overstay distribution
+        of its area, floor and expected-exit hour, so overdue cars are
+        included instead of dropped. An overdue car without enough overstay
+        history falls back to the dwell-time distribution of its entry hour,
+        given how long it has been parked. Costs one BatchGetItem for at most
+        2 * len(candidates) + 1 sketch items.
+
+    Args:
+        area_number (int): The area of the floor.
+        floor_number (int): The floor number.
+        candidates (list): Occupied slot items with 'parking_id' and
+                           'expected_time' (e.g. from the expected-exit index),
+                           optionally 'entry_timestamp' for the dwell fallback.
+        now_utc (datetime): The reference time. Defaults to now.
+
+    Returns:
+        list: { 'parking_id', 'wait_minutes', 'wait_minutes_high', 'estimate' }
+              dicts sorted by wait_minutes. 'estimate' is 'history' when an
+              overstay sketch was used, 'dwell' for the dwell-time fallback
+              and 'expected_time' for the plain fallback.
+    """
+    now_utc = now_utc or datetime.now(timezone.utc)
+    parsed = [
+        (slot['parking_id'], _utc(slot['expected_time']),
+         _utc(slot['entry_timestamp']) if slot.get('entry_timestamp') else None)
+        for slot in candidates if slot.get('expected_time')
+    ]
+    if not parsed:
+        return []
+
+    keys = {sketch_key(area_number, floor_number, local_hour(expected)) for _, expected, _ in parsed}
+    keys.update(sketch_key(area_number, floor_number, local_hour(entry)) for _, _, entry in parsed if entry)
+    keys.add(sketch_key(area_number, floor_number, ALL_HOURS))
+    sketches = _read_sketches(keys)
+
+    def _histogram(hour, prefix):
+        return _buckets(sketches.get(sketch_key(area_number, floor_number, hour), {}), prefix)
+
+    def _estimate(parking_id, base, histograms, elapsed, source):
+        for buckets in histograms:
+            remaining = conditional_remaining(buckets, elapsed, WAIT_QUANTILE)
+            if remaining is not None:
+                remaining_high = conditional_remaining(buckets, elapsed, WAIT_QUANTILE_HIGH)
+                return {
+                    'parking_id': parking_id,
+                    'wait_minutes': int(base + remaining),
+                    'wait_minutes_high': int(base + remaining_high),
+                    'estimate': source
+                }
+        return None
+
+    estimates = []
+    for parking_id, expected, entry in parsed:
+        minutes_until_due = (expected - now_utc).total_seconds() / 60
+        elapsed = max(0.0, -minutes_until_due)
+
+        estimate = _estimate(parking_id, max(0.0, minutes_until_due),
+                             (_histogram(local_hour(expected), 'o'), _histogram(ALL_HOURS, 'o')), elapsed, 'history')
+
+        if estimate is None and minutes_until_due <= 0 and entry:
+            parked = max(0.0, (now_utc - entry).total_seconds() / 60)
+            estimate = _estimate(parking_id, 0.0,
+                                 (_histogram(local_hour(entry), 'd'), _histogram(ALL_HOURS, 'd')), parked, 'dwell')
+
+        if estimate is None:
+            if minutes_until_due <= 0:
+                continue # Overdue and nothing learned yet: no basis for an estimate
+            estimate = {
+                'parking_id': parking_id,
+                'wait_minutes': int(minutes_until_due),
+                'wait_minutes_high': int(minutes_until_due),
+                'estimate': 'expected_time'
+            }
+        estimates.append(estimate)
+
+    return sorted(estimates, key=lambda x: x['wait_minutes'])
@@ -0,0 +1,36 @@
+from boto3.dynamodb.types import TypeDeserializer
+
+import wait_time_predictor
+
+deserializer = TypeDeserializer()
+
+
+def lambda_handler(event, context):
+    """
+    Consumes the ParkingHistory DynamoDB stream and folds every newly closed
+    session into the wait-time sketches. Increments from the whole batch are
+    merged per sketch item and applied in transactions with a marker per
+    stream record, so a retried batch only applies the sessions it has not
+    applied yet.
+    """
+    sessions = []
+    for record in event.get('Records', []):
+        if record.get('eventName') != 'INSERT':
+            continue
+        image = record['dynamodb'].get('NewImage')
+        if not image:
+            continue
+        history_item = {key: deserializer.deserialize(value) for key, value in image.items()}
+        try:
+            updates = wait_time_predictor.history_updates(history_item)
+        except (TypeError, ValueError) as e:
+            # A malformed history row must not block the rest of the stream
+            print(f"Skipping history item {history_item.get('session_id')}: {e}")
+            continue
+        if updates:
+            sessions.append((record['eventID'], updates))
+
+    applied = wait_time_predictor.apply_updates(sessions)
+    print(f"Folded {applied} closed sessions into the wait-time sketches "
+          f"({len(sessions) - applied} already applied).")
+    return {'statusCode': 200, 'body': 'Processed DynamoDB stream records.'}
@@ -0,0 +1,168 @@
+import os
+import time
+import boto3
+from datetime import datetime, timezone
+import slot_utils
+
+
+# Per-floor priority queues, maintained together with admin_module.waitlist,
+# which hands freed slots to the head of a queue. Partition key 'area_floor'
+# (S), sort key 'queue_key' (S):
+#   'A1#F3'        / 'Q#<priority:02d>#<joined_at>#<vehicle_id>'  queue entry
+#   'A1#F3'        / 'SEQ'   the floor's 'last_seq' handed to joiners and the
+#                            'head_seq' of the entry last served
+#   'VEHICLE#<id>' / 'A1#F3'                                     membership
+WAITLIST_TABLE_NAME = os.environ.get('WAITLIST_TABLE', 'FloorWaitlist')
+DEFAULT_PRIORITY = int(os.environ.get('WAITLIST_DEFAULT_PRIORITY', '5'))
+# A driver who is not offered a slot within this time drops out of the queue
+MAX_WAIT_SECONDS = int(os.environ.get('WAITLIST_MAX_WAIT_SECONDS', '7200'))
+QUEUE_PREFIX = 'Q#'
+SEQUENCE_KEY = 'SEQ'
+
+dynamodb = boto3.resource('dynamodb')
+waitlist_table = dynamodb.Table(WAITLIST_TABLE_NAME)
+
+
+class AlreadyWaitingError(Exception):
+    """Raised when the vehicle already has a place in this floor's queue."""
+
+
+class FloorNotFullError(Exception):
+    """Raised when the floor still has free slots, so there is nothing to wait for."""
+
+
+def area_floor(area_number, floor_number):
+    return f"A{int(area_number)}#F{int(floor_number)}"
+
+
+def queue_key(priority, joined_at, vehicle_id):
+    return f"{QUEUE_PREFIX}{int(priority):02d}#{joined_at}#{vehicle_id}"
+
+
+def next_sequence(area_number, floor_number):
+    """Hands out the floor's next join sequence number (1, 2, ...)."""
+    response = waitlist_table.update_item(
+        Key={'area_floor': area_floor(area_number, floor_number), 'queue_key': SEQUENCE_KEY},
+        UpdateExpression='ADD last_seq :one',
+        ExpressionAttributeValues={':one': 1},
+        ReturnValues='UPDATED_NEW'
+    )
+    return int(response['Attributes']['last_seq'])
+
+
+def queue_position(area_number, floor_number, seq):
+    """
+    Estimates a joiner's place in a floor's queue (1 = next in line) from its
+    sequence number and the one admin_module.waitlist last served, with a
+    single key lookup. Entries that left early and joins that failed after
+    taking a number still count, and a trusted caller's priority is not
+    reflected, so the estimate errs on the long side.
+    """
+    counter = waitlist_table.get_item(
+        Key={'area_floor': area_floor(area_number, floor_number), 'queue_key': SEQUENCE_KEY},
+        ConsistentRead=True
+    ).get('Item') or {}
+    return max(seq - int(counter.get('head_seq', 0)), 1)
+
+
+def _lapsed(membership, now):
+    """True if a membership's wait ran out and no slot is being held for it."""
+    if int(membership.get('expires_at', now)) >= now:
+        return False
+    return membership.get('state') != 'held' or int(membership.get('held_until', 0)) < now
+
+
+def join_waitlist(area_number, floor_number, vehicle_id, email, priority=None):
+    """
+    Puts a vehicle in a full floor's queue. The entry and the vehicle's membership
+    are written in one transaction, conditional on the vehicle not waiting
+    for this floor yet. A membership left over from a wait that ran out
+    (MAX_WAIT_SECONDS passed and no hold is active) does not count: it is
+    replaced, and its stale queue entry is deleted in the same transaction
+    so it can never reach the head and be offered a slot.
+
+    `priority` (0-9, lower is served first) is for trusted server-side
+    callers; it must never come from a driver's request.
+
+    Returns:
+        dict: 'queue_key', 'position' (1 = next in line) and 'expires_at'.
+
+    Raises:
+        AlreadyWaitingError: If the vehicle is already in this queue.
+        FloorNotFullError: If the floor still shows free slots.
+    """
+    priority = DEFAULT_PRIORITY if priority is None else int(priority)
+    if not 0 <= priority <= 9:
+        raise ValueError(f"Priority must be between 0 and 9, got {priority}.")
+    # Queued drivers only hear about freed slots, so nobody may queue past a free one
+    if slot_utils.get_floor_status(area_number, floor_number).get('status') == 'AVAILABLE':
+        raise FloorNotFullError(f"Area {area_number}, Floor {floor_number} still has free slots.")
+    queue = area_floor(area_number, floor_number)
+    joined_at = datetime.now(timezone.utc).isoformat()
+    key = queue_key(priority, joined_at, vehicle_id)
+    now = int(time.time())
+    expires_at = now + MAX_WAIT_SECONDS
+    membership_key = {'area_floor': f"VEHICLE#{vehicle_id}", 'queue_key': queue}
+
+    membership = {
+        'Put': {
+            'TableName': WAITLIST_TABLE_NAME,
+            'Item': {
+                **membership_key,
+                'state': 'waiting',
+                'entry_key': key,
+                'joined_at': joined_at,
+                'expires_at': expires_at
+            },
+            'ConditionExpression': 'attribute_not_exists(queue_key)'
+        }
+    }
+    stale_entry = None
+    existing = waitlist_table.get_item(Key=membership_key, ConsistentRead=True).get('Item')
+    if existing:
+        if not _lapsed(existing, now):
+            raise AlreadyWaitingError(f"Vehicle {vehicle_id} is already waiting for Area {area_number}, Floor {floor_number}.")
+        # Replace the lapsed membership only if nobody touched it since we read it
+        membership['Put']['ConditionExpression'] = 'entry_key = :stale AND expires_at < :now'
+        membership['Put']['ExpressionAttributeValues'] = {':stale': existing['entry_key'], ':now': now}
+        stale_entry = {
+            'Delete': {
+                'TableName': WAITLIST_TABLE_NAME,
+                'Key': {'area_floor': queue, 'queue_key': existing['entry_key']}
+            }
+        }
+
+    seq = next_sequence(area_number, floor_number)
+    client = dynamodb.meta.client
+    try:
+        client.transact_write_items(
+            TransactItems=[
+                membership,
+                {
+                    'Put': {
+                        'TableName': WAITLIST_TABLE_NAME,
+                        'Item': {
+                            'area_floor': queue,
+                            'queue_key': key,
+                            'vehicle_id': vehicle_id,
+                            'email': email,
+                            'priority': priority,
+                            'seq': seq,
+                            'joined_at': joined_at,
+                            'expires_at': expires_at
+                        }
+                    }
+                }
+            ] + ([stale_entry] if stale_entry else [])
+        )
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+        if reasons and reasons[0] == 'ConditionalCheckFailed':
+            raise AlreadyWaitingError(f"Vehicle {vehicle_id} is already waiting for Area {area_number}, Floor {floor_number}.") from e
+        raise
+
+    return {
+        'queue_key': key,
+        'position': queue_position(area_number, floor_number, seq),
+        'expires_at': expires_at
+    }
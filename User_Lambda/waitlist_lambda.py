@@ -0,0 +1,69 @@
+import json
+from decimal import Decimal
+import waitlist
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def create_response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'POST, OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type'
+        },
+        'body': json.dumps(body, cls=DecimalEncoder)
+    }
+
+def lambda_handler(event, context):
+    """
+    Joins a full floor's waitlist instead of polling for a free slot. When a
+    slot on the floor is freed, it is held for the head of the queue and the
+    driver is emailed; entering within the hold claims that slot.
+
+    Expected event body:
+    {
+        "vehicle_id": "MH12AB1234",
+        "email": "driver@example.com",
+        "area": 1,
+        "floor": 3
+    }
+
+    Every driver joins at the default priority; the endpoint is public, so
+    a priority taken from the request would let anyone jump the queue.
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+        vehicle_id = body.get('vehicle_id')
+        email = body.get('email')
+        area = body.get('area')
+        floor = body.get('floor')
+
+        if not vehicle_id or not email or area is None or floor is None:
+            return create_response(400, {'status': 'ERROR', 'message': '"vehicle_id", "email", "area" and "floor" are required.'})
+
+        area_num = int(area)
+        floor_num = int(floor)
+
+        result = waitlist.join_waitlist(area_num, floor_num, vehicle_id, email)
+        return create_response(200, {
+            'status': 'WAITING',
+            'message': f"Vehicle {vehicle_id} joined the waitlist for Area {area_num}, Floor {floor_num}. "
+                       f"You will be emailed when a slot is reserved for you.",
+            'position': result['position'],
+            'expires_at': result['expires_at']
+        })
+
+    except (waitlist.AlreadyWaitingError, waitlist.FloorNotFullError) as e:
+        return create_response(409, {'status': 'ERROR', 'message': str(e)})
+    except json.JSONDecodeError:
+        return create_response(400, {'status': 'ERROR', 'message': 'Invalid JSON in request body.'})
+    except (ValueError, TypeError):
+        return create_response(400, {'status': 'ERROR', 'message': '"area" and "floor" must be valid numbers.'})
+    except Exception as e:
+        print(f"Error in lambda_handler: {e}")
+        return create_response(500, {'status': 'ERROR', 'message': 'An internal error occurred.'})
@@ -0,0 +1,104 @@
+"""
+Compares real_time_util._calculate_realtime_occupancy with the NumPy path in
+occupancy_vectorized on synthetic slot lists, end to end from scan results.
+
+    python benchmarks/occupancy_benchmark.py [slot counts...]
+
+Defaults to 10k, 100k and 1M slots. Requires numpy; no AWS access is made.
+
+Columns:
+    deser      boto3 TypeDeserializer over the raw scan items (what the
+               resource API does before any dict-based path sees a slot)
+    scalar     _calculate_realtime_occupancy over those dicts
+    dict load  load_slot_arrays over the same dicts
+    raw load   load_raw_slot_arrays over the raw items
+    vector     calculate_occupancy_vectorized
+    dict x     scalar / (dict load + vector): both start from dicts
+    e2e x      (deser + scalar) / (raw load + vector): both start from the
+               raw scan items, i.e. the full recomputation this is for
+"""
+import sys
+import time
+import random
+import importlib
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+# Admin_Lambda is deployed as the 'admin_module' layer; mirror that mapping locally
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.modules.setdefault('admin_module', importlib.import_module('Admin_Lambda'))
+
+from admin_module.slot_keys import index_attributes
+from admin_module.real_time_util import _calculate_realtime_occupancy
+from admin_module.occupancy_vectorized import (
+    load_slot_arrays, load_raw_slot_arrays, calculate_occupancy_vectorized
+)
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+AREAS = 20
+FLOORS = 10
+
+
+def synthetic_slots(count: int, seed: int = 7) -> list:
+    """Slot items as the slot table stores them: occupied slots carry their occupant."""
+    rng = random.Random(seed)
+    slots = []
+    for i in range(count):
+        area = i % AREAS + 1
+        floor = (i // AREAS) % FLOORS + 1
+        status = rng.choice(('empty', 'empty', 'occupied', 'maintenance'))
+        slot = {
+            'parking_id': f"A{area}F{floor}S{i}",
+            'area_number': area,
+            'floor_number': floor,
+            'slot_number': i,
+            'status': status,
+            **index_attributes(status, area, floor, i)
+        }
+        if status == 'occupied':
+            entry = datetime(2026, 10, rng.randint(1, 28), rng.randint(0, 23), rng.randint(0, 59), tzinfo=timezone.utc)
+            slot.update({
+                'vehicle_id': f"MH12AB{i % 10000:04d}",
+                'email': f"driver{i}@example.com",
+                'entry_timestamp': entry.isoformat(),
+                'expected_time': (entry + timedelta(hours=rng.randint(1, 4))).isoformat()
+            })
+        slots.append(slot)
+    return slots
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def to_raw(slots: list) -> list:
+    serializer = TypeSerializer()
+    return [{name: serializer.serialize(value) for name, value in slot.items()} for slot in slots]
+
+
+def deserialize(raw_items: list) -> list:
+    deserializer = TypeDeserializer()
+    return [{name: deserializer.deserialize(value) for name, value in item.items()} for item in raw_items]
+
+
+def main(counts):
+    print(f"{'slots':>10} {'deser':>10} {'scalar':>10} {'dict load':>10} {'raw load':>10} {'vector':>10} "
+          f"{'dict x':>7} {'e2e x':>7}  identical")
+    for count in counts:
+        raw_items = to_raw(synthetic_slots(count))
+        slots, deser_time = timed(deserialize, raw_items)
+        expected, scalar_time = timed(_calculate_realtime_occupancy, slots)
+        dict_arrays, dict_load_time = timed(load_slot_arrays, slots)
+        raw_arrays, raw_load_time = timed(load_raw_slot_arrays, raw_items)
+        actual, vector_time = timed(calculate_occupancy_vectorized, raw_arrays)
+        identical = actual == expected and calculate_occupancy_vectorized(dict_arrays) == expected
+        print(f"{count:>10} {deser_time * 1000:>8.1f}ms {scalar_time * 1000:>8.1f}ms "
+              f"{dict_load_time * 1000:>8.1f}ms {raw_load_time * 1000:>8.1f}ms {vector_time * 1000:>8.1f}ms "
+              f"{scalar_time / (dict_load_time + vector_time):>6.1f}x "
+              f"{(deser_time + scalar_time) / (raw_load_time + vector_time):>6.1f}x  {identical}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
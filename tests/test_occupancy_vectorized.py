@@ -0,0 +1,89 @@
+"""
+Checks that the NumPy rebuild path in occupancy_vectorized matches the
+scalar real_time_util / occupancy_counters logic on the same slot items,
+starting from raw (wire format) scan items as _rebuild_occupancy_counters
+does. Needs numpy; boto3 is stubbed out when it is not installed.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import random
+import importlib
+import unittest
+from pathlib import Path
+from unittest import mock
+from collections import defaultdict
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-south-1')
+
+try:
+    import boto3  # noqa: F401
+except ImportError:
+    # Only the module-level clients touch boto3, and nothing here calls them
+    for name in ('boto3', 'boto3.dynamodb', 'boto3.dynamodb.types', 'boto3.dynamodb.conditions',
+                 'botocore', 'botocore.exceptions'):
+        sys.modules[name] = mock.MagicMock()
+
+# Admin_Lambda is deployed as the 'admin_module' layer; mirror that mapping locally
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.modules.setdefault('admin_module', importlib.import_module('Admin_Lambda'))
+
+from admin_module.real_time_util import OccupancyAggregator, _calculate_realtime_occupancy
+from admin_module.occupancy_counters import COUNTED_STATUSES, _slot_counters, area_counter_key, floor_counter_key
+from admin_module.occupancy_vectorized import (
+    load_raw_slot_arrays, area_occupancy_state, calculate_occupancy_vectorized, floor_status_counts
+)
+
+
+def synthetic_slots(count, seed=11):
+    """Slots as the table stores them; every area gets an occupied slot so no 'now' fallback is compared."""
+    rng = random.Random(seed)
+    slots = []
+    for i in range(count):
+        area, floor = i % 4 + 1, (i // 4) % 3 + 1
+        status = 'occupied' if i < 4 else rng.choice(('empty', 'occupied', 'maintenance', 'reserved'))
+        slot = {'area_number': area, 'floor_number': floor, 'slot_number': i, 'status': status}
+        if status == 'occupied':
+            slot['entry_timestamp'] = f"2026-10-{rng.randint(10, 28)}T{rng.randint(10, 23)}:00:00Z"
+        slots.append(slot)
+    return slots
+
+
+def raw_item(slot):
+    """The slot in the wire format a low-level client scan returns."""
+    return {name: {'N': str(value)} if isinstance(value, int) else {'S': value} for name, value in slot.items()}
+
+
+class OccupancyVectorizedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.slots = synthetic_slots(500)
+        self.arrays = load_raw_slot_arrays([raw_item(slot) for slot in self.slots])
+
+    def test_area_summary_matches_scalar(self):
+        self.assertEqual(calculate_occupancy_vectorized(self.arrays), _calculate_realtime_occupancy(self.slots))
+
+    def test_area_state_matches_aggregator_checkpoint(self):
+        aggregator = OccupancyAggregator()
+        for slot in self.slots:
+            aggregator.add_slot(slot)
+        self.assertEqual(area_occupancy_state(self.arrays), aggregator.areas)
+
+    def test_floor_counts_match_counter_rows(self):
+        expected = defaultdict(lambda: defaultdict(int))
+        for slot in self.slots:
+            for key, attribute in _slot_counters(slot):
+                expected[key][attribute] += 1
+
+        for (area, floor), counts in floor_status_counts(self.arrays).items():
+            for key in (floor_counter_key(area, floor), area_counter_key(area)):
+                row = expected[(key['counter_group'], key['counter_id'])]
+                row['total_slots'] -= counts['total']
+                for status in COUNTED_STATUSES:
+                    row[f"{status}_slots"] -= counts[status]
+        self.assertFalse({key: dict(row) for key, row in expected.items() if any(row.values())})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+Checks StreamRouter's per-handler resume and retry bounds without AWS: the
+checkpoint, attempt and failure tables are replaced by in-memory dicts, and
+boto3 is stubbed out when it is not installed.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import importlib
+import unittest
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-south-1')
+
+try:
+    import boto3  # noqa: F401
+except ImportError:
+    # The router only touches boto3 through the tables MemoryRouter replaces
+    for name in ('boto3', 'boto3.dynamodb', 'boto3.dynamodb.types', 'boto3.dynamodb.conditions',
+                 'botocore', 'botocore.exceptions'):
+        sys.modules[name] = mock.MagicMock()
+
+# Admin_Lambda is deployed as the 'admin_module' layer; mirror that mapping locally
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.modules.setdefault('admin_module', importlib.import_module('Admin_Lambda'))
+
+from admin_module import stream_router
+
+
+class MemoryRouter(stream_router.StreamRouter):
+    """StreamRouter whose DynamoDB state lives in dicts."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.checkpoints = {}
+        self.attempts = {}
+        self.dead_letters = []
+
+    def _read_checkpoints(self, first_sequence):
+        return {name: self.checkpoints[self._checkpoint_key(name, first_sequence)]
+                for name, _ in self.handlers if self._checkpoint_key(name, first_sequence) in self.checkpoints}
+
+    def _write_checkpoints(self, retry_from, through):
+        for name, sequence in through.items():
+            self.checkpoints[self._checkpoint_key(name, retry_from)] = sequence
+
+    def _count_attempt(self, handler_name, sequence):
+        key = (handler_name, sequence)
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        return self.attempts[key]
+
+    def _dead_letter(self, handler_name, records, error):
+        self.dead_letters.extend((handler_name, stream_router._sequence(record)) for record in records)
+
+
+def make_records(first, last):
+    return [{'eventName': 'MODIFY', 'dynamodb': {'SequenceNumber': str(sequence), 'NewImage': {}}}
+            for sequence in range(first, last + 1)]
+
+
+def redeliver(records, response):
+    """The records a stream hands back after a partial batch failure."""
+    identifier = response['batchItemFailures'][0]['itemIdentifier']
+    start = [record['dynamodb']['SequenceNumber'] for record in records].index(identifier)
+    return [{'eventName': record['eventName'], 'dynamodb': dict(record['dynamodb'])} for record in records[start:]]
+
+
+class Recorder:
+    """
+    A handler that records what it applied. A batch containing one of the
+    `fail_on` sequences raises before anything is applied, as a raising
+    handler is treated as having failed on its first record.
+    """
+
+    def __init__(self, fail_on=(), failures=1):
+        self.applied = []
+        self.fail_on = set(fail_on)
+        self.failures = failures
+
+    def __call__(self, records):
+        sequences = [stream_router._sequence(record) for record in records]
+        poisoned = self.fail_on.intersection(sequences)
+        if poisoned and self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError(f"cannot apply {min(poisoned)}")
+        self.applied.extend(sequences)
+
+
+class StreamRouterResumeTest(unittest.TestCase):
+
+    def test_redelivered_batch_skips_records_each_handler_applied(self):
+        router = MemoryRouter('test')
+        healthy = Recorder()
+        flaky = Recorder(fail_on={103})
+        router.register('healthy', healthy)
+        router.register('flaky', flaky)
+
+        records = make_records(101, 105)
+        response = router.process(records)
+        self.assertEqual(response, {'batchItemFailures': [{'itemIdentifier': '101'}]})
+        self.assertEqual(healthy.applied, [101, 102, 103, 104, 105])
+        self.assertEqual(flaky.applied, [])
+
+        response = router.process(redeliver(records, response))
+        self.assertEqual(response, {'batchItemFailures': []})
+        # Each record applied exactly once per handler across both deliveries
+        self.assertEqual(healthy.applied, [101, 102, 103, 104, 105])
+        self.assertEqual(flaky.applied, [101, 102, 103, 104, 105])
+
+    def test_reported_failures_resume_from_the_lowest_one(self):
+        router = MemoryRouter('test')
+        healthy = Recorder()
+        calls = []
+
+        def reporting(records):
+            calls.append([stream_router._sequence(record) for record in records])
+            return ['204'] if len(calls) == 1 else []
+
+        router.register('healthy', healthy)
+        router.register('reporting', reporting, reports_failures=True)
+
+        records = make_records(201, 206)
+        response = router.process(records)
+        self.assertEqual(response, {'batchItemFailures': [{'itemIdentifier': '204'}]})
+
+        router.process(redeliver(records, response))
+        self.assertEqual(calls, [[201, 202, 203, 204, 205, 206], [204, 205, 206]])
+        self.assertEqual(healthy.applied, [201, 202, 203, 204, 205, 206])
+
+    def test_poison_record_is_set_aside_after_max_attempts(self):
+        router = MemoryRouter('test')
+        healthy = Recorder()
+        broken = Recorder(fail_on={302}, failures=10 ** 6)
+        router.register('healthy', healthy)
+        router.register('broken', broken)
+
+        records = make_records(301, 304)
+        response = router.process(records)
+        for _ in range(stream_router.MAX_HANDLER_ATTEMPTS - 1):
+            self.assertEqual(response, {'batchItemFailures': [{'itemIdentifier': '301'}]})
+            records = redeliver(records, response)
+            response = router.process(records)
+
+        self.assertEqual(response, {'batchItemFailures': []})
+        self.assertEqual(router.dead_letters, [('broken', 302)])
+        self.assertEqual(broken.applied, [301, 303, 304])
+        self.assertEqual(healthy.applied, [301, 302, 303, 304])
+
+    def test_dependent_handler_waits_and_stops_short_of_the_failure(self):
+        router = MemoryRouter('test')
+        order = []
+        first = Recorder(fail_on={403})
+
+        def recording_first(records):
+            first(records)
+            order.append('first')
+
+        second = Recorder()
+
+        def recording_second(records):
+            order.append('second')
+            second(records)
+
+        router.register('first', recording_first)
+        router.register('second', recording_second, after='first')
+
+        records = make_records(401, 404)
+        # A raising handler fails from its first record, so nothing is unblocked
+        response = router.process(records)
+        self.assertEqual(response, {'batchItemFailures': [{'itemIdentifier': '401'}]})
+        self.assertEqual(second.applied, [])
+        self.assertEqual(router.attempts, {('first', 401): 1})
+
+        router.process(redeliver(records, response))
+        self.assertEqual(order, ['first', 'second'])
+        self.assertEqual(first.applied, [401, 402, 403, 404])
+        self.assertEqual(second.applied, [401, 402, 403, 404])
+
+    def test_dependency_must_be_registered_first(self):
+        router = MemoryRouter('test')
+        with self.assertRaises(ValueError):
+            router.register('second', Recorder(), after='first')
+
+
+if __name__ == '__main__':
+    unittest.main()